@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark des callbacks de capture NovaQA
+
+Compare, pour chaque taille de bloc, le chemin historique des callbacks
+(astype, ** 2, np.mean, copy) au chemin actuel (src/rt_dsp.py : produit
+scalaire, tampons préalloués). Affiche le temps moyen par bloc et la
+mémoire allouée transitoirement par bloc (pic tracemalloc).
+
+Usage : python benchmarks/bench_callbacks.py [nombre_de_blocs]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.rt_dsp import BlockPool, block_power, power_to_dbfs, rt_log  # noqa: E402
+from src.ring_buffer import AudioRingBuffer, SpscRingBuffer  # noqa: E402
+
+BLOCK_SIZES = [256, 512, 1024, 2048, 4096]
+SAMPLERATE = 48000
+DBFS_FLOOR = -80.0
+
+
+def legacy_callbacks(indata, sink):
+    """Callbacks avant optimisation (vue-mètre + enregistreur)"""
+    # AudioWorker._audio_callback
+    data = np.mean(indata.astype(np.float32), axis=1)
+    sink.append(data.copy())
+    # ResponseRecorder : conversion + niveau
+    audio_data = indata.astype(np.float32)
+    rms = np.sqrt(np.mean(audio_data ** 2))
+    dbfs = float(np.clip(20.0 * np.log10(rms), -80.0, 0.0)) if rms > 1e-10 else -80.0
+    sink.append(audio_data)
+    return dbfs
+
+
+def current_callbacks(indata, sink, history, pool, meter):
+    """Callbacks actuels (flux partagé + vue-mètre + enregistreur)"""
+    # CaptureHub : historique préalloué
+    history.write(indata)
+    # AudioWorker : file SPSC préallouée + somme des carrés cumulée
+    meter.write(indata)
+    meter.consume()
+    # ResponseRecorder : copie dans un tampon préalloué de l'écrivain
+    sink.append(pool.copy(indata))
+    # NoiseFloorTracker / niveau
+    return power_to_dbfs(block_power(indata), DBFS_FLOOR)
+
+
+def measure(fn, blocks, n_blocks):
+    """Retourne (µs par bloc, octets de pic transitoire par bloc)"""
+    sink = []
+    for block in blocks[:8]:  # Échauffement (caches, allocations paresseuses)
+        fn(block, sink)
+    sink.clear()
+
+    start = time.perf_counter()
+    for i in range(n_blocks):
+        fn(blocks[i % len(blocks)], sink)
+        if len(sink) > 64:
+            sink.clear()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    peak_total = 0
+    for i in range(min(n_blocks, 200)):
+        sink.clear()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn(blocks[i % len(blocks)], sink)
+        sink.clear()  # Ce qui est conservé par le puits n'est pas compté comme transitoire
+        _, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - base
+    tracemalloc.stop()
+    return elapsed / n_blocks * 1e6, peak_total / min(n_blocks, 200)
+
+
+def main():
+    n_blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.default_rng(0)
+    print(f"Benchmark callbacks - {n_blocks} blocs, {SAMPLERATE}Hz mono float32")
+    print(f"{'bloc':>6} | {'historique µs':>13} {'alloc o':>9} | {'actuel µs':>9} {'alloc o':>9} | {'budget µs':>9}")
+    for size in BLOCK_SIZES:
+        blocks = [(rng.standard_normal((size, 1)) * 0.1).astype(np.float32) for _ in range(16)]
+        history = AudioRingBuffer(SAMPLERATE, 1)
+        pool = BlockPool(66, size, 1)
+        meter = SpscRingBuffer(SAMPLERATE, 1)
+
+        legacy_us, legacy_alloc = measure(legacy_callbacks, blocks, n_blocks)
+        current_us, current_alloc = measure(
+            lambda block, sink: current_callbacks(block, sink, history, pool, meter), blocks, n_blocks)
+        budget_us = size / SAMPLERATE * 1e6
+        print(f"{size:>6} | {legacy_us:>13.1f} {legacy_alloc:>9.0f} | {current_us:>9.1f} {current_alloc:>9.0f} | {budget_us:>9.0f}")
+    rt_log.drain()
+
+
+if __name__ == "__main__":
+    main()
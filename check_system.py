@@ -23,7 +23,7 @@ def check_python_version():
 def check_dependencies():
     """Vérifie les dépendances"""
     required_packages = [
-        "PyQt6", "numpy", "sounddevice", "soundfile", "pygame"
+        "PyQt6", "numpy", "sounddevice", "soundfile"
     ]
     
     missing = []
@@ -75,9 +75,10 @@ def check_audio_system():
 
 def check_files():
     """Vérifie les fichiers requis"""
+    from src.config import QUESTIONS_FILE
     required_files = [
         "main.py",
-        "question.json", 
+        QUESTIONS_FILE, 
         "disclaimer.wav",
         "avant_de_commencer.wav",
         "interview_ended.wav",
@@ -118,16 +119,19 @@ def check_question_json():
         import json
         from src.config import QUESTIONS_FILE
         with open(QUESTIONS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            if QUESTIONS_FILE.endswith('.jsonl'):
+                data = [json.loads(line) for line in f if line.strip()]
+            else:
+                data = json.load(f)
         
-        print(f"\n📋 question.json:")
+        print(f"\n📋 {QUESTIONS_FILE}:")
         print(f"✅ Format JSON valide")
         print(f"✅ {len(data)} questions trouvées")
         
         # Vérifier le premier élément
         if data and isinstance(data[0], dict):
             first_key = list(data[0].keys())[0]
-            first_question = data[0][first_key]
+            first_question = data[0] if 'question' in data[0] else data[0][first_key]
             required_keys = ['question', 'file_question', 'reply']
             
             missing_keys = [key for key in required_keys if key not in first_question]
@@ -7,11 +7,9 @@ Point d'entrée principal de l'application
 """
 
 import sys
-import pygame
 from PyQt6.QtWidgets import QApplication
 
 # Import des modules locaux
-from src.config import AMBIANCE_VOLUME
 from src.question_manager import detect_resume_index
 from src.main_window import MainWindow, apply_dark_theme
 
@@ -25,12 +23,7 @@ def main():
         resume_index = detect_resume_index()
         print(f"📋 Index de reprise détecté: {resume_index}")
         
-        # ÉTAPE 2: Initialiser pygame mixer UNIQUEMENT pour l'ambiance
-        pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=2048)
-        pygame.mixer.init()
-        print("🎵 Pygame mixer initialisé (AMBIANCE SEULEMENT)")
-        
-        # ÉTAPE 3: Lancer Qt avec l'index de reprise
+        # ÉTAPE 2: Lancer Qt avec l'index de reprise
         app = QApplication(sys.argv)
         apply_dark_theme(app)
         
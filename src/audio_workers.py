@@ -4,103 +4,126 @@ Gère l'enregistrement, la lecture et le monitoring audio
 """
 
 import os
-import math
-import queue
+import threading
 import time
 import numpy as np
-import sounddevice as sd
 import soundfile as sf
-import pygame
 from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
 
 from .config import (
-    DBFS_FLOOR, UPDATE_INTERVAL_MS, BLOCKSIZE, DTYPE,
-    VU_METER_THRESHOLD, SPEECH_START_THRESHOLD_SEC, SPEECH_SILENCE_TIMEOUT_MS,
-    SPEECH_TOLERANCE_MS, RESPONSE_SAMPLE_RATE, RESPONSE_FOLDER, AMBIANCE_VOLUME,
-    IMMEDIATE_RECORDING, NOISE_FLOOR_ADAPTATION, NOISE_FLOOR_LEARNING_SEC,
-    DYNAMIC_SILENCE_DETECTION, MIN_SILENCE_DURATION_MS
+    DBFS_FLOOR, UPDATE_INTERVAL_MS, METER_RING_SECONDS, SPEECH_SILENCE_TIMEOUT_MS,
+    RESPONSE_FOLDER, AMBIANCE_VOLUME, DYNAMIC_SILENCE_DETECTION, STREAMING_WRITER,
+    JOURNALED_CAPTURE, AUTO_STOP_ON_SILENCE, CANDIDATE_SAMPLERATES, VAD_POLL_MS,
+    ADVISOR_MIN_HEADROOM_DB, ADVISOR_QUIET_SPEECH_DBFS, ADVISOR_MIN_SPEECH_SEC, ADVISOR_COOLDOWN_SEC
 )
 from .environment_utils import environment_manager
+from .take_writer import (
+    StreamingTakeWriter, write_take_stats, resolve_take_format, response_path, free_take_number,
+)
+from .capture_hub import capture_hub
+from .noise_floor import noise_floor_tracker
+from .device_cache import device_cache
+from .prompt_cache import prompt_prefetcher, decode_prompt
+from .playback_engine import playback_engine
+from .vad import VoiceActivityDetector, SPEECH_STARTED, SILENCE_STARTED, END_OF_SPEECH
+from .rt_dsp import block_power, power_to_dbfs, rt_log, to_float
+from .ring_buffer import SpscRingBuffer
+from .metering import MeterProcessor, TakeLevelStats
+from .instrumentation import instrumentation
+from .session_manifest import session_manifest
 
 
 class AudioWorker(QObject):
     """Worker audio simplifié"""
     level = pyqtSignal(float)
+    reading = pyqtSignal(object)  # MeterReading : crête, crête vraie, LUFS, balistiques
 
     def __init__(self):
         super().__init__()
         self.device_index = None
-        self._stream = None
-        self._q = queue.Queue(maxsize=8)
+        self._attached = False
+        self.ring = None  # SpscRingBuffer : échantillons récents lisibles sans copie (vues)
+        self.meter = MeterProcessor()  # Consommateur de la file, hors thread Qt
+        self._last_sequence = 0
+        self._reported_overruns = 0
+        self.empty_ticks = 0  # Ticks sans nouvel échantillon (callback en retard ou flux arrêté)
         self._timer = QTimer()
-        self._timer.timeout.connect(self._process_queue)
+        self._timer.timeout.connect(self._process_level)
         self._timer.start(UPDATE_INTERVAL_MS)
+        # Réouverture du flux à une autre fréquence (détection de la meilleure fréquence)
+        capture_hub.on_open(self._on_hub_opened)
 
     def _audio_callback(self, indata, frames, time, status):
+        # Copie dans la file préallouée + somme des carrés cumulée (aucune allocation)
         try:
-            data = np.mean(indata.astype(np.float32), axis=1)
-            try:
-                self._q.put_nowait(data.copy())
-            except queue.Full:
-                pass
+            self.ring.write(capture_hub.float_block(indata))
         except Exception as e:
-            print(f"Erreur callback: {e}")
+            rt_log.post("Erreur callback: {}", e)
 
-    def _process_queue(self):
+    def _process_level(self):
+        """Tick du vue-mètre : publie la dernière mesure du thread de mesure, en O(1)"""
         try:
-            if self._q.empty():
+            rt_log.drain()
+            ring = self.ring
+            if ring is None:
                 return
-            buf = []
-            while not self._q.empty():
-                try:
-                    buf.append(self._q.get_nowait())
-                except queue.Empty:
-                    break
-            if not buf:
+            if ring.overruns != self._reported_overruns:
+                print(f"⚠️ [METER] File pleine : {ring.overruns - self._reported_overruns} blocs ignorés")
+                instrumentation.count_drops('meter_ring', ring.overruns - self._reported_overruns)
+                self._reported_overruns = ring.overruns
+            sequence = self.meter.sequence
+            if sequence == self._last_sequence:
+                self.empty_ticks += 1
                 return
-            x = np.concatenate(buf)
-            rms = float(np.sqrt(np.mean(np.square(x), dtype=np.float64)))
-            if rms <= 1e-9 or not np.isfinite(rms):
-                dbfs = -math.inf
-            else:
-                dbfs = 20.0 * math.log10(rms)
-                dbfs = max(DBFS_FLOOR, min(0.0, dbfs))
-            self.level.emit(dbfs)
+            self._last_sequence = sequence
+            reading = self.meter.latest
+            # Seuils adaptatifs : bruit de fond suivi en continu (O(1) par tick)
+            environment_manager.update_noise_floor(noise_floor_tracker.noise_floor,
+                                                   noise_floor_tracker.learned)
+            
+            self.level.emit(reading.rms_db)
+            self.reading.emit(reading)
         except Exception as e:
-            print(f"Erreur process_queue: {e}")
+            print(f"Erreur process_level: {e}")
 
     def is_running(self) -> bool:
-        return self._stream is not None
+        return self._attached and capture_hub.is_running()
 
     def start(self):
+        """Ouvre le flux partagé sur le micro choisi et s'y abonne pour le vue-mètre"""
         try:
             self.stop()
             if self.device_index is None:
                 return
-            dev_info = sd.query_devices(self.device_index)
-            sr = dev_info.get('default_samplerate', 48000) or 48000
-            ch = min(1, max(1, dev_info.get('max_input_channels', 1)))
-            self._stream = sd.InputStream(
-                device=self.device_index,
-                channels=ch,
-                samplerate=sr,
-                blocksize=BLOCKSIZE,
-                dtype=DTYPE,
-                callback=self._audio_callback,
-            )
-            self._stream.start()
+            if capture_hub.open(self.device_index):
+                self._start_meter()
+                capture_hub.attach(noise_floor_tracker.on_block)
+                capture_hub.attach(self._audio_callback)
+                self._attached = True
         except Exception as e:
             print(f"Erreur start stream: {e}")
 
+    def _start_meter(self):
+        """(Re)construit la file et le thread de mesure à la fréquence courante du flux partagé"""
+        self.ring = SpscRingBuffer(METER_RING_SECONDS * capture_hub.samplerate, capture_hub.channels)
+        self.meter.start(self.ring, capture_hub.samplerate, capture_hub.channels)
+        self._last_sequence = self.meter.sequence
+        self._reported_overruns = 0
+        noise_floor_tracker.reset()
+
+    def _on_hub_opened(self):
+        """Flux partagé rouvert (autre fréquence) : pondération K, fenêtres LUFS et file recalculées"""
+        if self._attached:
+            self._start_meter()
+
     def stop(self):
-        if self._stream is not None:
-            try:
-                self._stream.stop()
-                self._stream.close()
-            except Exception:
-                pass
-            finally:
-                self._stream = None
+        """Se désabonne et ferme le flux partagé (le vue-mètre en définit la durée de vie)"""
+        if self._attached:
+            capture_hub.detach(noise_floor_tracker.on_block)
+            capture_hub.detach(self._audio_callback)
+            self._attached = False
+        self.meter.stop()
+        capture_hub.close()
 
 
 class ResponseRecorder(QThread):
@@ -109,33 +132,50 @@ class ResponseRecorder(QThread):
     recording_finished = pyqtSignal(str)  # Émet le chemin du fichier enregistré
     speech_detected = pyqtSignal()
     silence_detected = pyqtSignal()
+    end_of_answer = pyqtSignal()  # Silence prolongé après parole : la réponse est terminée
+    level_warning = pyqtSignal(str, str)  # Type ("clipping", "hot", "quiet"), conseil à afficher
     
-    def __init__(self, question_number, device_index=None, preferred_samplerate=None):
+    def __init__(self, question_number, device_index=None, preferred_samplerate=None, start_frame=None):
         super().__init__()
         self.question_number = question_number
         self.device_index = device_index
         self.preferred_samplerate = preferred_samplerate  # Fréquence pré-testée
-        self.should_stop = False
+        self.start_frame = start_frame  # Index absolu de capture où commence la prise (fin de la question)
+        self._preroll_pending = True
+        self._preroll = None      # Pré-roll copié par le thread enregistreur avant l'abonnement au flux
+        self._preroll_end = None  # Index absolu de fin de cette copie
+        self._gap_buf = None      # Tampon préalloué : blocs capturés entre la copie et le premier callback
+        self._analysis_frame = None  # Prochain index absolu à analyser par la VAD (thread enregistreur)
+        self._stop_event = threading.Event()  # Arrêt : effectif au prochain bloc, réveille run() aussitôt
         
         # État de l'enregistrement - SIMPLIFIÉ
         self.recording_active = True  # Toujours enregistrer
-        self.speech_started = True    # Pas de détection compliquée
         self.last_silence_time = None
         self.silence_start_time = None
         self.recording_data = []
+        self.writer = None  # Écrivain en flux (STREAMING_WRITER)
+        self.take_format = None  # (format, sous-type) de la prise, résolu une fois la fréquence connue
+        self.take_number = None  # Numéro de prise de la question (reponse_XX_takeK), choisi avec le format
+        self.vad = None     # Détecteur d'activité vocale (créé une fois la fréquence connue)
+        self.stats = None   # TakeLevelStats : écrêtage, crête, marge (sauvegardées avec la prise)
+        self.warnings = {}  # Avertissements de niveau émis, par type
+        self._last_warning = {}
+        self._clip_events_warned = 0
+        self.auto_stopped = False
         
-        # Seuil fixe - pas d'apprentissage du bruit
-        self.threshold = VU_METER_THRESHOLD
+        # Seuil initial issu du bruit de fond mesuré, réajusté à chaque bloc
+        self.threshold = environment_manager.current_threshold
         
+    @property
+    def should_stop(self):
+        return self._stop_event.is_set()
+    
     def run(self):
         try:
-            # Préparer le fichier de sortie
-            output_file = f"{RESPONSE_FOLDER}/reponse_{self.question_number:02d}.wav"
             os.makedirs(RESPONSE_FOLDER, exist_ok=True)
             
             print("=" * 80)
             print(f"🎤 [RECORDER] Démarrage enregistrement Q{self.question_number}")
-            print(f"   📁 [RECORDER] Fichier: {output_file}")
             print(f"   🎚️ [RECORDER] Seuil silence: {self.threshold} dBFS")
             print(f"   ⏱️ [RECORDER] Timeout silence: {SPEECH_SILENCE_TIMEOUT_MS}ms")
             print("=" * 80)
@@ -144,140 +184,243 @@ class ResponseRecorder(QThread):
             if self.device_index is None:
                 return
                 
-            # Utiliser la fréquence pré-détectée si disponible
-            if self.preferred_samplerate:
-                samplerate = self.preferred_samplerate
-                print(f"   ✅ [RECORDER] Utilisation fréquence pré-testée: {samplerate}Hz")
+            # Réutiliser le flux partagé s'il tourne déjà sur ce micro (cas normal)
+            if capture_hub.is_running() and capture_hub.device_index == self.device_index:
+                samplerate = capture_hub.samplerate
+                print(f"   ✅ [RECORDER] Flux de capture partagé déjà ouvert: {samplerate}Hz")
             else:
-                # Fallback sur détection classique si pas de pré-test
-                print("   ⚠️ [RECORDER] Pas de fréquence pré-testée, détection...")
-                preferred_samplerates = [RESPONSE_SAMPLE_RATE, 48000, 22050, 16000, 8000]
-                samplerate = None
-                
-                for test_rate in preferred_samplerates:
-                    try:
-                        sd.check_input_settings(device=self.device_index, samplerate=test_rate, channels=1)
-                        samplerate = test_rate
-                        print(f"   ✅ [RECORDER] Fréquence détectée: {samplerate}Hz")
-                        break
-                    except:
-                        continue
-                
-                if samplerate is None:
-                    print(f"   ❌ [RECORDER] Aucune fréquence supportée - utilisation 44100Hz par défaut")
-                    samplerate = 44100
+                samplerate = self._negotiate_samplerate()
+                if samplerate is None or not capture_hub.open(self.device_index, samplerate):
+                    return
+            
+            channels = capture_hub.channels  # Mono pour les réponses
+            print(f"   🎚️ [RECORDER] Config finale: {samplerate}Hz, {channels}ch, blocksize={capture_hub.blocksize}")
+            
+            # Préparer le fichier de sortie : nouvelle prise, les précédentes sont conservées
+            # (le codec dépend de la fréquence retenue)
+            self.take_format = resolve_take_format(samplerate)
+            self.take_number = free_take_number(self.question_number, session_manifest.next_take(self.question_number))
+            output_file = response_path(self.question_number, self.take_number, self.take_format[0])
+            print(f"   📁 [RECORDER] Fichier: {output_file} (prise {self.take_number}, {'/'.join(self.take_format)})")
             
-            channels = 1  # Mono pour les réponses
-            print(f"   🎚️ [RECORDER] Config finale: {samplerate}Hz, {channels}ch, blocksize={BLOCKSIZE}")
+            self.vad = VoiceActivityDetector(samplerate, self.threshold)
+            self.stats = TakeLevelStats(samplerate, environment_manager.noise_floor)
             
             def audio_callback(indata, frames, time_info, status):
-                if self.should_stop:
-                    raise sd.CallbackStop()
+                # Thread audio : uniquement la copie vers l'écrivain (tampons préalloués).
+                # La VAD tourne dans la boucle de run(), sur l'historique du flux partagé.
+                if self._stop_event.is_set():
+                    return
                 
-                # Vérifier les erreurs de status
+                # Vérifier les erreurs de status (affichées hors du thread audio)
                 if status:
-                    print(f"⚠️ [RECORDER] Audio callback status: {status}")
+                    rt_log.post("⚠️ [RECORDER] Audio callback status: {}", status)
                 
-                # Utiliser directement float32 sans conversion multiple
-                audio_data = indata.astype(np.float32)
+                audio_data = indata
                 
-                # Calculer le niveau audio (RMS puis dBFS) de manière optimisée
-                rms = np.sqrt(np.mean(audio_data ** 2))
-                if rms > 1e-10:  # Éviter log(0)
-                    dbfs = 20.0 * np.log10(rms)
-                    dbfs = np.clip(dbfs, -80.0, 0.0)  # Plus efficace que max/min
-                else:
-                    dbfs = -80.0
+                # Premier bloc : caler le début de la prise sur start_frame (pré-roll)
+                if self._preroll_pending:
+                    self._preroll_pending = False
+                    audio_data = self._apply_preroll(audio_data)
+                    if len(audio_data) == 0:
+                        self._preroll_pending = True
+                        return
+                    self._analysis_frame = capture_hub.block_start_frame + frames - len(audio_data)
                 
-                self._process_audio_level(dbfs, audio_data, frames)
+                # Toujours enregistrer les données audio (la VAD ne coupe jamais le début)
+                if self.recording_active:
+                    self._store_block(audio_data)
             
-            # Vérifier que les paramètres sont supportés avant de créer le stream
-            try:
-                sd.check_input_settings(
-                    device=self.device_index,
-                    channels=channels,
-                    samplerate=samplerate,
-                    dtype=DTYPE
-                )
-                print(f"   ✅ Paramètres audio vérifiés et supportés")
-            except Exception as e:
-                print(f"   ❌ Paramètres non supportés: {e}")
-                # Essayer avec des paramètres plus conservateurs
-                samplerate = 48000  # Fréquence très commune
-                print(f"   🔄 Nouveau test avec {samplerate}Hz...")
-                try:
-                    sd.check_input_settings(device=self.device_index, channels=channels, samplerate=samplerate)
-                    print(f"   ✅ {samplerate}Hz accepté")
-                except:
-                    print(f"   ❌ Impossible de trouver des paramètres compatibles")
-                    return
+            # Ouvrir le fichier tout de suite : les blocs y sont ajoutés au fil de l'eau
+            if STREAMING_WRITER:
+                self.writer = StreamingTakeWriter(output_file, samplerate, channels,
+                                                 journaled=JOURNALED_CAPTURE, dtype=capture_hub.dtype,
+                                                 blocksize=capture_hub.blocksize,
+                                                 fmt=self.take_format[0], subtype=self.take_format[1])
+                self.writer.start()
             
-            # Démarrer le stream d'enregistrement avec paramètres optimisés
+            # Démarrer l'enregistrement = s'abonner au flux partagé (pré-roll copié juste avant)
+            self._prepare_preroll()
+            capture_hub.attach(audio_callback)
             try:
-                with sd.InputStream(
-                    device=self.device_index,
-                    channels=channels,
-                    samplerate=samplerate,
-                    callback=audio_callback,
-                    blocksize=BLOCKSIZE,
-                    dtype=DTYPE,
-                    latency='low'        # Latence faible, mais pas de paramètres WASAPI spéciaux
-                ):
-                    print("🔴 [RECORDER] ENREGISTREMENT DÉMARRÉ (après fin de question)")
-                    print("🎤 [RECORDER] En attente de votre réponse...")
-                    self.recording_started.emit()
-                    self.speech_detected.emit()
-                    
-                    # Attendre jusqu'à arrêt
-                    while not self.should_stop:
-                        self.msleep(50)
-                        
-            except Exception as stream_error:
-                print(f"❌ [RECORDER] Erreur création stream audio: {stream_error}")
-                return
+                print("🔴 [RECORDER] ENREGISTREMENT DÉMARRÉ (après fin de question)")
+                print("🎤 [RECORDER] En attente de votre réponse...")
+                self.recording_started.emit()
+                
+                # Analyse VAD au fil de l'eau ; l'attente est interrompue dès la demande d'arrêt
+                while not self._stop_event.wait(VAD_POLL_MS / 1000.0):
+                    rt_log.drain()
+                    self._analyze_pending()
+            finally:
+                capture_hub.detach(audio_callback)
+            rt_log.drain()
+            self._analyze_pending()  # Derniers échantillons (statistiques de la prise)
             
-            # Sauvegarder l'enregistrement si on a des données
-            if self.recording_data:
+            # Finaliser le fichier en flux, ou sauvegarder les données en mémoire
+            if self.writer:
+                self._finish_streaming(output_file)
+            elif self.recording_data:
                 self._save_recording(output_file, samplerate)
                 
         except Exception as e:
             print(f"❌ Erreur enregistrement réponse: {e}")
     
+    def _prepare_preroll(self):
+        """Copie le pré-roll déjà capturé (thread enregistreur, avant l'abonnement au flux)
+
+        La copie (jusqu'à PREROLL_SECONDS) et ses allocations restent hors du
+        thread audio : le premier callback n'ajoute que les quelques blocs
+        capturés entre-temps, dans un tampon préalloué ici.
+        """
+        if self.start_frame is None:
+            return
+        blocksize = capture_hub.blocksize
+        self._gap_buf = np.empty((4 * blocksize, capture_hub.channels), dtype=capture_hub.dtype)
+        self._preroll_end = capture_hub.frames_captured
+        if self.start_frame < self._preroll_end:
+            # Un bloc de marge : le callback réécrit les plus anciens échantillons pendant la copie
+            history = capture_hub.preroll
+            start = max(self.start_frame, history.frames_written - history.capacity + blocksize)
+            self._preroll = history.read_range(start, self._preroll_end)
+    
+    def _apply_preroll(self, audio_data):
+        """Premier bloc (thread audio) : ajoute le pré-roll préparé, ou coupe ce qui précède start_frame"""
+        if self.start_frame is None:
+            return audio_data
+        block_start = capture_hub.block_start_frame
+        if self.start_frame < block_start:
+            added = 0
+            if self._preroll is not None and len(self._preroll):
+                self._store_block(self._preroll, owned=True)
+                added = len(self._preroll)
+            gap_start = max(self.start_frame, self._preroll_end)
+            if gap_start < block_start:
+                copied = capture_hub.preroll.read_into(gap_start, block_start, self._gap_buf)
+                if copied:
+                    self._store_block(self._gap_buf[:copied], owned=True)
+                    added += copied
+                if copied < block_start - gap_start:
+                    rt_log.post("⚠️ [RECORDER] Pré-roll incomplet: {} échantillons perdus", block_start - gap_start - copied)
+            rt_log.post("⏪ [RECORDER] Pré-roll ajouté: {:.0f}ms", added / capture_hub.samplerate * 1000)
+            self._preroll = None
+            return audio_data
+        # Le début de la prise tombe dans ce bloc (ou plus tard)
+        return audio_data[self.start_frame - block_start:]
+    
+    def _store_block(self, block, owned=False):
+        """Envoie un bloc vers l'écrivain en flux ou le tampon mémoire
+
+        `owned` indique que le bloc appartient déjà à l'enregistreur (pas de copie).
+        Le bloc garde le dtype de capture : en int16/int24, la prise reste en PCM
+        entier jusqu'au fichier.
+        """
+        if self.writer:
+            self.writer.write(block, copy=not owned)
+        else:
+            self.recording_data.append(block if owned else block.copy())
+    
+    def _negotiate_samplerate(self):
+        """Choisit la fréquence quand le flux partagé n'est pas encore ouvert"""
+        # Utiliser la fréquence pré-détectée si disponible
+        if self.preferred_samplerate:
+            samplerate = self.preferred_samplerate
+            print(f"   ✅ [RECORDER] Utilisation fréquence pré-testée: {samplerate}Hz")
+        else:
+            # Fallback : capacités du micro lues depuis le cache (sondées une seule fois)
+            print("   ⚠️ [RECORDER] Pas de fréquence pré-testée, lecture du cache périphérique...")
+            samplerate = device_cache.best_samplerate(self.device_index, CANDIDATE_SAMPLERATES)
+            if samplerate is None:
+                print(f"   ❌ Impossible de trouver des paramètres compatibles")
+                return None
+            print(f"   ✅ [RECORDER] Fréquence détectée: {samplerate}Hz")
+        return samplerate
+    
+    def _analyze_pending(self):
+        """Passe à la VAD les échantillons capturés depuis le dernier passage"""
+        if self._analysis_frame is None or self.vad is None:
+            return
+        history = capture_hub.preroll
+        end = capture_hub.frames_captured
+        if self._analysis_frame < history.oldest_frame:
+            print(f"⚠️ [RECORDER] Analyse VAD en retard, {history.oldest_frame - self._analysis_frame} échantillons ignorés")
+            self._analysis_frame = history.oldest_frame
+        if end <= self._analysis_frame:
+            return
+        block = to_float(history.read_range(self._analysis_frame, end))
+        self._analysis_frame = end
+        block_peak = self.stats.update(block, self.vad.in_speech)
+        dbfs = power_to_dbfs(block_power(block), DBFS_FLOOR)
+        self._process_audio_level(dbfs, block, len(block))
+        self._check_levels(block_peak)
+    
+    def _check_levels(self, block_peak):
+        """Conseiller de gain : avertit l'interface quand un seuil de niveau est franchi"""
+        stats = self.stats
+        if stats.clip_events > self._clip_events_warned:
+            self._clip_events_warned = stats.clip_events
+            self._warn("clipping", "Saturation ! Reculez du micro ou baissez le gain")
+        elif block_peak > 10.0 ** (-ADVISOR_MIN_HEADROOM_DB / 20.0):
+            self._warn("hot", "Niveau très fort : reculez légèrement du micro")
+        if (stats.speech_seconds >= ADVISOR_MIN_SPEECH_SEC
+                and stats.speech_rms_dbfs < ADVISOR_QUIET_SPEECH_DBFS):
+            self._warn("quiet", "Niveau faible : rapprochez-vous du micro ou montez le gain")
+    
+    def _warn(self, kind, message):
+        now = time.monotonic()
+        if now - self._last_warning.get(kind, -ADVISOR_COOLDOWN_SEC) < ADVISOR_COOLDOWN_SEC:
+            return
+        self._last_warning[kind] = now
+        self.warnings[kind] = self.warnings.get(kind, 0) + 1
+        print(f"📢 [RECORDER] {message}")
+        self.level_warning.emit(kind, message)
+    
+    def _save_stats(self, output_file, duration):
+        """Statistiques de niveau à côté de la prise : le contrôle qualité n'a pas à relire l'audio
+
+        Retourne le dictionnaire enregistré (None sans statistiques).
+        """
+        if self.stats is None:
+            return None
+        stats = {
+            "file": os.path.basename(output_file),
+            "question": self.question_number,
+            "take": self.take_number,
+            "samplerate": self.stats.samplerate,
+            "duration_sec": round(duration, 3),
+            "auto_stopped": self.auto_stopped,
+            "warnings": dict(self.warnings),
+        }
+        stats.update(self.stats.to_dict())
+        write_take_stats(output_file, stats)
+        print(f"   📈 [RECORDER] Crête {stats['peak_dbfs']:.1f} dBFS, marge {stats['headroom_db']:.1f} dB, "
+              f"facteur de crête {stats['crest_factor_db']:.1f} dB, SNR {stats['snr_db']:.1f} dB, "
+              f"{stats['clipped_samples']} échantillons écrêtés")
+        return stats
+    
     def _process_audio_level(self, dbfs, indata, frames):
-        """Version simplifiée - enregistre tout, PAS d'arrêt automatique"""
-        # Toujours enregistrer les données audio
-        if self.recording_active:
-            self.recording_data.append(indata if indata.dtype == np.float32 else indata.astype(np.float32))
-        
-        # Juste pour info, pas d'action automatique
-        is_active = dbfs > self.threshold
+        """Applique la détection d'activité vocale (VAD) sur les échantillons analysés"""
+        if DYNAMIC_SILENCE_DETECTION:
+            self.vad.threshold_db = environment_manager.current_threshold
+            self.vad.set_min_silence_ms(environment_manager.get_silence_duration())
         
-        if is_active:
-            if self.silence_start_time is not None:
+        for event in self.vad.process(indata):
+            if event == SPEECH_STARTED:
+                self.silence_start_time = None
                 print(f"🔊 [RECORDER] Voix détectée ({dbfs:.1f} dBFS)")
-            self.silence_start_time = None
-        else:
-            if self.silence_start_time is None:
+                self.speech_detected.emit()
+            elif event == SILENCE_STARTED:
                 self.silence_start_time = time.time()
-                print(f"🤫 [RECORDER] Silence ({dbfs:.1f} dBFS < {self.threshold}) - MAIS pas d'arrêt auto")
-        
-        # PAS D'ARRÊT AUTOMATIQUE - seulement manuel via bouton
-    
-    def _start_recording(self):
-        """Démarre l'enregistrement effectif"""
-        if not self.speech_started:
-            self.speech_started = True
-            self.recording_active = True
-            self.recording_data = []
-            print("=" * 50)
-            print(f"🔴 ENREGISTREMENT DÉMARRÉ !")
-            print(f"🎤 Parlez clairement, silence de {SPEECH_SILENCE_TIMEOUT_MS}ms pour arrêter")
-            print("=" * 50)
-            self.recording_started.emit()
-            self.speech_detected.emit()
+                print(f"🤫 [RECORDER] Silence ({dbfs:.1f} dBFS < {self.vad.threshold_db:.1f})")
+                self.silence_detected.emit()
+            elif event == END_OF_SPEECH and AUTO_STOP_ON_SILENCE:
+                # Arrêt automatique : la boucle de run() finalise le fichier
+                print(f"⏹️ [RECORDER] Fin de réponse détectée ({SPEECH_SILENCE_TIMEOUT_MS}ms de silence)")
+                self.auto_stopped = True
+                self._stop_event.set()
+                self.end_of_answer.emit()
     
     def _save_recording(self, output_file, samplerate):
-        """Sauvegarde l'enregistrement dans un fichier WAV"""
+        """Sauvegarde l'enregistrement dans le format de prise configuré"""
         try:
             if not self.recording_data:
                 print("⚠️ [RECORDER] Aucune donnée à sauvegarder")
@@ -287,127 +430,152 @@ class ResponseRecorder(QThread):
             audio_data = np.concatenate(self.recording_data, axis=0)
             
             # Sauvegarder avec soundfile
-            sf.write(output_file, audio_data, samplerate)
+            sf.write(output_file, audio_data, samplerate,
+                     format=self.take_format[0], subtype=self.take_format[1])
             
             duration = len(audio_data) / samplerate
             print(f"💾 [RECORDER] Réponse sauvegardée: {output_file}")
             print(f"   📊 [RECORDER] Durée: {duration:.2f}s, {len(audio_data)} échantillons")
+            stats = self._save_stats(output_file, duration)
+            session_manifest.record_take(output_file, duration, stats)
             
             self.recording_finished.emit(output_file)
             
         except Exception as e:
             print(f"❌ [RECORDER] Erreur sauvegarde: {e}")
     
+    def _finish_streaming(self, output_file):
+        """Attend la fermeture du fichier écrit en flux (thread enregistreur) et notifie l'interface"""
+        self.writer.close()
+        self.writer.wait()
+        
+        if self.writer.error is not None or self.writer.frames_written == 0:
+            print("⚠️ [RECORDER] Aucune donnée à sauvegarder")
+            self.writer.discard()
+            return
+        
+        print(f"💾 [RECORDER] Réponse sauvegardée: {output_file}")
+        print(f"   📊 [RECORDER] Durée: {self.writer.duration:.2f}s, {self.writer.frames_written} échantillons")
+        stats = self._save_stats(output_file, self.writer.duration)
+        session_manifest.record_take(output_file, self.writer.duration, stats)
+        self.recording_finished.emit(output_file)
+    
     def stop_recording(self):
-        """Arrête l'enregistrement immédiatement - DÉCLENCHÉ MANUELLEMENT"""
+        """Arrête l'enregistrement immédiatement - DÉCLENCHÉ MANUELLEMENT
+
+        Ne bloque pas : le thread enregistreur se réveille, finalise le fichier
+        et émet recording_finished.
+        """
+        if self._stop_event.is_set():
+            return
         print("🛑 [RECORDER] ARRÊT MANUEL demandé (bouton 'Question Terminée')")
-        self.should_stop = True
+        self._stop_event.set()
+
 
+class AudioPlayer(QObject):
+    """Lecture d'un prompt (questions/réponses) via le moteur de lecture persistant
 
-class AudioPlayer(QThread):
-    """Thread pour audio (questions/réponses) - Utilise sounddevice/soundfile"""
+    Le décodage n'a jamais lieu sur le thread GUI : start() demande le prompt
+    au prefetcher et la lecture démarre à sa livraison (immédiate s'il est en
+    cache, sinon à la fin du décodage sur le thread de fond).
+    """
     finished = pyqtSignal()
+    _decoded = pyqtSignal(object, object)  # data, erreur : thread de décodage -> thread GUI
     
-    def __init__(self, audio_file):
+    def __init__(self, audio_file, lead_in_ms=0):
         super().__init__()
         self.audio_file = audio_file
-        self.should_stop = False
-        self.stream = None
+        self.lead_in_ms = lead_in_ms  # Silence programmé avant le clip (à l'échantillon près)
+        self.clip_id = None
+        self.end_time = None  # Instant (horloge PortAudio) où le dernier échantillon sort du DAC
+        self._stopped = False
+        self._decoded.connect(self._on_decoded)
         
-    def run(self):
+    def start(self):
+        prompt_prefetcher.request(self.audio_file, self._deliver)
+    
+    def _deliver(self, data, samplerate, error):
+        self._decoded.emit(data, error)  # Connexion en file si appelé depuis le thread de décodage
+    
+    def _on_decoded(self, data, error):
+        if self._stopped:
+            self.finished.emit()  # Arrêté pendant le décodage : rien n'a été joué
+            return
+        if error is not None:
+            print(f"❌ Erreur lecture sounddevice {self.audio_file}: {error}")
+            self.finished.emit()
+            return
         try:
-            # Utiliser soundfile pour lire le fichier et sounddevice pour jouer
-            # Complètement indépendant de pygame
-            data, samplerate = sf.read(self.audio_file, dtype='float32')
-            
-            # Si mono, convertir en stéréo
-            if len(data.shape) == 1:
-                data = np.column_stack((data, data))
-            
-            self.current_frame = 0
-            total_frames = len(data)
-            
-            def audio_callback(outdata, frames, time_info, status):
-                if self.should_stop:
-                    raise sd.CallbackStop()
-                
-                start = self.current_frame
-                end = min(start + frames, total_frames)
-                
-                if start >= total_frames:
-                    # Fin du fichier
-                    outdata[:] = 0
-                    raise sd.CallbackStop()
-                
-                # Copier les données audio
-                chunk_size = end - start
-                outdata[:chunk_size] = data[start:end]
-                
-                # Si on n'a pas assez de données, remplir de zéros
-                if chunk_size < frames:
-                    outdata[chunk_size:] = 0
-                
-                self.current_frame = end
-            
-            # Démarrer le stream sounddevice
-            with sd.OutputStream(
-                samplerate=samplerate, 
-                channels=data.shape[1],
-                callback=audio_callback,
-                blocksize=1024,
-                latency='low'
-            ) as self.stream:
-                print(f"🎤 Lecture sounddevice: {os.path.basename(self.audio_file)}")
-                
-                # Attendre que le stream se termine
-                while self.stream.active and not self.should_stop:
-                    sd.sleep(50)  # Dormir 50ms
-                    
+            playback_engine.clip_finished.connect(self._on_clip_finished)
+            self.clip_id = playback_engine.play(data, self.lead_in_ms)
+            print(f"🎤 Lecture sounddevice: {os.path.basename(self.audio_file)}")
         except Exception as e:
             print(f"❌ Erreur lecture sounddevice {self.audio_file}: {e}")
-        finally:
             self.finished.emit()
     
+    def _on_clip_finished(self, clip_id, end_time):
+        if clip_id != self.clip_id:
+            return
+        self.end_time = end_time
+        try:
+            playback_engine.clip_finished.disconnect(self._on_clip_finished)
+        except TypeError:
+            pass
+        self.finished.emit()
+    
     def stop(self):
-        self.should_stop = True
-        if hasattr(self, 'stream') and self.stream:
-            try:
-                self.stream.abort()
-            except:
-                pass
+        self._stopped = True
+        if self.clip_id is not None:
+            playback_engine.stop(self.clip_id)
+    
+    def wait(self, timeout=None):
+        """Compatibilité avec l'ancien lecteur QThread : l'arrêt est asynchrone"""
+        return True
+
+
+class TakeExporter(QThread):
+    """Export des meilleures prises en fin d'interview (copie des fichiers hors du thread GUI)"""
+    exported = pyqtSignal(int)  # Nombre de prises exportées
+    
+    def run(self):
+        try:
+            count = session_manifest.export_best_takes()
+        except Exception as e:
+            print(f"❌ [EXPORT] Erreur export des prises: {e}")
+            count = 0
+        self.exported.emit(count)
 
 
 class AmbiancePlayer(QThread):
-    """Thread dédié EXCLUSIVEMENT pour la musique d'ambiance"""
+    """Musique d'ambiance : décodée une fois puis bouclée par le mixeur du moteur de lecture"""
     
     def __init__(self, audio_file, volume=AMBIANCE_VOLUME):
         super().__init__()
         self.audio_file = audio_file
         self.volume = volume
+        # Id réservé d'avance : add_loop() et remove_loop() passent par la file de
+        # commandes du moteur, un stop() pendant le décodage ne laisse pas de boucle orpheline
+        self.source_id = playback_engine.new_source_id()
         self.should_stop = False
         
     def run(self):
         try:
-            # pygame.mixer.music N'EST PLUS EN CONFLIT car sounddevice gère le reste
-            pygame.mixer.music.load(self.audio_file)
-            pygame.mixer.music.set_volume(self.volume)
-            pygame.mixer.music.play(-1)  # Boucle infinie
-            print(f"🎵 Ambiance pygame.music démarrée: {os.path.basename(self.audio_file)}")
-            
-            # Surveillance simple
-            while not self.should_stop:
-                if not pygame.mixer.music.get_busy():
-                    print("🎵 Redémarrage ambiance...")
-                    pygame.mixer.music.play(-1)
-                pygame.time.wait(500)  # Vérifier toutes les 500ms
-                
+            # Décodage hors interface (fichier long) ; hors cache LRU pour ne pas évincer les prompts
+            data, _ = decode_prompt(self.audio_file)
+            if self.should_stop:
+                return
+            playback_engine.add_loop(data, self.volume, source_id=self.source_id)
+            print(f"🎵 Ambiance démarrée (mixeur): {os.path.basename(self.audio_file)}")
         except Exception as e:
             print(f"❌ Erreur ambiance: {e}")
     
+    def set_volume(self, volume):
+        self.volume = volume
+        playback_engine.set_gain(self.source_id, volume)
+    
     def stop(self):
+        if self.should_stop:
+            return
         self.should_stop = True
-        try:
-            pygame.mixer.music.stop()
-            print("🎵 Ambiance arrêtée")
-        except:
-            pass
\ No newline at end of file
+        playback_engine.remove_loop(self.source_id)
+        print("🎵 Ambiance arrêtée")
@@ -0,0 +1,205 @@
+"""
+Moteur de capture partagé pour NovaQA
+Un seul sd.InputStream longue durée dont les blocs sont distribués à plusieurs
+consommateurs (vue-mètre, enregistreur, analyses d'environnement...)
+"""
+
+import threading
+import time
+import numpy as np
+import sounddevice as sd
+
+from .config import BLOCKSIZE, DTYPE, PREROLL_SECONDS
+from .ring_buffer import AudioRingBuffer
+from .device_cache import device_cache
+from .rt_dsp import rt_log, stream_dtype, to_float
+from .stream_tuning import stream_tuner
+from .instrumentation import instrumentation
+
+
+class CaptureHub:
+    """Possède le flux d'entrée et publie chaque bloc vers les consommateurs attachés
+
+    Un consommateur est un callable `consumer(indata, frames, time_info, status)`
+    appelé depuis le thread audio : il doit rester rapide et ne jamais bloquer.
+    `indata` n'est valide que pendant l'appel (le copier pour le conserver).
+    En capture entière (DTYPE 'int16' / 'int24'), `indata` est en PCM entier :
+    les mesures de niveau passent par float_block().
+    """
+
+    def __init__(self):
+        self.device_index = None
+        self.samplerate = None
+        self.channels = 1
+        self.blocksize = BLOCKSIZE  # Palier choisi par stream_tuner pour ce micro
+        self.latency = 'low'
+        self.probe = None           # CallbackProbe : durées, jitter, xruns et horodatages ADC de la session
+        self.dtype = np.dtype(stream_dtype(DTYPE))  # dtype des blocs publiés (et de l'historique)
+        self.frames_captured = 0    # Nombre total d'échantillons reçus depuis l'ouverture
+        self.block_start_frame = 0  # Index absolu du premier échantillon du bloc en cours
+        self.preroll = None         # Historique du micro (AudioRingBuffer) : pré-roll et analyse VAD
+        self._clock = (0, 0.0)      # (index du bloc en cours, son horodatage ADC) publiés ensemble par le callback
+        self._stream = None
+        self._consumers = ()        # Tuple remplacé en bloc : lecture sans verrou dans le callback
+        self._open_listeners = ()   # Appelés à chaque (ré)ouverture du flux (nouvelle fréquence)
+        self._lock = threading.Lock()
+        self._float_buf = np.zeros((BLOCKSIZE, self.channels), dtype=np.float32)
+        self._float_frame = -1      # Bloc déjà converti dans _float_buf (index de son premier échantillon)
+
+    def is_running(self) -> bool:
+        return self._stream is not None
+
+    def open(self, device_index, samplerate=None):
+        """Ouvre (ou réutilise) le flux sur le périphérique demandé
+
+        Le flux existant est conservé s'il tourne déjà sur ce périphérique à la
+        fréquence demandée ; les consommateurs restent attachés en cas de réouverture.
+        """
+        if (self._stream is not None and device_index == self.device_index
+                and (samplerate is None or int(samplerate) == self.samplerate)):
+            return True
+
+        self.close()
+        try:
+            if samplerate is None:
+                dev_info = device_cache.device_info(device_index)
+                samplerate = dev_info.get('default_samplerate', 48000) or 48000
+            self.device_index = device_index
+            self.samplerate = int(samplerate)
+            self.frames_captured = 0
+            self.block_start_frame = 0
+            self._clock = (0, 0.0)
+            # Au moins 0.5s : la VAD de l'enregistreur lit cet historique toutes les VAD_POLL_MS
+            self.preroll = AudioRingBuffer(max(PREROLL_SECONDS, 0.5) * self.samplerate, self.channels,
+                                           dtype=self.dtype)
+            self.blocksize, self.latency = stream_tuner.settings('input', device_index, BLOCKSIZE)
+            self._float_buf = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+            self._float_frame = -1
+            self.probe = instrumentation.open_probe('capture', self.samplerate, self.blocksize)
+            self._stream = sd.InputStream(
+                device=device_index,
+                channels=self.channels,
+                samplerate=self.samplerate,
+                blocksize=self.blocksize,
+                dtype=self.dtype.name,
+                latency=self.latency,
+                callback=self._callback,
+            )
+            self._notify_opened()
+            self._stream.start()
+            device_cache.record_latency(device_index, self.samplerate, self._stream.latency)
+            print(f"🎙️ [CAPTURE] Flux partagé ouvert: device {device_index}, {self.samplerate}Hz, "
+                  f"blocksize={self.blocksize}, latence {self.latency}, {DTYPE}")
+            return True
+        except Exception as e:
+            print(f"❌ [CAPTURE] Erreur ouverture flux: {e}")
+            self._stream = None
+            device_cache.invalidate(device_index)  # Micro débranché ou remplacé : re-sonder
+            return False
+
+    def close(self):
+        """Ferme le flux (les consommateurs restent enregistrés)"""
+        if self._stream is not None:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            except Exception:
+                pass
+            finally:
+                self._stream = None
+                print("🎙️ [CAPTURE] Flux partagé fermé")
+                instrumentation.close_probe(self.probe)
+                stream_tuner.conclude('input', self.device_index, self.probe, self.latency)
+                self.probe = None
+
+    def on_open(self, listener):
+        """Enregistre `listener()`, appelé après chaque (ré)ouverture du flux, avant son démarrage
+
+        Les consommateurs dont l'état dépend de la fréquence ou de la taille de
+        bloc (vue-mètre, file associée) s'y reconstruisent : aucun callback ne
+        tourne encore pendant l'appel.
+        """
+        with self._lock:
+            if listener not in self._open_listeners:
+                self._open_listeners = self._open_listeners + (listener,)
+
+    def _notify_opened(self):
+        for listener in self._open_listeners:
+            try:
+                listener()
+            except Exception as e:
+                print(f"⚠️ [CAPTURE] Erreur à la réouverture du flux: {e}")
+
+    def attach(self, consumer):
+        """Ajoute un consommateur ; il reçoit les blocs dès le prochain callback"""
+        with self._lock:
+            if consumer not in self._consumers:
+                self._consumers = self._consumers + (consumer,)
+
+    def detach(self, consumer):
+        """Retire un consommateur ; il ne sera plus appelé après le callback en cours"""
+        with self._lock:
+            self._consumers = tuple(c for c in self._consumers if c != consumer)
+
+    def float_block(self, indata):
+        """Bloc en cours en float32 [-1, 1), pour les consommateurs qui mesurent un niveau
+
+        À appeler depuis un consommateur (thread audio). En capture entière, la
+        conversion a lieu une seule fois par bloc dans un tampon préalloué et
+        est partagée par tous les consommateurs ; en float32, `indata` est
+        retourné tel quel.
+        """
+        if indata.dtype.kind == 'f':
+            return indata
+        if len(indata) > len(self._float_buf):
+            self._float_buf = np.zeros((len(indata), self.channels), dtype=np.float32)  # Bloc exceptionnel
+            self._float_frame = -1
+        if self._float_frame != self.block_start_frame:
+            to_float(indata, out=self._float_buf)
+            self._float_frame = self.block_start_frame
+        return self._float_buf[:len(indata)]
+
+    def frame_at_time(self, stream_time, output_latency=0.0):
+        """Convertit un instant de l'horloge PortAudio en index absolu d'échantillon
+
+        Utilisé pour caler le début d'une prise sur la fin de lecture d'une question
+        (outputBufferDacTime du lecteur). Avec les latences de sortie et d'entrée,
+        cet instant est en général postérieur au dernier bloc capturé : l'index
+        retourné peut donc être dans le futur (l'enregistreur attend qu'il soit
+        capturé), mais pas au-delà de ces latences (`output_latency` : celle du
+        flux de sortie, en secondes) et d'un bloc. Plus loin, les horloges
+        d'entrée et de sortie ne concordent pas (périphériques ou API hôtes
+        différents) : l'instant présent est retourné, avec un avertissement.
+        Retourne None si l'horloge est indisponible.
+        """
+        block_start, adc_time = self._clock
+        if not stream_time or not adc_time or not self.samplerate:
+            return None
+        frame = block_start + round((stream_time - adc_time) * self.samplerate)
+        now = self.frames_captured
+        input_latency = self._stream.latency if self._stream is not None else 0.0
+        ahead_max = round((input_latency + output_latency) * self.samplerate) + self.blocksize
+        if frame > now + ahead_max:
+            print(f"⚠️ [CAPTURE] Instant {(frame - now) / self.samplerate:.2f}s dans le futur "
+                  f"(max {ahead_max / self.samplerate:.2f}s) : horloges entrée/sortie incohérentes, "
+                  f"début de prise calé sur l'instant présent")
+            return now
+        return max(0, frame)
+
+    def _callback(self, indata, frames, time_info, status):
+        started = time.perf_counter()
+        self.block_start_frame = self.frames_captured
+        self._clock = (self.block_start_frame, time_info.inputBufferAdcTime)
+        self.preroll.write(indata)
+        for consumer in self._consumers:
+            try:
+                consumer(indata, frames, time_info, status)
+            except Exception as e:
+                rt_log.post("Erreur consommateur capture: {}", e)
+        self.frames_captured += frames
+        self.probe.record(frames, status, started, time.perf_counter() - started,
+                          time_info.inputBufferAdcTime, time_info.currentTime)
+
+
+# Instance globale
+capture_hub = CaptureHub()
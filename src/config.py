@@ -5,8 +5,28 @@ Configuration et constantes globales pour NovaQA
 # === PARAMÈTRES AUDIO ===
 DBFS_FLOOR = -60.0
 UPDATE_INTERVAL_MS = 50
+METER_RING_SECONDS = 1.0      # Capacité de la file sans verrou callback -> vue-mètre
+PEAK_HOLD_SEC = 2.0           # Maintien de l'indicateur de crête
+PEAK_RELEASE_DB_PER_SEC = 11.8  # Retour de la crête (PPM type I : 20 dB en 1.7 s)
+RMS_INTEGRATION_MS = 300      # Intégration de l'affichage RMS (balistique VU)
+CLIP_THRESHOLD_DBFS = -0.1    # Niveau d'échantillon compté comme écrêtage
+TRUE_PEAK_OVERSAMPLING = 4    # Suréchantillonnage de la crête vraie (BS.1770)
+ADVISOR_MIN_HEADROOM_DB = 3.0       # Crête au-dessus de -3 dBFS pendant une réponse : trop fort
+ADVISOR_QUIET_SPEECH_DBFS = -38.0   # RMS de parole en dessous : trop faible
+ADVISOR_MIN_SPEECH_SEC = 2.0        # Parole observée avant de juger le niveau trop faible
+ADVISOR_COOLDOWN_SEC = 5.0          # Délai minimal entre deux avertissements du même type
 BLOCKSIZE = 2048              # Augmenté pour réduire les hachures (était 1024)
-DTYPE = 'float32'
+DTYPE = 'float32'             # Format de capture : 'float32', 'int16' ou 'int24' (conteneur int32), stocké en PCM entier
+ADAPTIVE_STREAMS = True       # Blocksize/latence ajustés entre sessions selon les xruns mesurés (mémorisés par périphérique)
+BLOCKSIZE_LADDER = [256, 512, 1024, 2048, 4096]  # Paliers de taille de bloc de l'ajustement automatique
+XRUN_MAX_PER_MIN = 1.0        # Débordements/sous-alimentations par minute au-delà desquels on monte d'un palier
+CALLBACK_LOAD_MAX = 0.7       # Part du budget d'un bloc prise par le callback au-delà de laquelle le bloc est surchargé
+OVERLOAD_MAX_RATIO = 0.01     # Part de blocs surchargés au-delà de laquelle on monte d'un palier
+CALLBACK_LOAD_LOW = 0.2       # Charge moyenne du callback sous laquelle un palier plus réactif est tenté
+TUNING_CLEAN_SESSIONS = 3     # Sessions propres consécutives avant de redescendre d'un palier
+TUNING_MIN_SESSION_SEC = 60.0 # Durée minimale d'une session pour être prise en compte
+INSTRUMENTATION_DUMP = False  # Export JSON des mesures des callbacks (durées, jitter, xruns) à chaque fermeture de flux
+INSTRUMENTATION_FOLDER = "diagnostics"  # Dossier des exports d'instrumentation (un fichier par session)
 
 # === PARAMÈTRES DE VALIDATION MICROPHONE ===
 VU_METER_THRESHOLD = -40.0        # Seuil dBFS pour détecter l'activité (essaie -35, -30)
@@ -17,9 +37,31 @@ SILENCE_DEBOUNCE_MS = 1000        # Délai avant reset du timer (millisecondes)
 SPEECH_START_THRESHOLD_SEC = 0.3  # Secondes d'activité VU pour démarrer l'enregistrement (encore réduit)
 SPEECH_SILENCE_TIMEOUT_MS = 1500   # ms de silence pour considérer la fin de parole
 SPEECH_TOLERANCE_MS = 500         # ms de tolérance pour micro-pauses (nouveau)
+AUTO_STOP_ON_SILENCE = True       # Fin de réponse automatique quand la VAD détecte SPEECH_SILENCE_TIMEOUT_MS de silence
+VAD_FRAME_MS = 20                 # Durée d'une trame d'analyse VAD
+VAD_FLATNESS_MAX = 0.5            # Planéité spectrale au-delà de laquelle une trame ressemble à du bruit
+VAD_ZCR_MAX = 0.35                # Taux de passage par zéro au-delà duquel une trame plate est rejetée
+VAD_POLL_MS = 20                  # Période d'analyse VAD dans le thread enregistreur (hors callback audio)
 RESPONSE_SAMPLE_RATE = 44100      # Fréquence d'échantillonnage pour l'enregistrement
+CANDIDATE_SAMPLERATES = [RESPONSE_SAMPLE_RATE, 48000, 22050, 16000, 8000]  # Ordre de préférence
+DEVICE_CACHE_FILE = "device_cache.json"  # Capacités des micros sondées (persistées entre lancements)
 RESPONSE_FOLDER = "sound_response" # Dossier pour les réponses enregistrées
+SESSION_MANIFEST_FILE = "manifest.jsonl"  # Index des prises terminées (durée, taille, sha256) dans RESPONSE_FOLDER
 DELAY_BEFORE_REPLY_MS = 500      # Délai avant de lancer la réponse bateau (ms)
+STREAMING_WRITER = True           # Écriture en flux sur disque (mémoire constante) au lieu de tout garder en RAM
+WRITER_QUEUE_BLOCKS = 64          # Taille de la file vers le thread d'écriture (~3s à 2048 échantillons/44.1kHz)
+JOURNALED_CAPTURE = True          # Prise écrite en .part + journal : récupérable après un crash
+JOURNAL_CHECKPOINT_SEC = 2.0      # Intervalle entre deux points de contrôle (en-tête/trames + fsync)
+RESPONSE_FORMAT = "FLAC"          # Format des prises : "WAV", "FLAC" (sans perte) ou "OGG" (Opus/Vorbis, avec perte)
+RESPONSE_SUBTYPE = "PCM_24"       # Sous-type : "PCM_16"/"PCM_24" (WAV, FLAC), "FLOAT" (WAV), "OPUS"/"VORBIS" (OGG) ; imposé par DTYPE en capture entière
+MIN_RECOVERABLE_SEC = 0.5         # Durée minimale pour conserver une prise interrompue
+PREROLL_SECONDS = 1.0             # Secondes de micro gardées en continu et ajoutées au début de la prise
+TAKE_EXPORT_FOLDER = "export"     # Dossier d'export de la meilleure prise de chaque question
+TAKE_SCORE_TARGET_SPEECH_DBFS = -20.0  # RMS de parole visé pour une prise idéale
+TAKE_SCORE_LEVEL_TOLERANCE_DB = 6.0    # Écart au niveau visé toléré sans pénalité
+TAKE_SCORE_SNR_CAP_DB = 30.0      # SNR au-delà duquel une prise ne gagne plus de points
+TAKE_SCORE_CLIP_PENALTY_DB = 6.0  # Pénalité par épisode d'écrêtage (en dB de score)
+TAKE_SCORE_MIN_SPEECH_SEC = 1.0   # Parole minimale : en dessous, la prise est presque toujours écartée
 
 # === PARAMÈTRES ENVIRONNEMENT BRUYANT ===
 IMMEDIATE_RECORDING = True        # Démarrer l'enregistrement immédiatement (pas d'attente détection)
@@ -27,6 +69,11 @@ NOISE_FLOOR_ADAPTATION = True     # Adaptation automatique au bruit de fond
 NOISE_FLOOR_LEARNING_SEC = 2.0    # Durée d'apprentissage du bruit de fond au début
 DYNAMIC_SILENCE_DETECTION = True  # Détection de silence relative au bruit ambiant
 MIN_SILENCE_DURATION_MS = 800     # Durée minimale de silence pour valider la fin (plus court pour réponses rapides)
+NOISE_FLOOR_WINDOW_SEC = 6.0      # Fenêtre glissante du suivi de bruit de fond (statistiques de minimum)
+NOISE_FLOOR_SUBWINDOWS = 6        # Nombre de sous-fenêtres (coût constant par bloc)
+NOISE_FLOOR_BIAS_DB = 1.5         # Correction du biais du minimum (le minimum sous-estime le bruit moyen)
+NOISY_FLOOR_DB = -45.0            # Bruit de fond au-dessus duquel on bascule en profil bruyant
+QUIET_FLOOR_DB = -52.0            # Bruit de fond en dessous duquel on revient au profil calme (hystérésis)
 
 # === PROFILS ENVIRONNEMENT ===
 # Profil bureau calme
@@ -52,9 +99,18 @@ INTRO_FILE = "avant_de_commencer.wav"
 INTERVIEW_ENDED_FILE = "interview_ended.wav"
 AMBIANCE_FILE = "ambiance.mp3"
 GENERATED_FOLDER = "generated"
-QUESTIONS_FILE = "question.json"
+PROMPT_CACHE_BUDGET_MB = 64       # Mémoire max des prompts décodés gardés en cache (LRU)
+PLAYBACK_SAMPLE_RATE = 48000      # Fréquence du flux de sortie persistant (prompts rééchantillonnés au décodage)
+PLAYBACK_BLOCKSIZE = 1024         # Taille de bloc du flux de sortie = latence de démarrage d'un clip
+DUCKING_GAIN = 0.35               # Facteur appliqué à l'ambiance pendant une question/réponse
+DUCKING_ATTACK_MS = 120           # Constante de temps de l'atténuation (ms)
+DUCKING_RELEASE_MS = 600          # Constante de temps de la remontée (ms)
+QUESTIONS_FILE = "question.json" # Ou "question.jsonl" (une question par ligne, lue à la demande : grandes banques)
+QUESTION_BANK_CACHE_SUFFIX = ".bank"  # Banque compilée (ou index des lignes) mise en cache à côté de QUESTIONS_FILE (pickle)
+QUESTION_BANK_LRU_SIZE = 256      # Questions JSON Lines gardées en mémoire après lecture
 
 # === PARAMÈTRES INTERFACE ===
 WINDOW_TITLE = "NovaQA"
 WINDOW_GEOMETRY = (100, 100, 800, 600)
-AMBIANCE_VOLUME = 0.15
\ No newline at end of file
+AMBIANCE_VOLUME = 0.15
+LEVEL_WARNING_DISPLAY_MS = 3000  # Durée d'affichage d'un conseil de niveau dans le voyant
\ No newline at end of file
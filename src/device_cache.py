@@ -0,0 +1,212 @@
+"""
+Cache persistant des capacités des périphériques audio pour NovaQA
+Évite de re-sonder les fréquences supportées à chaque validation de micro
+"""
+
+import json
+import os
+import sounddevice as sd
+
+from .config import DEVICE_CACHE_FILE, CANDIDATE_SAMPLERATES, DTYPE
+from .rt_dsp import stream_dtype
+
+
+class DeviceCapabilityCache:
+    """Capacités d'entrée par périphérique, clé = nom + host API + fréquence par défaut
+
+    Chaque entrée (`<clé>|<dtype sondé>`) mémorise les fréquences et nombres de
+    canaux acceptés pour le format de capture DTYPE ainsi que les latences
+    mesurées à l'ouverture des flux ; les entrées `input|<clé>` et
+    `output|<clé>` gardent le palier blocksize/latence du réglage automatique.
+    Le cache est sauvegardé sur disque : après le premier lancement, la
+    sélection d'un micro est immédiate.
+    La liste des périphériques (sd.query_devices) est elle aussi gardée en mémoire
+    jusqu'au prochain refresh().
+
+    Invalidation : au refresh() (bouton REFRESH) pour les périphériques apparus
+    ou disparus, et à chaque échec d'ouverture d'un flux d'entrée
+    (invalidate()). PortAudio ne notifie pas les branchements : un micro
+    remplacé par un modèle identique (même nom, API hôte et fréquence) garde
+    son entrée jusqu'à ce que l'ouverture de son flux échoue.
+    """
+
+    def __init__(self, path=DEVICE_CACHE_FILE):
+        self.path = path
+        self._entries = {}
+        self._devices = None
+        self._hostapis = None
+        self._load()
+
+    # === Liste des périphériques ===
+
+    def _snapshot(self):
+        if self._devices is None:
+            self._devices = sd.query_devices()
+            self._hostapis = sd.query_hostapis()
+
+    def devices(self):
+        """Liste des périphériques (équivalent mis en cache de sd.query_devices())"""
+        self._snapshot()
+        return self._devices
+
+    def hostapis(self):
+        self._snapshot()
+        return self._hostapis
+
+    def device_info(self, index):
+        """Informations d'un périphérique (équivalent de sd.query_devices(index))"""
+        return self.devices()[index]
+
+    def key(self, index):
+        dev = self.device_info(index)
+        host_name = self.hostapis()[dev['hostapi']]['name']
+        return f"{dev['name']}|{host_name}|{int(dev.get('default_samplerate', 0) or 0)}"
+
+    def capability_key(self, index):
+        """Clé des capacités : périphérique + dtype de capture sondé (float32, int16, int32)"""
+        return f"{self.key(index)}|{stream_dtype(DTYPE)}"
+
+    def refresh(self):
+        """Relit la liste des périphériques (bouton REFRESH)
+
+        En cas de branchement/débranchement, les entrées des périphériques
+        apparus ou disparus sont invalidées pour être re-sondées.
+        """
+        old_keys = self._input_keys() if self._devices is not None else None
+        self._devices = None
+        self._hostapis = None
+        if old_keys is None:
+            return
+        new_keys = self._input_keys()
+        changed = old_keys ^ new_keys
+        if changed:
+            print(f"🔌 [DEVICES] Changement de périphériques détecté ({len(changed)})")
+            for key in changed:
+                self._drop_capabilities(key)
+            self._save()
+
+    def invalidate(self, index):
+        """Oublie les capacités d'un périphérique et la liste des périphériques
+
+        Appelé quand l'ouverture d'un flux échoue : le micro a pu être débranché
+        ou remplacé, il sera re-sondé à la prochaine utilisation.
+        """
+        try:
+            key = self.key(index)
+        except Exception:
+            key = None
+        self._devices = None
+        self._hostapis = None
+        if key is not None and self._drop_capabilities(key):
+            print(f"🔌 [DEVICES] Capacités invalidées: {key}")
+            self._save()
+
+    def _drop_capabilities(self, key):
+        stale = [k for k in self._entries if k.startswith(key + "|")]
+        for k in stale:
+            del self._entries[k]
+        return bool(stale)
+
+    def _input_keys(self):
+        return {self.key(idx) for idx, dev in enumerate(self.devices())
+                if dev.get('max_input_channels', 0) > 0}
+
+    # === Capacités ===
+
+    def capabilities(self, index):
+        """Capacités du périphérique, sondées une seule fois puis lues depuis le cache"""
+        key = self.capability_key(index)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._probe(index)
+            self._entries[key] = entry
+            self._save()
+        return entry
+
+    def best_samplerate(self, index, preferred):
+        """Première fréquence de `preferred` supportée par le périphérique, sinon None"""
+        supported = self.capabilities(index)['supported_rates']
+        for rate in preferred:
+            if int(rate) in supported:
+                return int(rate)
+        return None
+
+    def record_latency(self, index, samplerate, latency):
+        """Mémorise la latence réelle d'un flux ouvert à cette fréquence"""
+        try:
+            entry = self.capabilities(index)
+            entry['measured_latency'][str(int(samplerate))] = float(latency)
+            self._save()
+        except Exception as e:
+            print(f"⚠️ [DEVICES] Latence non mémorisée: {e}")
+
+    def stream_tuning(self, index, kind):
+        """Palier blocksize/latence mémorisé pour ce périphérique et ce sens ('input'/'output')"""
+        try:
+            return self._entries.get(f"{kind}|{self.key(index)}")
+        except Exception:
+            return None
+
+    def record_stream_tuning(self, index, kind, tuning):
+        """Mémorise le palier choisi par le réglage automatique (stream_tuning.py)"""
+        try:
+            self._entries[f"{kind}|{self.key(index)}"] = tuning
+            self._save()
+        except Exception as e:
+            print(f"⚠️ [DEVICES] Réglage de flux non mémorisé: {e}")
+
+    def _probe(self, index):
+        dev = self.device_info(index)
+        native = int(dev.get('default_samplerate', 0) or 0)
+        rates = [native] + [r for r in CANDIDATE_SAMPLERATES if r != native] if native else list(CANDIDATE_SAMPLERATES)
+        print(f"🔍 [DEVICES] Sondage des capacités: {dev['name']}")
+
+        supported_rates = []
+        for rate in rates:
+            try:
+                sd.check_input_settings(device=index, samplerate=rate, channels=1, dtype=stream_dtype(DTYPE))
+                supported_rates.append(rate)
+            except Exception:
+                continue
+
+        channel_counts = []
+        probe_rate = supported_rates[0] if supported_rates else native or None
+        for channels in range(1, min(2, dev.get('max_input_channels', 1)) + 1):
+            try:
+                sd.check_input_settings(device=index, samplerate=probe_rate, channels=channels, dtype=stream_dtype(DTYPE))
+                channel_counts.append(channels)
+            except Exception:
+                continue
+
+        print(f"   ✅ [DEVICES] Fréquences: {supported_rates} - canaux: {channel_counts}")
+        return {
+            'supported_rates': supported_rates,
+            'channel_counts': channel_counts,
+            'default_low_input_latency': dev.get('default_low_input_latency'),
+            'default_high_input_latency': dev.get('default_high_input_latency'),
+            'measured_latency': {},
+        }
+
+    # === Persistance ===
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+        except Exception as e:
+            print(f"⚠️ [DEVICES] Cache illisible, il sera reconstruit: {e}")
+            self._entries = {}
+
+    def _save(self):
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"⚠️ [DEVICES] Sauvegarde du cache impossible: {e}")
+
+
+# Instance globale
+device_cache = DeviceCapabilityCache()
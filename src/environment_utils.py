@@ -2,9 +2,11 @@
 Utilitaires pour la gestion des environnements audio
 """
 
+import time
+
 from .config import (
     QUIET_OFFICE_PROFILE, NOISY_ENVIRONMENT_PROFILE, VU_METER_THRESHOLD,
-    MIN_SILENCE_DURATION_MS, NOISE_FLOOR_LEARNING_SEC
+    NOISE_FLOOR_ADAPTATION, DYNAMIC_SILENCE_DETECTION, NOISY_FLOOR_DB, QUIET_FLOOR_DB
 )
 
 
@@ -14,10 +16,16 @@ class EnvironmentManager:
     def __init__(self):
         self.current_profile = QUIET_OFFICE_PROFILE.copy()
         self.base_threshold = VU_METER_THRESHOLD
+        self.current_threshold = VU_METER_THRESHOLD  # Seuil utilisé par l'enregistreur et la validation micro
+        self.noise_floor = None
+        self.profile_name = "quiet"
+        self._profile_since = time.time()
         
     def set_quiet_environment(self):
         """Configure pour un environnement calme (bureau, maison)"""
         self.current_profile = QUIET_OFFICE_PROFILE.copy()
+        self.profile_name = "quiet"
+        self._profile_since = time.time()
         print("🔇 Profil ENVIRONNEMENT CALME activé")
         print(f"   📊 Seuil: {self.base_threshold} dBFS (base)")
         print(f"   ⏱️ Silence minimum: {self.current_profile['min_silence_ms']}ms")
@@ -26,6 +34,8 @@ class EnvironmentManager:
     def set_noisy_environment(self):
         """Configure pour un environnement bruyant (open space, café)"""
         self.current_profile = NOISY_ENVIRONMENT_PROFILE.copy()
+        self.profile_name = "noisy"
+        self._profile_since = time.time()
         print("🔊 Profil ENVIRONNEMENT BRUYANT activé")
         print(f"   📊 Seuil adaptatif: +{self.current_profile['threshold_offset']} dBFS au-dessus du bruit")
         print(f"   ⏱️ Silence minimum: {self.current_profile['min_silence_ms']}ms (plus long)")
@@ -38,6 +48,28 @@ class EnvironmentManager:
             return max(adapted, self.base_threshold)  # Jamais en dessous du minimum
         return self.base_threshold
     
+    def update_noise_floor(self, noise_floor, learned=True):
+        """Met à jour le seuil courant à partir du bruit de fond mesuré en continu
+
+        Bascule entre profil calme et bruyant avec hystérésis (QUIET_FLOOR_DB /
+        NOISY_FLOOR_DB), sans rebasculer avant la durée d'apprentissage du profil.
+        """
+        if not NOISE_FLOOR_ADAPTATION or not learned:
+            return self.current_threshold
+        self.noise_floor = noise_floor
+        
+        settled = time.time() - self._profile_since >= self.get_learning_duration()
+        if settled and self.profile_name == "quiet" and noise_floor > NOISY_FLOOR_DB:
+            print(f"📈 Bruit de fond {noise_floor:.1f} dBFS > {NOISY_FLOOR_DB} dBFS")
+            self.set_noisy_environment()
+        elif settled and self.profile_name == "noisy" and noise_floor < QUIET_FLOOR_DB:
+            print(f"📉 Bruit de fond {noise_floor:.1f} dBFS < {QUIET_FLOOR_DB} dBFS")
+            self.set_quiet_environment()
+        
+        if DYNAMIC_SILENCE_DETECTION:
+            self.current_threshold = self.get_adapted_threshold(noise_floor)
+        return self.current_threshold
+    
     def get_silence_duration(self):
         """Retourne la durée de silence adaptée à l'environnement"""
         return self.current_profile['min_silence_ms']
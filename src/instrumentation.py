@@ -0,0 +1,223 @@
+"""
+Instrumentation des callbacks audio pour NovaQA
+Histogramme des durées de callback, jitter entre callbacks, xruns par type,
+blocs perdus dans les files et horodatages ADC/DAC de PortAudio. Lecture par
+snapshot() depuis n'importe quel thread ; export JSON optionnel par session.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+
+from .config import CALLBACK_LOAD_MAX, INSTRUMENTATION_DUMP, INSTRUMENTATION_FOLDER
+
+
+WARMUP_CALLBACKS = 4  # Premiers blocs ignorés (amorçage du flux : xruns d'ouverture sans signification)
+
+# Bornes supérieures (µs) des classes de l'histogramme des durées de callback
+DURATION_BINS_US = (50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000)
+
+_XRUN_FLAGS = ('input_overflow', 'input_underflow', 'output_overflow', 'output_underflow', 'priming_output')
+
+
+class CallbackProbe:
+    """Mesures d'un flux, mises à jour par son callback
+
+    record() ne fait que des additions, comparaisons et une recherche
+    dichotomique dans un tuple : il peut être appelé à chaque bloc depuis le
+    thread audio. Les lectures concurrentes (snapshot) peuvent voir un bloc de
+    décalage entre compteurs, jamais de valeur corrompue.
+    """
+
+    def __init__(self, name, samplerate, blocksize):
+        self.name = name
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.opened_at = time.time()
+        self.callbacks = 0
+        self.frames = 0
+        self.xruns = 0
+        self.flags = dict.fromkeys(_XRUN_FLAGS, 0)
+        self.overloads = 0    # Blocs dont le callback a dépassé CALLBACK_LOAD_MAX du budget
+        self.load_sum = 0.0
+        self.load_peak = 0.0
+        self.duration_hist = [0] * (len(DURATION_BINS_US) + 1)
+        self.duration_max_us = 0.0
+        self.jitter_sum_sq = 0.0  # Écart (s²) entre l'intervalle réel de deux callbacks et la durée du bloc
+        self.jitter_max = 0.0
+        self.jitter_count = 0
+        self.first_stream_time = None  # Premier/dernier horodatage ADC (entrée) ou DAC (sortie)
+        self.last_stream_time = None
+        self._first_stream_frame = 0
+        self._stream_frames = 0        # Échantillons reçus entre ces deux horodatages (dérive horloge du flux)
+        self.latency_min = None        # Écart currentTime <-> ADC/DAC : latence vue par le callback
+        self.latency_max = None
+        self._last_start = None
+
+    def record(self, frames, status, started, elapsed, stream_time=None, current_time=None):
+        """Compte un bloc
+
+        `started` / `elapsed` : perf_counter() à l'entrée et durée du callback (s) ;
+        `stream_time` : inputBufferAdcTime ou outputBufferDacTime du bloc ;
+        `current_time` : time_info.currentTime (même horloge).
+        """
+        self.callbacks += 1
+        last_start, self._last_start = self._last_start, started
+        if self.callbacks <= WARMUP_CALLBACKS or not frames:
+            return
+        self.frames += frames
+        if status:
+            self.xruns += 1
+            for flag in _XRUN_FLAGS:
+                if getattr(status, flag, False):
+                    self.flags[flag] += 1
+
+        load = elapsed * self.samplerate / frames
+        self.load_sum += load
+        if load > self.load_peak:
+            self.load_peak = load
+        if load > CALLBACK_LOAD_MAX:
+            self.overloads += 1
+        elapsed_us = elapsed * 1e6
+        self.duration_hist[bisect_right(DURATION_BINS_US, elapsed_us)] += 1
+        if elapsed_us > self.duration_max_us:
+            self.duration_max_us = elapsed_us
+
+        if last_start is not None:
+            jitter = abs(started - last_start - frames / self.samplerate)
+            self.jitter_sum_sq += jitter * jitter
+            self.jitter_count += 1
+            if jitter > self.jitter_max:
+                self.jitter_max = jitter
+
+        if stream_time:
+            if self.first_stream_time is None:
+                self.first_stream_time = stream_time
+                self._first_stream_frame = self.frames - frames
+            self.last_stream_time = stream_time
+            self._stream_frames = self.frames - frames - self._first_stream_frame
+            if current_time:
+                latency = abs(stream_time - current_time)
+                if self.latency_min is None or latency < self.latency_min:
+                    self.latency_min = latency
+                if self.latency_max is None or latency > self.latency_max:
+                    self.latency_max = latency
+
+    @property
+    def seconds(self):
+        return self.frames / self.samplerate if self.samplerate else 0.0
+
+    @property
+    def measured_callbacks(self):
+        return max(0, self.callbacks - WARMUP_CALLBACKS)
+
+    def summary(self):
+        """Bilan compact (utilisé par stream_tuning pour choisir le palier suivant)"""
+        n = self.measured_callbacks
+        seconds = self.seconds
+        return {
+            "seconds": round(seconds, 1),
+            "blocksize": self.blocksize,
+            "xruns": self.xruns,
+            "xruns_per_min": round(self.xruns * 60.0 / seconds, 2) if seconds else 0.0,
+            "load_mean": round(self.load_sum / n, 3) if n else 0.0,
+            "load_peak": round(self.load_peak, 3),
+            "overload_ratio": round(self.overloads / n, 4) if n else 0.0,
+        }
+
+    def snapshot(self):
+        """Toutes les mesures du flux (dictionnaire sérialisable en JSON)"""
+        labels = [f"<={b}us" for b in DURATION_BINS_US] + [f">{DURATION_BINS_US[-1]}us"]
+        stream_span = (self.last_stream_time - self.first_stream_time
+                       if self.first_stream_time is not None else 0.0)
+        drift = stream_span - self._stream_frames / self.samplerate if stream_span else 0.0
+        snapshot = self.summary()
+        snapshot.update({
+            "name": self.name,
+            "samplerate": self.samplerate,
+            "opened_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.opened_at)),
+            "callbacks": self.callbacks,
+            "flags": dict(self.flags),
+            "duration_hist": dict(zip(labels, list(self.duration_hist))),
+            "duration_max_us": round(self.duration_max_us, 1),
+            "budget_us": round(self.blocksize / self.samplerate * 1e6, 1) if self.samplerate else 0.0,
+            "jitter_rms_ms": round((self.jitter_sum_sq / self.jitter_count) ** 0.5 * 1000, 3) if self.jitter_count else 0.0,
+            "jitter_max_ms": round(self.jitter_max * 1000, 3),
+            "stream_clock_span_s": round(stream_span, 3),
+            "stream_clock_drift_ms": round(drift * 1000, 3),
+            "latency_min_ms": round(self.latency_min * 1000, 2) if self.latency_min is not None else None,
+            "latency_max_ms": round(self.latency_max * 1000, 2) if self.latency_max is not None else None,
+        })
+        return snapshot
+
+
+class Instrumentation:
+    """Registre des sondes de flux et des compteurs de blocs perdus de l'application
+
+    Une sonde par flux ouvert ('capture', 'playback') ; à la fermeture du flux
+    elle rejoint l'historique de la session, écrit en JSON si INSTRUMENTATION_DUMP.
+    """
+
+    def __init__(self):
+        self.session_started = time.strftime("%Y%m%d_%H%M%S")
+        self._probes = {}
+        self._closed = []
+        self.drops = {}  # Blocs perdus par file ('take_writer', 'meter_ring'...)
+        self._lock = threading.Lock()
+
+    def open_probe(self, name, samplerate, blocksize):
+        """Crée la sonde d'un flux qui s'ouvre (remplace la précédente du même nom)"""
+        probe = CallbackProbe(name, samplerate, blocksize)
+        with self._lock:
+            self._probes[name] = probe
+        return probe
+
+    def close_probe(self, probe):
+        """Archive la sonde d'un flux fermé et exporte la session si demandé"""
+        if probe is None:
+            return
+        with self._lock:
+            if self._probes.get(probe.name) is probe:
+                del self._probes[probe.name]
+            self._closed.append(probe.snapshot())
+        if INSTRUMENTATION_DUMP:
+            self.dump()
+
+    def count_drops(self, queue_name, blocks):
+        """Ajoute des blocs perdus par une file (hors thread audio)"""
+        if blocks > 0:
+            with self._lock:
+                self.drops[queue_name] = self.drops.get(queue_name, 0) + int(blocks)
+
+    def snapshot(self):
+        """État courant : flux ouverts, flux fermés de la session et blocs perdus"""
+        with self._lock:
+            probes = list(self._probes.values())
+            closed = list(self._closed)
+            drops = dict(self.drops)
+        return {
+            "session": self.session_started,
+            "streams": {probe.name: probe.snapshot() for probe in probes},
+            "closed_streams": closed,
+            "drops": drops,
+        }
+
+    def dump(self, folder=INSTRUMENTATION_FOLDER):
+        """Écrit le snapshot de la session dans `<folder>/session_<date>.json` ; retourne le chemin"""
+        path = os.path.join(folder, f"session_{self.session_started}.json")
+        try:
+            os.makedirs(folder, exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+            os.replace(tmp, path)
+            return path
+        except Exception as e:
+            print(f"⚠️ [INSTRUMENTATION] Export impossible: {e}")
+            return None
+
+
+# Instance globale
+instrumentation = Instrumentation()
@@ -7,9 +7,14 @@ import os
 from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QMessageBox
 
-from .config import DELAY_BEFORE_REPLY_MS, GENERATED_FOLDER, RESPONSE_FOLDER
-from .audio_workers import AudioPlayer, ResponseRecorder
+from .config import DELAY_BEFORE_REPLY_MS, GENERATED_FOLDER, RESPONSE_FOLDER, TAKE_EXPORT_FOLDER
+from .audio_workers import AudioPlayer, ResponseRecorder, TakeExporter
 from .question_manager import count_existing_responses
+from .take_writer import RESPONSE_EXTENSIONS, PART_SUFFIX, JOURNAL_SUFFIX, STATS_SUFFIX
+from .capture_hub import capture_hub
+from .playback_engine import playback_engine
+from .session_manifest import session_manifest
+from .prompt_cache import prompt_prefetcher
 
 
 class InterviewMixin:
@@ -49,19 +54,19 @@ class InterviewMixin:
             current = self.question_manager.get_current_question_number()
             total = self.question_manager.get_total_questions()
             
-            # Vérifier s'il y a des réponses existantes
-            responses_count = count_existing_responses()
-            if responses_count > 0 and current > 1:
-                self.question_counter.setText(f"Question {current}/{total} (Reprise - {responses_count} déjà répondues)")
+            # Couverture réelle (masque des questions répondues, trous compris)
+            responses_count = self.question_manager.answered_count()
+            if responses_count > 0:
+                self.question_counter.setText(f"Question {current}/{total} ({responses_count}/{total} répondues)")
             else:
                 self.question_counter.setText(f"Question {current}/{total}")
             
             # Affichage du texte de la question
-            question_text = question_data['question']
+            question_text = question_data.text
             self.question_display.setText(f"📝 {question_text}")
             
             # Lecture de l'audio de la question
-            audio_file = f"{GENERATED_FOLDER}/{question_data['file_question']}"
+            audio_file = f"{GENERATED_FOLDER}/{question_data.file_question}"
             if os.path.exists(audio_file):
                 self.play_question_audio(audio_file)
             else:
@@ -70,7 +75,20 @@ class InterviewMixin:
             # Mise à jour bouton suivant
             self.next_btn.setEnabled(self.question_manager.has_next_question())
             
-            print(f"🎤 Question {current}: {question_text}")
+            # Préparer en fond la réponse de Swan et la question suivante
+            self._prefetch_upcoming(question_data)
+            
+            duration = question_data.question_duration
+            print(f"🎤 Question {current}: {question_text}" + (f" (🔊 {duration:.1f}s)" if duration else ""))
+    
+    def _prefetch_upcoming(self, question_data):
+        """Décode en arrière-plan la réponse courante et la prochaine question sans réponse pendant que l'utilisateur répond"""
+        paths = [f"{GENERATED_FOLDER}/{question_data.file_reply}"]
+        next_index = self.question_manager.next_unanswered_index()
+        next_data = self.question_manager.get_question(next_index) if next_index is not None else None
+        if next_data:
+            paths.append(f"{GENERATED_FOLDER}/{next_data.file_question}")
+        prompt_prefetcher.prefetch(*paths)
     
     def play_question_audio(self, audio_file):
         """Joue l'audio de la question"""
@@ -90,9 +108,15 @@ class InterviewMixin:
         """Appelé quand l'audio de la question est terminé - Démarre l'enregistrement de la réponse"""
         print("🔊 [INTERFACE] Question audio terminée")
         print("🎤 [INTERFACE] Démarrage de l'enregistrement de la réponse...")
-        self.start_response_recording()
+        
+        # Point de départ de la prise = dernier échantillon de la question (pré-roll)
+        end_time = getattr(self.current_audio_player, 'end_time', None)
+        start_frame = capture_hub.frame_at_time(end_time, playback_engine.output_latency)
+        if start_frame is None and capture_hub.is_running():
+            start_frame = capture_hub.frames_captured
+        self.start_response_recording(start_frame)
     
-    def start_response_recording(self):
+    def start_response_recording(self, start_frame=None):
         """Démarre l'enregistrement de la réponse utilisateur"""
         try:
             print("🔄 [INTERFACE] Préparation enregistrement réponse...")
@@ -100,11 +124,10 @@ class InterviewMixin:
             # Obtenir le numéro de question actuel
             question_number = self.question_manager.get_current_question_number()
             
-            # Arrêter l'enregistrement précédent s'il existe
+            # Arrêter l'enregistrement précédent s'il existe (sa finalisation continue en arrière-plan)
             if hasattr(self, 'response_recorder') and self.response_recorder:
                 print("🛑 [INTERFACE] Arrêt enregistrement précédent...")
-                self.response_recorder.stop_recording()
-                self.response_recorder.wait()
+                self._stop_response_recorder()
             
             # Créer le nouvel enregistreur (mode manuel supprimé)
             device_index = None
@@ -118,13 +141,15 @@ class InterviewMixin:
             if preferred_samplerate:
                 print(f"📊 [INTERFACE] Utilisation fréquence pré-testée: {preferred_samplerate}Hz")
             
-            self.response_recorder = ResponseRecorder(question_number, device_index, preferred_samplerate)
+            self.response_recorder = ResponseRecorder(question_number, device_index, preferred_samplerate, start_frame)
             
             # Connecter les signaux
             self.response_recorder.recording_started.connect(self.on_recording_started)
             self.response_recorder.recording_finished.connect(self.on_recording_finished)
             self.response_recorder.speech_detected.connect(self.on_speech_detected)
             self.response_recorder.silence_detected.connect(self.on_silence_detected)
+            self.response_recorder.end_of_answer.connect(self.on_end_of_answer)
+            self.response_recorder.level_warning.connect(self.on_level_warning)
             
             # Démarrer l'enregistrement
             print("▶️ [INTERFACE] Lancement du thread d'enregistrement...")
@@ -133,6 +158,24 @@ class InterviewMixin:
         except Exception as e:
             print(f"❌ [INTERFACE] Erreur démarrage enregistrement: {e}")
     
+    def _stop_response_recorder(self):
+        """Demande l'arrêt de l'enregistreur courant sans bloquer la boucle Qt
+
+        Le fichier est finalisé dans le thread de l'enregistreur ; une référence
+        est gardée jusqu'à la fin de ce thread.
+        """
+        recorder = self.response_recorder
+        recorder.stop_recording()
+        if recorder.isRunning() and recorder not in self._finishing_recorders:
+            self._finishing_recorders.add(recorder)
+            recorder.finished.connect(self._on_recorder_thread_finished)
+    
+    def _on_recorder_thread_finished(self):
+        """Fin du thread d'un enregistreur arrêté (slot exécuté dans le thread Qt)"""
+        self._finishing_recorders.discard(self.sender())
+        if self._end_pending and not self._finishing_recorders:
+            self.end_interview()
+    
     def on_recording_started(self):
         """Appelé quand l'enregistrement a vraiment commencé"""
         print("✅ [INTERFACE] Signal reçu: enregistrement confirmé démarré")
@@ -141,6 +184,11 @@ class InterviewMixin:
     def on_recording_finished(self, file_path):
         """Appelé quand l'enregistrement est terminé"""
         print(f"📁 [INTERFACE] Signal reçu: enregistrement terminé -> {file_path}")
+        recorder = self.sender()
+        if recorder is not None:
+            self.question_manager.mark_answered(recorder.question_number - 1)
+        if recorder is not self.response_recorder:
+            return  # Finalisation d'une prise précédente : l'enregistrement courant continue
         self.hide_recording_indicator()  # Masquer le voyant
         print("=" * 60)
         print("🎯 [INTERFACE] RÉPONSE ENREGISTRÉE AVEC SUCCÈS !")
@@ -157,22 +205,37 @@ class InterviewMixin:
         """Appelé quand un silence prolongé est détecté"""
         print("🤫 [INTERFACE] Signal reçu: silence prolongé détecté")
     
+    def on_end_of_answer(self):
+        """Appelé quand la VAD a arrêté l'enregistrement : enchaîne comme le bouton 'QUESTION TERMINÉE'"""
+        if self.sender() is not self.response_recorder:
+            return  # Signal tardif d'un enregistreur précédent
+        print("⏹️ [INTERFACE] Fin de réponse détectée automatiquement")
+        if self.end_question_btn.isEnabled():
+            self.end_current_question()
+    
+    def on_level_warning(self, kind, message):
+        """Conseil de niveau en direct (écrêtage, trop fort, trop faible)"""
+        if self.sender() is not self.response_recorder:
+            return
+        print(f"📢 [INTERFACE] Avertissement niveau ({kind}): {message}")
+        self.show_level_warning(message)
+    
     def update_resume_status(self):
         """Met à jour l'affichage avec l'état de reprise détecté"""
         try:
             current = self.question_manager.get_current_question_number()
             total = self.question_manager.get_total_questions()
-            responses_count = count_existing_responses()
+            responses_count = self.question_manager.answered_count()
             
             # Mettre à jour le compteur
-            if responses_count > 0 and current > 1:
-                self.question_counter.setText(f"Question {current}/{total} (Reprise - {responses_count} déjà répondues)")
+            if responses_count > 0:
+                self.question_counter.setText(f"Question {current}/{total} ({responses_count}/{total} répondues)")
                 
                 # Message d'information dans l'affichage
-                if current <= total:
+                if responses_count < total:
                     self.question_display.setText(
                         f"🔄 REPRISE AUTOMATIQUE DÉTECTÉE\n\n"
-                        f"📊 {responses_count} réponses déjà enregistrées\n"
+                        f"📊 {responses_count}/{total} réponses déjà enregistrées\n"
                         f"➡️  Prêt à reprendre à la question {current}\n\n"
                         f"Validez votre microphone puis cliquez sur 'COMMENCER L'INTERVIEW'"
                     )
@@ -213,17 +276,17 @@ class InterviewMixin:
             # Arrêter l'enregistrement en cours
             if hasattr(self, 'response_recorder') and self.response_recorder:
                 print("🛑 [INTERFACE] Demande d'arrêt de l'enregistrement...")
-                self.response_recorder.stop_recording()
+                self._stop_response_recorder()
                 self.hide_recording_indicator()  # Masquer le voyant
             
             # Afficher la réponse dans l'interface
-            reply_text = question_data['reply']
+            reply_text = question_data.reply
             current = self.question_manager.get_current_question_number()
             self.question_display.setText(f"💬 Swan: {reply_text}")
             
-            # Jouer l'audio de la réponse après un petit délai
-            print("⏱️ [INTERFACE] Délai 500ms avant lecture réponse Swan...")
-            QTimer.singleShot(500, lambda: self._play_current_reply(question_data))
+            # Jouer l'audio de la réponse : le délai est un silence programmé par le moteur
+            print(f"⏱️ [INTERFACE] Délai {DELAY_BEFORE_REPLY_MS}ms avant lecture réponse Swan...")
+            self._play_current_reply(question_data)
             
             # Désactiver temporairement les boutons
             self.end_question_btn.setEnabled(False)
@@ -236,10 +299,10 @@ class InterviewMixin:
         print("🔊 [INTERFACE] Début lecture réponse Swan...")
         
         # Jouer l'audio de la réponse
-        audio_file = f"{GENERATED_FOLDER}/{question_data['file_reply']}"
+        audio_file = f"{GENERATED_FOLDER}/{question_data.file_reply}"
         if os.path.exists(audio_file):
             print(f"📂 [INTERFACE] Fichier audio trouvé: {audio_file}")
-            self.current_audio_player = AudioPlayer(audio_file)
+            self.current_audio_player = AudioPlayer(audio_file, lead_in_ms=DELAY_BEFORE_REPLY_MS)
             # Connecter le signal pour attendre la fin AVANT de continuer
             self.current_audio_player.finished.connect(self.on_reply_finished)
             self.current_audio_player.start()
@@ -269,8 +332,7 @@ class InterviewMixin:
         # ARRÊTER D'ABORD L'ENREGISTREMENT EN COURS
         if hasattr(self, 'response_recorder') and self.response_recorder:
             print("🛑 [INTERFACE] Arrêt enregistrement avant question suivante...")
-            self.response_recorder.stop_recording()
-            self.response_recorder.wait()  # Attendre que l'arrêt soit effectif
+            self._stop_response_recorder()  # Sans attendre : recording_finished signale le fichier prêt
         
         if self.question_manager.has_next_question():
             print("➡️ [INTERFACE] Passage à la question suivante...")
@@ -286,12 +348,31 @@ class InterviewMixin:
             self.end_interview()
     
     def end_interview(self):
-        """Termine l'interview"""
+        """Termine l'interview, une fois les prises en cours consignées dans le manifeste"""
         self.interview_started = False
         
+        # Le décompte et l'export lisent le manifeste : la dernière prise n'y est
+        # qu'après record_take(), à la fin du thread de son enregistreur
+        if self._finishing_recorders:
+            print(f"⏳ [INTERFACE] Fin de l'interview après finalisation de {len(self._finishing_recorders)} prise(s)")
+            self._end_pending = True
+            self.next_btn.setEnabled(False)
+            self.question_display.setText("⏳ Finalisation de la dernière réponse...")
+            return
+        self._end_pending = False
+        
         # Compter les réponses enregistrées
         total_responses = count_existing_responses()
-        self.question_display.setText(f"🎉 Interview terminée ! {total_responses} réponses enregistrées dans {RESPONSE_FOLDER}/")
+        total = self.question_manager.get_total_questions()
+        print(f"📊 [PREFETCH] {prompt_prefetcher.stats()}")
+        
+        # Meilleure prise de chaque question (score calculé à l'enregistrement, sans décodage),
+        # copiée en arrière-plan
+        self._end_summary = f"🎉 Interview terminée ! {total_responses}/{total} réponses enregistrées dans {RESPONSE_FOLDER}/"
+        self.question_display.setText(f"{self._end_summary}\n⏳ Export des meilleures prises...")
+        self._take_exporter = TakeExporter()
+        self._take_exporter.exported.connect(self._on_takes_exported)
+        self._take_exporter.start()
         self.question_counter.setText("Interview terminée")
         
         # Réactivation des boutons
@@ -305,6 +386,13 @@ class InterviewMixin:
             self.current_audio_player.stop()
             self.current_audio_player.wait()
     
+    def _on_takes_exported(self, exported):
+        """Fin de l'export des meilleures prises (slot exécuté dans le thread Qt)"""
+        if self.interview_started:
+            return  # Nouvelle interview commencée entre-temps : ne pas écraser son affichage
+        self.question_display.setText(
+            f"{self._end_summary}\n🏆 Meilleure prise de {exported} questions copiée dans {TAKE_EXPORT_FOLDER}/")
+    
     def reset_interview(self):
         """Remet l'interview à zéro en supprimant toutes les réponses"""
         
@@ -326,17 +414,24 @@ class InterviewMixin:
                 deleted_count = 0
                 if os.path.exists(RESPONSE_FOLDER):
                     for filename in os.listdir(RESPONSE_FOLDER):
-                        if filename.startswith("reponse_") and filename.endswith(".wav"):
+                        if filename.startswith("reponse_") and filename.endswith(RESPONSE_EXTENSIONS + (PART_SUFFIX, JOURNAL_SUFFIX, STATS_SUFFIX)):
                             file_path = os.path.join(RESPONSE_FOLDER, filename)
                             os.remove(file_path)
                             deleted_count += 1
                             print(f"🗑️  Supprimé: {filename}")
                 
-                # Réinitialiser le QuestionManager à l'index 0
-                self.question_manager.current_index = 0
+                # Exports de la session effacée (après la fin d'un export en cours)
+                if self._take_exporter is not None:
+                    self._take_exporter.wait()
+                deleted_count += session_manifest.clear_export()
+                
+                session_manifest.clear()
+                
+                # Réinitialiser le QuestionManager à l'index 0 (masque des réponses vidé)
+                self.question_manager.reset()
                 
                 # Réinitialiser l'affichage
-                self.question_counter.setText("Question 1/60")
+                self.question_counter.setText(f"Question 1/{self.question_manager.get_total_questions()}")
                 self.question_display.setText("📋 Interview remise à zéro. Prêt à recommencer !")
                 
                 print(f"✅ Interview remise à zéro - {deleted_count} fichiers supprimés")
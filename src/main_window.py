@@ -12,14 +12,19 @@ from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QPalette, QColor
 
 from .config import (
-    WINDOW_TITLE, WINDOW_GEOMETRY, VU_METER_THRESHOLD, VU_METER_VALIDATION_TIME,
+    WINDOW_TITLE, WINDOW_GEOMETRY, VU_METER_VALIDATION_TIME,
     SILENCE_DEBOUNCE_MS, DELAY_BEFORE_REPLY_MS, DISCLAIMER_FILE, INTRO_FILE,
-    AMBIANCE_FILE, GENERATED_FOLDER, RESPONSE_FOLDER
+    AMBIANCE_FILE, GENERATED_FOLDER, RESPONSE_FOLDER, CANDIDATE_SAMPLERATES,
+    LEVEL_WARNING_DISPLAY_MS
 )
 from .question_manager import QuestionManager, list_input_devices, count_existing_responses
 from .widgets import AudioMeterWidget, WarningPopup
 from .audio_workers import AudioWorker, ResponseRecorder, AudioPlayer, AmbiancePlayer
 from .interview_mixin import InterviewMixin
+from .capture_hub import capture_hub
+from .environment_utils import environment_manager
+from .device_cache import device_cache
+from .playback_engine import playback_engine
 
 
 class MainWindow(QMainWindow, InterviewMixin):
@@ -35,6 +40,10 @@ class MainWindow(QMainWindow, InterviewMixin):
         
         self.current_audio_player = None
         self.response_recorder = None  # Enregistreur de réponse
+        self._finishing_recorders = set()  # Enregistreurs arrêtés dont le fichier est en cours de finalisation
+        self._end_pending = False  # Fin d'interview demandée, en attente de la finalisation des prises
+        self._take_exporter = None  # Export des meilleures prises en cours (fin d'interview)
+        self._end_summary = ""
         self.interview_started = False
         self.microphone_active = False
         self.vu_meter_validated = False  # Une fois validé, reste vrai
@@ -166,7 +175,7 @@ class MainWindow(QMainWindow, InterviewMixin):
         main_layout.addWidget(device_group)
         
         # Section vue-mètre
-        meter_group = QGroupBox("VU-MÈTRE RMS dBFS")
+        meter_group = QGroupBox("VU-MÈTRE RMS / CRÊTE / LUFS")
         meter_layout = QVBoxLayout(meter_group)
         
         self.meter = AudioMeterWidget()
@@ -197,7 +206,7 @@ class MainWindow(QMainWindow, InterviewMixin):
         interview_layout.addWidget(self.reset_interview_btn)
         
         # Compteur de questions
-        self.question_counter = QLabel("Question 0/60")
+        self.question_counter = QLabel(f"Question 0/{self.question_manager.get_total_questions()}")
         self.question_counter.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.question_counter.setStyleSheet("color: #ff9f1c; font-weight: bold; font-size: 14px;")
         interview_layout.addWidget(self.question_counter)
@@ -229,7 +238,7 @@ class MainWindow(QMainWindow, InterviewMixin):
         # Voyant d'enregistrement
         self.recording_indicator = QLabel("🎤 VOUS POUVEZ PARLER")
         self.recording_indicator.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.recording_indicator.setStyleSheet("""
+        self._recording_indicator_style = """
             background-color: #28a745;
             color: white;
             font-weight: bold;
@@ -237,8 +246,14 @@ class MainWindow(QMainWindow, InterviewMixin):
             padding: 10px;
             border-radius: 5px;
             margin: 5px 0;
-        """)
+        """
+        self.recording_indicator.setStyleSheet(self._recording_indicator_style)
         self.recording_indicator.hide()  # Caché par défaut
+        
+        # Retour au voyant normal après un conseil de niveau
+        self._level_warning_timer = QTimer(self)
+        self._level_warning_timer.setSingleShot(True)
+        self._level_warning_timer.timeout.connect(self._restore_recording_indicator)
         interview_layout.addWidget(self.recording_indicator)
         
         main_layout.addWidget(interview_group)
@@ -248,7 +263,7 @@ class MainWindow(QMainWindow, InterviewMixin):
     def setup_audio(self):
         try:
             self.audio_worker = AudioWorker()
-            self.audio_worker.level.connect(self.meter.set_dbfs)
+            self.audio_worker.reading.connect(self.meter.set_reading)
             self.audio_worker.level.connect(self.check_vu_meter_activity)  # Surveiller l'activité
             
             self.refresh_btn.clicked.connect(self.populate_devices)
@@ -266,6 +281,7 @@ class MainWindow(QMainWindow, InterviewMixin):
             
     def populate_devices(self):
         try:
+            device_cache.refresh()  # Relire la liste (branchement/débranchement)
             self.device_combo.clear()
             inputs = list_input_devices()
             if not inputs:
@@ -280,7 +296,6 @@ class MainWindow(QMainWindow, InterviewMixin):
             
     def on_device_changed(self, idx: int):
         try:
-            import sounddevice as sd
             dev_index = self.device_combo.currentData()
             
             if self.audio_worker:
@@ -301,7 +316,7 @@ class MainWindow(QMainWindow, InterviewMixin):
                 self.status_label.setText("Aucun micro sélectionné")
                 return
             
-            dev_info = sd.query_devices(dev_index)
+            dev_info = device_cache.device_info(dev_index)
             device_name = dev_info['name']
             
             self.audio_worker.device_index = dev_index
@@ -327,11 +342,12 @@ class MainWindow(QMainWindow, InterviewMixin):
         else:
             self._debug_counter = 0
         
+        threshold = environment_manager.current_threshold
         if self._debug_counter % 20 == 0:  # Afficher toutes les 20 fois (1 seconde environ)
-            print(f"🔊 Niveau audio: {dbfs:.1f} dBFS (seuil: {VU_METER_THRESHOLD} dBFS)")
+            print(f"🔊 Niveau audio: {dbfs:.1f} dBFS (seuil: {threshold:.1f} dBFS)")
             
-        # Seuil d'activité : utiliser la variable globale
-        if dbfs > VU_METER_THRESHOLD:
+        # Seuil d'activité : adapté en continu au bruit de fond
+        if dbfs > threshold:
             # Activité détectée - annuler le timer de silence s'il existe
             if self.silence_debounce_timer is not None:
                 self.silence_debounce_timer.stop()
@@ -380,42 +396,28 @@ class MainWindow(QMainWindow, InterviewMixin):
         
         print("🔍 [FREQ-TEST] Détection de la meilleure fréquence audio...")
         
-        # Fréquences à tester par ordre de préférence
-        from .config import RESPONSE_SAMPLE_RATE
-        preferred_samplerates = [RESPONSE_SAMPLE_RATE, 48000, 22050, 16000, 8000]
-        
-        # Ajouter la fréquence native du device
+        # Fréquences à tester par ordre de préférence, fréquence native du device en tête
+        preferred_samplerates = list(CANDIDATE_SAMPLERATES)
+        best_frequency = None
         try:
-            import sounddevice as sd
-            dev_info = sd.query_devices(self.audio_worker.device_index)
+            dev_info = device_cache.device_info(self.audio_worker.device_index)
             device_samplerate = int(dev_info.get('default_samplerate', 44100))
             if device_samplerate not in preferred_samplerates:
                 preferred_samplerates.insert(0, device_samplerate)
             print(f"📊 [FREQ-TEST] Fréquence native device: {device_samplerate}Hz")
+            
+            # Capacités sondées au premier lancement puis lues depuis le cache
+            best_frequency = device_cache.best_samplerate(self.audio_worker.device_index, preferred_samplerates)
         except Exception as e:
             print(f"⚠️ [FREQ-TEST] Erreur lecture info device: {e}")
         
-        # Tester chaque fréquence
-        best_frequency = None
-        for test_rate in preferred_samplerates:
-            try:
-                sd.check_input_settings(
-                    device=self.audio_worker.device_index, 
-                    samplerate=test_rate, 
-                    channels=1,
-                    dtype='float32'
-                )
-                best_frequency = test_rate
-                print(f"✅ [FREQ-TEST] {test_rate}Hz supporté")
-                break
-            except Exception as e:
-                print(f"❌ [FREQ-TEST] {test_rate}Hz non supporté: {e}")
-                continue
-        
         if best_frequency:
             # Sauvegarder la meilleure fréquence trouvée
             self.best_audio_frequency = best_frequency
             print(f"🎚️ [FREQ-TEST] Meilleure fréquence sélectionnée: {best_frequency}Hz")
+            # Rouvrir le flux partagé à cette fréquence une fois pour toutes :
+            # les enregistrements s'y abonneront sans rouvrir le périphérique
+            capture_hub.open(self.audio_worker.device_index, best_frequency)
         else:
             print(f"❌ [FREQ-TEST] Aucune fréquence supportée trouvée !")
             self.best_audio_frequency = 44100  # Fallback
@@ -437,7 +439,7 @@ class MainWindow(QMainWindow, InterviewMixin):
                     remaining = self.vu_meter_required_duration - elapsed
                     self.start_interview_btn.setText(f"COMMENCER L'INTERVIEW (Parlez {remaining:.1f}s)")
                 else:
-                    self.start_interview_btn.setText(f"COMMENCER L'INTERVIEW (Parlez {VU_METER_VALIDATION_TIME}s au-dessus de {VU_METER_THRESHOLD}dB)")
+                    self.start_interview_btn.setText(f"COMMENCER L'INTERVIEW (Parlez {VU_METER_VALIDATION_TIME}s au-dessus de {environment_manager.current_threshold:.0f}dB)")
             else:
                 self.start_interview_btn.setText("COMMENCER L'INTERVIEW")
     
@@ -486,7 +488,21 @@ class MainWindow(QMainWindow, InterviewMixin):
     def hide_recording_indicator(self):
         """Masque le voyant d'enregistrement"""  
         print("[INTERFACE] 🔴 Masquage voyant enregistrement")
+        self._level_warning_timer.stop()
+        self._restore_recording_indicator()
         self.recording_indicator.hide()
+    
+    def show_level_warning(self, message):
+        """Affiche un conseil de niveau dans le voyant d'enregistrement pendant quelques secondes"""
+        if not self.recording_indicator.isVisible():
+            return
+        self.recording_indicator.setText(f"⚠️ {message}")
+        self.recording_indicator.setStyleSheet(self._recording_indicator_style.replace("#28a745", "#ff9f1c"))
+        self._level_warning_timer.start(LEVEL_WARNING_DISPLAY_MS)
+    
+    def _restore_recording_indicator(self):
+        self.recording_indicator.setText("🎤 VOUS POUVEZ PARLER")
+        self.recording_indicator.setStyleSheet(self._recording_indicator_style)
             
     def closeEvent(self, event):
         try:
@@ -495,19 +511,27 @@ class MainWindow(QMainWindow, InterviewMixin):
                 self.audio_worker.stop()
             if self.current_audio_player:
                 self.current_audio_player.stop()
-                self.current_audio_player.wait()
             if self.ambiance_player:
                 self.ambiance_player.stop()
                 self.ambiance_player.wait()
+            playback_engine.close()
+            
+            # Laisser les prises en cours se finaliser avant de quitter
+            if self.response_recorder:
+                self.response_recorder.stop_recording()
+            for recorder in [self.response_recorder, *self._finishing_recorders]:
+                if recorder is None:
+                    continue
+                recorder.wait(3000)
+            if self._take_exporter is not None:
+                self._take_exporter.wait()
             
             # Arrêter les timers
             if hasattr(self, 'check_timer'):
                 self.check_timer.stop()
             if self.silence_debounce_timer is not None:
                 self.silence_debounce_timer.stop()
-                
-            import pygame
-            pygame.mixer.quit()
+
         except Exception as e:
             print(f"Erreur fermeture: {e}")
         event.accept()
@@ -0,0 +1,395 @@
+"""
+Mesure de niveau professionnelle pour NovaQA
+Crête échantillon, crête vraie (suréchantillonnage x4), sonie momentanée et
+court terme (LUFS, pondération K selon ITU-R BS.1770) et balistiques
+d'affichage, calculées dans un thread dédié à partir de la file du vue-mètre
+"""
+
+import math
+import threading
+from collections import deque
+from typing import NamedTuple
+import numpy as np
+
+try:
+    from scipy.signal import lfilter  # Optionnel : pondération K exacte par filtrage
+except ImportError:
+    lfilter = None
+
+from .config import (
+    DBFS_FLOOR, UPDATE_INTERVAL_MS, PEAK_HOLD_SEC, PEAK_RELEASE_DB_PER_SEC,
+    RMS_INTEGRATION_MS, CLIP_THRESHOLD_DBFS, TRUE_PEAK_OVERSAMPLING
+)
+
+MOMENTARY_SEC = 0.4   # Fenêtre de la sonie momentanée (BS.1770 / EBU R128)
+SHORT_TERM_SEC = 3.0  # Fenêtre de la sonie court terme
+
+
+class MeterReading(NamedTuple):
+    """Mesures publiées à chaque tick (dB, bornées à DBFS_FLOOR)"""
+    rms_db: float           # RMS brut du tick (dBFS)
+    rms_display_db: float   # RMS avec intégration RMS_INTEGRATION_MS (balistique VU)
+    peak_db: float          # Crête échantillon, attaque instantanée / retour PEAK_RELEASE_DB_PER_SEC
+    true_peak_db: float     # Crête vraie du tick (dBTP)
+    peak_hold_db: float     # Maintien de crête (PEAK_HOLD_SEC)
+    momentary_lufs: float   # Sonie momentanée (400 ms)
+    short_term_lufs: float  # Sonie court terme (3 s)
+    clip_count: int         # Échantillons >= CLIP_THRESHOLD_DBFS depuis l'ouverture
+
+
+def _to_db(value, power=False):
+    if not value > 0.0 or not math.isfinite(value):
+        return DBFS_FLOOR
+    return max(DBFS_FLOOR, (10.0 if power else 20.0) * math.log10(value))
+
+
+def k_weighting_coefficients(samplerate):
+    """Biquads (b, a) de la pondération K : filtre en plateau puis passe-haut RLB
+
+    Coefficients recalculés pour toute fréquence (transformée bilinéaire),
+    identiques à ceux de la norme à 48 kHz.
+    """
+    # Étage 1 : plateau haute fréquence (+4 dB, effet de la tête)
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / samplerate)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf = (
+        np.array([(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]),
+        np.array([1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]),
+    )
+    # Étage 2 : passe-haut (courbe RLB)
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / samplerate)
+    a0 = 1.0 + k / q + k * k
+    highpass = (
+        np.array([1.0, -2.0, 1.0]),
+        np.array([1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]),
+    )
+    return [shelf, highpass]
+
+
+class KWeighting:
+    """Énergie pondérée K d'un bloc (somme des carrés, canaux de poids 1)
+
+    Avec scipy, les deux biquads sont appliqués avec leur état d'un bloc à
+    l'autre. Sans scipy, la réponse |H(f)|² est appliquée au spectre du bloc
+    (Parseval) : approximation suffisante pour l'affichage de la sonie.
+    """
+
+    def __init__(self, samplerate, channels=1):
+        self.samplerate = samplerate
+        self.stages = k_weighting_coefficients(samplerate)
+        self._state = [[np.zeros(2) for _ in self.stages] for _ in range(channels)]
+        self._weights = {}  # Taille de bloc -> pondération spectrale (repli numpy)
+
+    def energy(self, block):
+        if lfilter is not None:
+            total = 0.0
+            for ch in range(block.shape[1]):
+                y = block[:, ch].astype(np.float64)
+                for i, (b, a) in enumerate(self.stages):
+                    y, self._state[ch][i] = lfilter(b, a, y, zi=self._state[ch][i])
+                total += float(np.dot(y, y))
+            return total
+        return self._spectral_energy(block)
+
+    def _spectral_energy(self, block):
+        n = len(block)
+        weights = self._weights.get(n)
+        if weights is None:
+            z = np.exp(-2j * np.pi * np.arange(n // 2 + 1) / n)  # e^-jω pour chaque bin
+            response = np.ones(len(z))
+            for b, a in self.stages:
+                response *= np.abs(np.polyval(b[::-1], z) / np.polyval(a[::-1], z)) ** 2
+            response[1:(n + 1) // 2] *= 2.0  # Spectre unilatéral : bins symétriques comptés deux fois
+            weights = response / n
+            self._weights[n] = weights
+        spectrum = np.abs(np.fft.rfft(block, axis=0)) ** 2
+        return float(np.sum(spectrum * weights[:, None]))
+
+
+class TruePeakDetector:
+    """Crête vraie par suréchantillonnage polyphase (filtre sinc fenêtré, 12 coefficients par phase)"""
+
+    def __init__(self, channels=1, oversampling=TRUE_PEAK_OVERSAMPLING, taps_per_phase=12):
+        taps = oversampling * taps_per_phase
+        n = np.arange(taps) - taps // 2  # La phase 0 retombe exactement sur les échantillons d'origine
+        h = np.sinc(n / oversampling) * np.kaiser(taps, 8.0)
+        self.phases = [h[p::oversampling] / np.sum(h[p::oversampling]) for p in range(oversampling)]
+        self._history = np.zeros((taps_per_phase - 1, channels))
+
+    def process(self, block):
+        """Crête vraie linéaire du bloc (continuité assurée par l'historique)"""
+        x = np.concatenate((self._history, block), axis=0)
+        self._history = x[len(x) - len(self._history):]
+        peak = 0.0
+        for ch in range(x.shape[1]):
+            for phase in self.phases:
+                y = np.convolve(x[:, ch], phase, mode='valid')
+                if len(y):
+                    peak = max(peak, float(np.max(np.abs(y))))
+        return peak
+
+
+class LevelMeter:
+    """Accumule les blocs d'un tick puis produit un MeterReading avec balistiques"""
+
+    def __init__(self, samplerate, channels=1):
+        self.samplerate = samplerate
+        self.k_weighting = KWeighting(samplerate, channels)
+        self.true_peak = TruePeakDetector(channels)
+        self._clip_level = 10.0 ** (CLIP_THRESHOLD_DBFS / 20.0)
+        self._loudness = deque()  # (échantillons, énergie K) par tick, sur SHORT_TERM_SEC
+        self._loudness_frames = 0
+        self.clip_count = 0
+        self._rms_power = 0.0
+        self._peak_db = DBFS_FLOOR
+        self._hold_db = DBFS_FLOOR
+        self._hold_elapsed = 0.0
+        self._begin_tick()
+
+    def _begin_tick(self):
+        self._tick_frames = 0
+        self._tick_peak = 0.0
+        self._tick_true_peak = 0.0
+        self._tick_energy = 0.0
+
+    def process(self, block):
+        """Ajoute un bloc (frames, channels) au tick en cours"""
+        if not len(block):
+            return
+        block_peak = float(np.max(np.abs(block)))
+        self._tick_peak = max(self._tick_peak, block_peak)
+        if block_peak >= self._clip_level:
+            self.clip_count += int(np.count_nonzero(np.abs(block) >= self._clip_level))
+        self._tick_true_peak = max(self._tick_true_peak, block_peak, self.true_peak.process(block))
+        self._tick_energy += self.k_weighting.energy(block)
+        self._tick_frames += len(block)
+
+    def reading(self, rms_power):
+        """Clôt le tick : `rms_power` est la puissance moyenne du tick (totaux de la file)"""
+        frames = self._tick_frames
+        dt = frames / self.samplerate
+        if frames:
+            self._loudness.append((frames, self._tick_energy))
+            self._loudness_frames += frames
+            while self._loudness_frames - self._loudness[0][0] >= SHORT_TERM_SEC * self.samplerate:
+                self._loudness_frames -= self._loudness.popleft()[0]
+
+        # Balistique RMS : intégration exponentielle (type VU)
+        alpha = 1.0 - math.exp(-dt * 1000.0 / RMS_INTEGRATION_MS) if dt else 0.0
+        self._rms_power += alpha * (rms_power - self._rms_power)
+
+        # Balistique crête : attaque instantanée, retour linéaire en dB
+        peak_db = _to_db(self._tick_peak)
+        release = PEAK_RELEASE_DB_PER_SEC * dt
+        self._peak_db = peak_db if peak_db >= self._peak_db else max(peak_db, self._peak_db - release)
+        if peak_db >= self._hold_db:
+            self._hold_db = peak_db
+            self._hold_elapsed = 0.0
+        else:
+            self._hold_elapsed += dt
+            if self._hold_elapsed > PEAK_HOLD_SEC:
+                self._hold_db = max(self._peak_db, self._hold_db - release)
+
+        reading = MeterReading(
+            rms_db=_to_db(rms_power, power=True),
+            rms_display_db=_to_db(self._rms_power, power=True),
+            peak_db=self._peak_db,
+            true_peak_db=_to_db(self._tick_true_peak),
+            peak_hold_db=self._hold_db,
+            momentary_lufs=self._lufs(MOMENTARY_SEC),
+            short_term_lufs=self._lufs(SHORT_TERM_SEC),
+            clip_count=self.clip_count,
+        )
+        self._begin_tick()
+        return reading
+
+    def _lufs(self, window_sec):
+        """Sonie sur les derniers `window_sec` secondes (à la granularité du tick)"""
+        wanted = window_sec * self.samplerate
+        frames = 0
+        energy = 0.0
+        for f, e in reversed(self._loudness):
+            frames += f
+            energy += e
+            if frames >= wanted:
+                break
+        if not frames or not energy > 0.0:
+            return DBFS_FLOOR
+        return max(DBFS_FLOOR, -0.691 + 10.0 * math.log10(energy / frames))
+
+
+class MeterProcessor:
+    """Thread de mesure : lit la file du vue-mètre (vues sans copie) à chaque tick
+
+    L'interface ne fait que lire `latest` (dernier MeterReading publié, avec
+    son numéro `sequence`) : aucun calcul de mesure sur le thread Qt.
+    """
+
+    def __init__(self, interval_ms=UPDATE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self.latest = None
+        self.sequence = 0
+        self._ring = None
+        self._meter = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, ring, samplerate, channels=1):
+        """Démarre la mesure sur une file SpscRingBuffer (dont il devient le consommateur)"""
+        self.stop()
+        self._ring = ring
+        self._meter = LevelMeter(samplerate, channels)
+        self._last_totals = ring.totals
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="MeterProcessor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(1.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"⚠️ [METER] Erreur mesure: {e}")
+
+    def _tick(self):
+        ring = self._ring
+        totals = ring.totals
+        frames = totals[0] - self._last_totals[0]
+        sum_squares = totals[1] - self._last_totals[1]
+        if frames <= 0:
+            return
+        self._last_totals = totals
+        consumed = 0
+        for view in ring.views():
+            self._meter.process(view)
+            consumed += len(view)
+        ring.consume(consumed)
+        # Publication atomique (simple affectation) du tick complet
+        self.latest = self._meter.reading(max(0.0, sum_squares) / (frames * ring.channels))
+        self.sequence += 1
+
+
+class TakeLevelStats:
+    """Statistiques de niveau d'une prise, mises à jour bloc par bloc
+
+    Écrêtage (échantillons et épisodes), crête, RMS global et RMS de parole,
+    facteur de crête, marge et rapport signal/bruit : de quoi juger une prise
+    sans relire l'audio. Le bruit est le RMS des blocs analysés hors parole
+    (avant la première parole et pendant les pauses ; le pré-roll n'est pas
+    analysé), à défaut `noise_floor_db`, le bruit de fond mesuré.
+    """
+
+    def __init__(self, samplerate, noise_floor_db=None):
+        self.samplerate = samplerate
+        self.noise_floor_db = noise_floor_db
+        self._clip_level = 10.0 ** (CLIP_THRESHOLD_DBFS / 20.0)
+        self.frames = 0
+        self.sum_squares = 0.0
+        self.peak = 0.0
+        self.clipped_samples = 0
+        self.clip_events = 0      # Épisodes d'écrêtage (suites d'échantillons écrêtés)
+        self.speech_frames = 0
+        self.speech_sum_squares = 0.0
+        self.noise_frames = 0
+        self.noise_sum_squares = 0.0
+        self.max_block_crest_db = 0.0
+        self._in_clip = False
+
+    def update(self, block, in_speech=False):
+        """Ajoute un bloc ; retourne la crête linéaire du bloc"""
+        n = len(block)
+        if not n:
+            return 0.0
+        flat = block.reshape(-1)
+        magnitude = np.abs(flat)
+        block_peak = float(np.max(magnitude))
+        block_sum = float(np.dot(flat, flat))
+        self.frames += n
+        self.sum_squares += block_sum
+        self.peak = max(self.peak, block_peak)
+        if block_sum > 0.0:
+            crest = 20.0 * math.log10(block_peak / math.sqrt(block_sum / len(flat)))
+            self.max_block_crest_db = max(self.max_block_crest_db, crest)
+
+        if block_peak >= self._clip_level:
+            clipped = magnitude >= self._clip_level
+            self.clipped_samples += int(np.count_nonzero(clipped))
+            # Début d'épisode = écrêté après un échantillon non écrêté (continuité entre blocs)
+            starts = np.count_nonzero(clipped[1:] & ~clipped[:-1])
+            self.clip_events += int(starts) + (1 if clipped[0] and not self._in_clip else 0)
+            self._in_clip = bool(clipped[-1])
+        else:
+            self._in_clip = False
+
+        if in_speech:
+            self.speech_frames += n
+            self.speech_sum_squares += block_sum
+        else:
+            self.noise_frames += n
+            self.noise_sum_squares += block_sum
+        return block_peak
+
+    @property
+    def peak_dbfs(self):
+        return _to_db(self.peak)
+
+    @property
+    def rms_dbfs(self):
+        return _to_db(self.sum_squares / self.frames, power=True) if self.frames else DBFS_FLOOR
+
+    @property
+    def speech_rms_dbfs(self):
+        if not self.speech_frames:
+            return DBFS_FLOOR
+        return _to_db(self.speech_sum_squares / self.speech_frames, power=True)
+
+    @property
+    def noise_rms_dbfs(self):
+        if self.noise_frames:
+            return _to_db(self.noise_sum_squares / self.noise_frames, power=True)
+        return self.noise_floor_db if self.noise_floor_db is not None else DBFS_FLOOR
+
+    @property
+    def snr_db(self):
+        """RMS de parole au-dessus du bruit (0 sans parole)"""
+        if not self.speech_frames:
+            return 0.0
+        return self.speech_rms_dbfs - self.noise_rms_dbfs
+
+    @property
+    def speech_seconds(self):
+        return self.speech_frames / self.samplerate
+
+    @property
+    def crest_factor_db(self):
+        return self.peak_dbfs - self.rms_dbfs
+
+    @property
+    def headroom_db(self):
+        return 0.0 - self.peak_dbfs
+
+    def to_dict(self):
+        return {
+            "analyzed_sec": round(self.frames / self.samplerate, 3),
+            "peak_dbfs": round(self.peak_dbfs, 2),
+            "rms_dbfs": round(self.rms_dbfs, 2),
+            "speech_rms_dbfs": round(self.speech_rms_dbfs, 2),
+            "speech_sec": round(self.speech_seconds, 3),
+            "noise_rms_dbfs": round(self.noise_rms_dbfs, 2),
+            "snr_db": round(self.snr_db, 2),
+            "crest_factor_db": round(self.crest_factor_db, 2),
+            "max_block_crest_db": round(self.max_block_crest_db, 2),
+            "headroom_db": round(self.headroom_db, 2),
+            "clipped_samples": self.clipped_samples,
+            "clip_events": self.clip_events,
+        }
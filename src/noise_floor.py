@@ -0,0 +1,74 @@
+"""
+Estimation du bruit de fond en continu pour NovaQA
+Statistiques de minimum sur fenêtre glissante, mises à jour en O(1) par bloc
+"""
+
+import math
+from collections import deque
+
+from .config import (
+    NOISE_FLOOR_WINDOW_SEC, NOISE_FLOOR_SUBWINDOWS, NOISE_FLOOR_BIAS_DB,
+    NOISE_FLOOR_LEARNING_SEC, DBFS_FLOOR
+)
+from .capture_hub import capture_hub
+from .rt_dsp import block_power
+
+
+class NoiseFloorTracker:
+    """Suit le bruit de fond à partir des blocs de capture
+
+    La puissance de chaque bloc est lissée puis son minimum est retenu par
+    sous-fenêtre ; le bruit de fond est le minimum des NOISE_FLOOR_SUBWINDOWS
+    dernières sous-fenêtres (soit NOISE_FLOOR_WINDOW_SEC secondes), corrigé du
+    biais du minimum. Coût constant par bloc, quelle que soit la fenêtre.
+    """
+
+    def __init__(self, window_sec=NOISE_FLOOR_WINDOW_SEC, subwindows=NOISE_FLOOR_SUBWINDOWS,
+                 smoothing=0.2):
+        self.subwindow_sec = window_sec / subwindows
+        self.smoothing = smoothing
+        self._bias = 10.0 ** (NOISE_FLOOR_BIAS_DB / 10.0)
+        self._minima = deque(maxlen=subwindows)
+        self.reset()
+
+    def reset(self):
+        """Oublie l'historique (changement de micro)"""
+        self._minima.clear()
+        self._smoothed = None
+        self._current_min = math.inf
+        self._subwindow_elapsed = 0.0
+        self.elapsed = 0.0
+        self.noise_floor = DBFS_FLOOR
+
+    @property
+    def learned(self):
+        """Vrai une fois NOISE_FLOOR_LEARNING_SEC secondes de signal observées"""
+        return self.elapsed >= NOISE_FLOOR_LEARNING_SEC
+
+    def update(self, power, duration):
+        """Ajoute la puissance moyenne (carré RMS) d'un bloc de `duration` secondes"""
+        if self._smoothed is None:
+            self._smoothed = power
+        else:
+            self._smoothed = self.smoothing * self._smoothed + (1.0 - self.smoothing) * power
+        if self._smoothed < self._current_min:
+            self._current_min = self._smoothed
+
+        self.elapsed += duration
+        self._subwindow_elapsed += duration
+        if self._subwindow_elapsed >= self.subwindow_sec:
+            self._minima.append(self._current_min)
+            self._current_min = self._smoothed
+            self._subwindow_elapsed = 0.0
+
+        floor = min(self._current_min, min(self._minima)) if self._minima else self._current_min
+        floor *= self._bias
+        self.noise_floor = 10.0 * math.log10(floor) if floor > 1e-12 else DBFS_FLOOR
+
+    def on_block(self, indata, frames, time_info, status):
+        """Consommateur du flux de capture partagé"""
+        self.update(block_power(capture_hub.float_block(indata)), frames / capture_hub.samplerate)
+
+
+# Instance globale
+noise_floor_tracker = NoiseFloorTracker()
@@ -0,0 +1,308 @@
+"""
+Moteur de lecture persistant pour NovaQA
+Un seul sd.OutputStream ouvert en permanence, piloté par une file de commandes
+(play, stop) ; un clip démarre au bloc suivant, précédé d'un silence programmé
+à l'échantillon près.
+Mixeur logiciel : les boucles (ambiance) sont mixées dans le même callback,
+avec atténuation automatique (ducking) pendant les questions et réponses
+"""
+
+import itertools
+import math
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+import sounddevice as sd
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .config import (
+    PLAYBACK_SAMPLE_RATE, PLAYBACK_BLOCKSIZE, DUCKING_GAIN, DUCKING_ATTACK_MS,
+    DUCKING_RELEASE_MS
+)
+from .stream_tuning import stream_tuner
+from .instrumentation import instrumentation
+
+
+class _Clip:
+    """Clip programmé (manipulé uniquement depuis le callback audio)"""
+    __slots__ = ("clip_id", "data", "pos", "lead_in", "gain")
+
+    def __init__(self, clip_id, data, lead_in, gain=1.0):
+        self.clip_id = clip_id
+        self.data = data
+        self.pos = 0
+        self.lead_in = lead_in  # Échantillons de silence avant le clip
+        self.gain = gain
+
+
+class _Loop:
+    """Source bouclée (ambiance), mixée sous les clips et atténuée par le ducking"""
+    __slots__ = ("source_id", "data", "pos", "gain", "level", "closing")
+
+    def __init__(self, source_id, data, gain):
+        self.source_id = source_id
+        self.data = data
+        self.pos = 0
+        self.gain = gain
+        self.level = 0.0  # Gain effectif courant (rampe vers gain x ducking)
+        self.closing = False
+
+
+class PlaybackEngine(QObject):
+    """Moteur de lecture : flux de sortie longue durée et file de commandes
+
+    Les commandes sont déposées dans une file lue par le callback audio au
+    début de chaque bloc : un clip démarre donc au plus tard un bloc après
+    play(). Les fins de clip (ou arrêts) sont signalées par
+    clip_finished depuis un thread de notification, jamais depuis le callback.
+
+    Les boucles ajoutées par add_loop() sont décodées une fois en mémoire et
+    mixées sous les clips ; tant qu'un clip est programmé, leur gain descend
+    vers DUCKING_GAIN (attaque DUCKING_ATTACK_MS, relâche DUCKING_RELEASE_MS).
+    Les variations de gain sont des rampes linéaires par bloc (pas de clics).
+    """
+    clip_finished = pyqtSignal(int, float)  # id du clip, instant DAC (horloge PortAudio) du dernier échantillon
+
+    def __init__(self, samplerate=PLAYBACK_SAMPLE_RATE, channels=2, blocksize=PLAYBACK_BLOCKSIZE):
+        super().__init__()
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize  # Remplacé à l'ouverture par le palier de stream_tuner
+        self.latency = 'low'
+        self.device_index = None
+        self.probe = None  # CallbackProbe : durées, jitter, xruns et horodatages DAC de la session
+        self._ids = itertools.count(1)
+        self._commands = queue.SimpleQueue()  # Interface -> callback
+        self._events = queue.SimpleQueue()    # Callback -> thread de notification
+        self._clips = deque()                 # Clips programmés (callback uniquement)
+        self._loops = []                      # Sources bouclées (callback uniquement)
+        self._unlooped = set()                # Boucles retirées avant d'être ajoutées (callback uniquement)
+        self._duck = 1.0                      # Facteur de ducking courant
+        self._mix = np.zeros((blocksize, channels), dtype=np.float32)
+        self._ramp = np.zeros(blocksize, dtype=np.float32)
+        self._steps = np.arange(1, blocksize + 1, dtype=np.float32)  # 1..N, base des rampes de gain
+        self._stream = None
+        self._notifier = None
+        self._lock = threading.Lock()
+
+    # === Commandes (appelées depuis l'interface) ===
+
+    def play(self, data, lead_in_ms=0, gain=1.0):
+        """Arrête ce qui joue et lance `data` (float32, déjà à self.samplerate)"""
+        return self._submit("play", data, lead_in_ms, gain)
+
+    def stop(self, clip_id=None):
+        """Arrête un clip (ou tous si clip_id est None)"""
+        self._commands.put(("stop", clip_id))
+
+    def new_source_id(self):
+        """Réserve un id de boucle, utilisable par remove_loop() avant même add_loop()"""
+        return next(self._ids)
+
+    def add_loop(self, data, gain=1.0, source_id=None):
+        """Ajoute une source jouée en boucle (fondu d'entrée) et retourne son id"""
+        self.start()
+        if source_id is None:
+            source_id = self.new_source_id()
+        self._commands.put(("loop", _Loop(source_id, data, gain)))
+        return source_id
+
+    def remove_loop(self, source_id):
+        """Retire une boucle (fondu de sortie sur un bloc)
+
+        Les commandes sont appliquées dans l'ordre par le callback : une boucle
+        retirée avant d'avoir été ajoutée (id réservé) n'est jamais jouée.
+        """
+        self._commands.put(("unloop", source_id))
+
+    def set_gain(self, source_id, gain):
+        """Change le gain d'une boucle (appliqué en rampe sur le bloc suivant)"""
+        self._commands.put(("gain", (source_id, gain)))
+
+    def is_running(self) -> bool:
+        return self._stream is not None
+
+    @property
+    def output_latency(self):
+        """Latence de sortie effective du flux (secondes), 0 s'il n'est pas ouvert"""
+        stream = self._stream
+        return stream.latency if stream is not None else 0.0
+
+    def start(self):
+        """Ouvre le flux de sortie (une seule fois pour toute la session)"""
+        with self._lock:
+            if self._stream is not None:
+                return
+            self._notifier = threading.Thread(target=self._notify_loop, name="PlaybackNotifier", daemon=True)
+            self._notifier.start()
+            self.device_index = _default_output_index()
+            self.blocksize, self.latency = stream_tuner.settings('output', self.device_index, self.blocksize)
+            self.probe = instrumentation.open_probe('playback', self.samplerate, self.blocksize)
+            self._stream = sd.OutputStream(
+                samplerate=self.samplerate,
+                channels=self.channels,
+                blocksize=self.blocksize,
+                dtype='float32',
+                latency=self.latency,
+                callback=self._callback,
+            )
+            self._stream.start()
+            print(f"🔈 [PLAYBACK] Flux de sortie ouvert: {self.samplerate}Hz, blocksize={self.blocksize}, "
+                  f"latence {self.latency}")
+
+    def close(self):
+        with self._lock:
+            if self._stream is not None:
+                try:
+                    self._stream.stop()
+                    self._stream.close()
+                except Exception:
+                    pass
+                finally:
+                    self._stream = None
+                instrumentation.close_probe(self.probe)
+                stream_tuner.conclude('output', self.device_index, self.probe, self.latency)
+                self.probe = None
+            if self._notifier is not None:
+                self._events.put(None)
+                self._notifier = None
+
+    def _submit(self, kind, data, lead_in_ms, gain):
+        self.start()
+        clip_id = next(self._ids)
+        lead_in = int(self.samplerate * lead_in_ms / 1000)
+        self._commands.put((kind, _Clip(clip_id, data, lead_in, gain)))
+        return clip_id
+
+    # === Thread audio ===
+
+    def _callback(self, outdata, frames, time_info, status):
+        started = time.perf_counter()
+        dac_time = time_info.outputBufferDacTime
+        self._apply_commands(dac_time)
+
+        pos = 0
+        while pos < frames and self._clips:
+            clip = self._clips[0]
+            if clip.lead_in > 0:
+                n = min(frames - pos, clip.lead_in)
+                outdata[pos:pos + n] = 0
+                clip.lead_in -= n
+                pos += n
+                continue
+            n = min(frames - pos, len(clip.data) - clip.pos)
+            np.multiply(clip.data[clip.pos:clip.pos + n], clip.gain, out=outdata[pos:pos + n])
+            clip.pos += n
+            pos += n
+            if clip.pos >= len(clip.data):
+                self._clips.popleft()
+                self._events.put((clip.clip_id, dac_time + pos / self.samplerate))
+        if pos < frames:
+            outdata[pos:] = 0
+
+        if self._loops:
+            self._mix_loops(outdata, frames, ducked=bool(self._clips) or pos > 0)
+            np.clip(outdata, -1.0, 1.0, out=outdata)
+        self.probe.record(frames, status, started, time.perf_counter() - started,
+                          dac_time, time_info.currentTime)
+
+    def _mix_loops(self, outdata, frames, ducked):
+        """Ajoute les boucles à la sortie avec une rampe de gain par bloc"""
+        if frames > len(self._mix):
+            self._mix = np.zeros((frames, self.channels), dtype=np.float32)
+            self._ramp = np.zeros(frames, dtype=np.float32)
+            self._steps = np.arange(1, frames + 1, dtype=np.float32)
+        mix = self._mix[:frames]
+        ramp = self._ramp[:frames]
+
+        # Ducking : approche exponentielle, constante de temps attaque/relâche
+        target = DUCKING_GAIN if ducked else 1.0
+        tau_ms = DUCKING_ATTACK_MS if target < self._duck else DUCKING_RELEASE_MS
+        alpha = 1.0 - math.exp(-frames * 1000.0 / (self.samplerate * max(tau_ms, 1e-3)))
+        self._duck += (target - self._duck) * alpha
+
+        for loop in self._loops:
+            # Copie circulaire de la boucle
+            filled = 0
+            while filled < frames:
+                n = min(frames - filled, len(loop.data) - loop.pos)
+                mix[filled:filled + n] = loop.data[loop.pos:loop.pos + n]
+                filled += n
+                loop.pos = (loop.pos + n) % len(loop.data)
+
+            start, end = loop.level, loop.gain * self._duck
+            loop.level = end
+            if start == end:
+                mix *= end
+            else:
+                np.multiply(self._steps[:frames], (end - start) / frames, out=ramp)
+                ramp += start
+                mix *= ramp[:, None]
+            outdata += mix
+
+        if any(loop.closing and loop.level == 0.0 for loop in self._loops):
+            self._loops = [loop for loop in self._loops if not (loop.closing and loop.level == 0.0)]
+
+    def _apply_commands(self, dac_time):
+        while True:
+            try:
+                kind, arg = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "play":
+                self._drop(None, dac_time)
+                self._clips.append(arg)
+            elif kind == "stop":
+                self._drop(arg, dac_time)
+            elif kind == "loop":
+                if arg.source_id in self._unlooped:
+                    self._unlooped.discard(arg.source_id)
+                elif len(arg.data):
+                    self._loops.append(arg)
+            elif kind == "unloop":
+                found = False
+                for loop in self._loops:
+                    if loop.source_id == arg:
+                        loop.gain = 0.0
+                        loop.closing = True
+                        found = True
+                if not found:
+                    self._unlooped.add(arg)
+            elif kind == "gain":
+                source_id, gain = arg
+                for loop in self._loops:
+                    if loop.source_id == source_id and not loop.closing:
+                        loop.gain = gain
+
+    def _drop(self, clip_id, dac_time):
+        """Retire les clips visés et signale leur fin à l'instant courant"""
+        kept = deque()
+        for clip in self._clips:
+            if clip_id is None or clip.clip_id == clip_id:
+                self._events.put((clip.clip_id, dac_time))
+            else:
+                kept.append(clip)
+        self._clips = kept
+
+    # === Notification (hors thread audio) ===
+
+    def _notify_loop(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            self.clip_finished.emit(*event)
+
+
+def _default_output_index():
+    """Index du périphérique de sortie par défaut (None si PortAudio ne le donne pas)"""
+    try:
+        return int(sd.query_devices(kind='output')['index'])
+    except Exception:
+        return None
+
+
+# Instance globale
+playback_engine = PlaybackEngine()
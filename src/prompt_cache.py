@@ -0,0 +1,244 @@
+"""
+Cache des prompts audio décodés pour NovaQA
+Questions, réponses et messages système gardés en mémoire (float32 stéréo)
+"""
+
+import itertools
+import math
+import os
+import queue
+import threading
+from collections import OrderedDict
+import numpy as np
+import soundfile as sf
+
+try:
+    from scipy.signal import resample_poly  # Optionnel : rééchantillonnage polyphase (tous rapports)
+except ImportError:
+    resample_poly = None
+
+from .config import PROMPT_CACHE_BUDGET_MB, PLAYBACK_SAMPLE_RATE
+
+
+def resample(data, src_rate, dst_rate):
+    """Rééchantillonne `data` (float32, échantillons x canaux) avec filtre anti-repliement/anti-image
+
+    Polyphase (scipy) si disponible. Sans scipy, le cas des prompts générés
+    (suréchantillonnage entier, 24 kHz -> 48 kHz) passe par un sinc fenêtré
+    numpy ; les autres rapports retombent sur l'interpolation linéaire.
+    """
+    if src_rate == dst_rate or len(data) == 0:
+        return data
+    g = math.gcd(int(src_rate), int(dst_rate))
+    up, down = int(dst_rate) // g, int(src_rate) // g
+    if resample_poly is not None:
+        return resample_poly(data, up, down, axis=0).astype(np.float32, copy=False)
+    if down == 1:
+        return _upsample_sinc(data, up)
+    return resample_linear(data, src_rate, dst_rate)
+
+
+def _upsample_sinc(data, factor, half_width=16):
+    """Suréchantillonnage entier : zéros insérés puis passe-bas sinc fenêtré (Kaiser) à la Nyquist source"""
+    t = np.arange(-half_width * factor, half_width * factor + 1)
+    taps = np.sinc(t / factor) * np.kaiser(len(t), 8.0)  # Gain DC ≈ factor : compense les zéros insérés
+    stuffed = np.zeros((len(data) * factor, data.shape[1]), dtype=np.float32)
+    stuffed[::factor] = data
+    out = np.empty_like(stuffed)
+    for ch in range(data.shape[1]):
+        out[:, ch] = np.convolve(stuffed[:, ch], taps, mode='same')
+    return out
+
+
+def resample_linear(data, src_rate, dst_rate):
+    """Rééchantillonnage par interpolation linéaire (repli sans filtre, rapports non entiers sans scipy)"""
+    if src_rate == dst_rate or len(data) == 0:
+        return data
+    n_out = int(round(len(data) * dst_rate / src_rate))
+    t_out = np.arange(n_out, dtype=np.float64) * (src_rate / dst_rate)
+    t_in = np.arange(len(data), dtype=np.float64)
+    out = np.empty((n_out, data.shape[1]), dtype=np.float32)
+    for ch in range(data.shape[1]):
+        out[:, ch] = np.interp(t_out, t_in, data[:, ch])
+    return out
+
+
+def decode_prompt(path, samplerate=PLAYBACK_SAMPLE_RATE):
+    """Décode un fichier audio en float32 stéréo à la fréquence du moteur de lecture"""
+    data, file_rate = sf.read(path, dtype='float32', always_2d=True)
+    if data.shape[1] == 1:
+        data = np.repeat(data, 2, axis=1)
+    data = resample(data, file_rate, samplerate)
+    data.setflags(write=False)  # Tampon partagé entre lectures : lecture seule
+    return data, samplerate
+
+
+class PromptCache:
+    """Cache LRU process-wide des prompts décodés
+
+    Borné par un budget mémoire (PROMPT_CACHE_BUDGET_MB) avec éviction du moins
+    récemment utilisé ; une entrée est invalidée si le fichier a changé
+    (mtime ou taille). Rejouer une question ne coûte alors ni I/O ni décodage.
+    """
+
+    def __init__(self, budget_bytes=PROMPT_CACHE_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # chemin -> (mtime_ns, taille, data, samplerate)
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Retourne (data, samplerate) depuis le cache, en décodant si nécessaire"""
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2], entry[3]
+            self.misses += 1
+
+        data, samplerate = decode_prompt(key)
+        self._store(key, st, data, samplerate)
+        return data, samplerate
+
+    def contains(self, path):
+        """Vrai si le fichier est en cache et à jour"""
+        return self.lookup(path) is not None
+
+    def lookup(self, path):
+        """(data, samplerate) si le fichier est en cache et à jour, sinon None (jamais de décodage)"""
+        key = os.path.abspath(path)
+        try:
+            st = os.stat(key)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != st.st_mtime_ns or entry[1] != st.st_size:
+                return None
+            self._entries.move_to_end(key)
+            return entry[2], entry[3]
+
+    def invalidate(self, path=None):
+        """Oublie un fichier (ou tout le cache si path est None)"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self.used_bytes = 0
+            else:
+                entry = self._entries.pop(os.path.abspath(path), None)
+                if entry is not None:
+                    self.used_bytes -= entry[2].nbytes
+
+    def _store(self, key, st, data, samplerate):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.used_bytes -= previous[2].nbytes
+            self._entries[key] = (st.st_mtime_ns, st.st_size, data, samplerate)
+            self.used_bytes += data.nbytes
+            # Éviction LRU (on garde toujours l'entrée qui vient d'être ajoutée)
+            while self.used_bytes > self.budget_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.used_bytes -= evicted[2].nbytes
+
+
+class PromptPrefetcher:
+    """Décode à l'avance les prochains prompts dans un thread de fond
+
+    Pendant que l'utilisateur répond à la question N, la réponse N et la
+    question N+1 sont décodées dans le cache. À la lecture, request() ne
+    décode jamais sur le thread appelant : le prompt est livré à un callback,
+    tout de suite s'il est en cache, sinon depuis le thread de fond à la fin
+    du décodage. Compteurs : `hits` = prompt déjà préchargé (dont `late` :
+    décodage lancé mais pas encore fini, la lecture attend sa fin), `misses`
+    = prompt jamais demandé, décodé à froid en priorité sur les préchargements.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.hits = 0
+        self.late = 0
+        self.misses = 0
+        self._q = queue.PriorityQueue()  # (priorité, ordre, chemin) : lectures à froid avant préchargements
+        self._order = itertools.count()
+        self._in_flight = {}  # chemin -> callbacks à appeler à la fin du décodage en cours
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def prefetch(self, *paths):
+        """Programme le décodage des fichiers qui ne sont pas déjà en cache"""
+        for path in paths:
+            if not path or not os.path.exists(path) or self.cache.contains(path):
+                continue
+            key = os.path.abspath(path)
+            with self._lock:
+                if key in self._in_flight:
+                    continue
+                self._in_flight[key] = []
+            self._q.put((1, next(self._order), key))
+        self._ensure_thread()
+
+    def request(self, path, callback):
+        """Livre le prompt à `callback(data, samplerate, error)` sans décoder sur le thread appelant
+
+        En cache : callback appelé immédiatement sur le thread appelant. Sinon
+        (décodage en cours ou à lancer) : appelé depuis le thread de fond,
+        `error` renseigné si le décodage a échoué. Passer par un signal Qt pour
+        revenir sur le thread GUI.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            pending = self._in_flight.get(key)
+            cached = self.cache.lookup(key) if pending is None else None
+            if pending is not None:
+                self.hits += 1
+                self.late += 1
+                pending.append(callback)
+            elif cached is None:
+                self.misses += 1
+                self._in_flight[key] = [callback]
+                self._q.put((0, next(self._order), key))
+            else:
+                self.hits += 1
+        if cached is None:
+            self._ensure_thread()
+        else:
+            callback(cached[0], cached[1], None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return (f"{self.hits} hits (dont {self.late} en fin de décodage) / {self.misses} misses "
+                f"({rate:.0f}% préchargés)")
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="PromptPrefetch", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            _, _, key = self._q.get()
+            data = samplerate = error = None
+            try:
+                data, samplerate = self.cache.get(key)
+            except Exception as e:
+                error = e
+                print(f"⚠️ [PREFETCH] Échec décodage {os.path.basename(key)}: {e}")
+            with self._lock:
+                callbacks = self._in_flight.pop(key, ())
+            for callback in callbacks:
+                try:
+                    callback(data, samplerate, error)
+                except Exception as e:
+                    print(f"⚠️ [PREFETCH] Erreur livraison {os.path.basename(key)}: {e}")
+
+
+# Instances globales
+prompt_cache = PromptCache()
+prompt_prefetcher = PromptPrefetcher(prompt_cache)
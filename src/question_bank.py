@@ -0,0 +1,296 @@
+"""
+Banque de questions compilée pour NovaQA
+Deux formats de source :
+- `question.json` (liste de dictionnaires à clé unique) : compilé une fois en
+  enregistrements `Question` typés, durées des fichiers audio comprises, puis
+  mis en cache à côté de la source (`question.json.bank`, pickle) ;
+- `question.jsonl` (une question par ligne) : seul l'index des positions des
+  lignes est mis en cache ; la question N est lue à la demande (seek + une
+  ligne), de quoi ouvrir des banques de milliers de questions sans les charger.
+Dans les deux cas, au démarrage suivant, un stat suffit à valider le cache ;
+la source n'est plus vérifiée ensuite (voir QuestionBank.reload()). Les durées
+audio sont mémorisées par fichier, validées par sa date et sa taille.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from array import array
+from collections import OrderedDict
+import soundfile as sf
+
+from .config import QUESTIONS_FILE, QUESTION_BANK_CACHE_SUFFIX, QUESTION_BANK_LRU_SIZE, GENERATED_FOLDER
+
+
+BANK_FORMAT_VERSION = 4  # À incrémenter si la structure de Question ou du cache change (invalide les caches)
+
+
+class Question:
+    """Une question de la banque (enregistrement compact, attributs fixes)"""
+
+    __slots__ = ("id", "number", "text", "reply", "file_question", "file_reply",
+                 "question_duration", "reply_duration")
+
+    def __init__(self, id, number, text, reply, file_question, file_reply,
+                 question_duration=None, reply_duration=None):
+        self.id = id                        # Clé dans question.json ("question_01")
+        self.number = number                # Numéro 1-based dans la banque
+        self.text = text
+        self.reply = reply
+        self.file_question = file_question  # Fichiers dans GENERATED_FOLDER
+        self.file_reply = file_reply
+        self.question_duration = question_duration  # Secondes, None si le fichier manque ou est illisible
+        self.reply_duration = reply_duration
+
+    def astuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"Question({self.number}, {self.id!r}, {self.text!r})"
+
+
+class AudioDurations:
+    """Durées des fichiers audio de GENERATED_FOLDER, mémorisées par fichier
+
+    Une durée est valide tant que la date de modification (ns) et la taille du
+    fichier n'ont pas changé : un fichier réécrit sur place est relu, même si
+    la date du dossier ne bouge pas.
+    """
+
+    def __init__(self, folder=GENERATED_FOLDER, entries=None):
+        self.folder = folder
+        self.entries = dict(entries or {})  # nom de fichier -> (mtime_ns, taille, durée)
+        self.changed = False
+
+    def get(self, filename):
+        if not filename:
+            return None
+        path = os.path.join(self.folder, filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        entry = self.entries.get(filename)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        try:
+            duration = round(sf.info(path).duration, 3)
+        except Exception:
+            duration = None
+        self.entries[filename] = (st.st_mtime_ns, st.st_size, duration)
+        self.changed = True
+        return duration
+
+    def apply(self, question):
+        """Met à jour les durées d'une Question (un stat par fichier, relecture si modifié)"""
+        question.question_duration = self.get(question.file_question)
+        question.reply_duration = self.get(question.file_reply)
+        return question
+
+
+def compile_entry(entry, number, durations=None):
+    """Compile une entrée de la source en Question
+
+    Entrée `{"question_01": {...}}` (format de question.json) ou à plat avec
+    une clé `id` (format conseillé en JSON Lines).
+    """
+    if "question" in entry:
+        key, fields = entry.get("id", f"question_{number:02d}"), entry
+    else:
+        key, fields = next(iter(entry.items()))
+    question = Question(
+        key, number, fields.get("question", ""), fields.get("reply", ""),
+        fields.get("file_question"), fields.get("file_reply"),
+    )
+    return (durations or AudioDurations()).apply(question)
+
+
+def compile_questions(data, durations=None):
+    """Compile la liste brute de question.json en enregistrements Question"""
+    durations = durations or AudioDurations()
+    return [compile_entry(entry, number, durations) for number, entry in enumerate(data, start=1)]
+
+
+def write_jsonl(questions_file, jsonl_file):
+    """Convertit une banque question.json en JSON Lines (une question par ligne)"""
+    with open(questions_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with open(jsonl_file, 'w', encoding='utf-8') as f:
+        for entry in data:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return len(data)
+
+
+def _source_sha256(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _line_offsets(path):
+    """Position (octets) de chaque ligne non vide et sha256 du fichier, en une lecture"""
+    offsets = array('q')
+    digest = hashlib.sha256()
+    position = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            digest.update(line)
+            if line.strip():
+                offsets.append(position)
+            position += len(line)
+    return offsets, digest.hexdigest()
+
+
+class QuestionBank:
+    """Questions compilées, chargées une fois par processus
+
+    S'utilise comme une liste en lecture seule : `len(bank)`, `bank[i]`.
+    La source est validée au premier accès puis à chaque reload(), jamais
+    pendant les lectures. Cache valide si la date de modification et la
+    taille de la source n'ont pas changé. Sinon, en JSON, l'empreinte sha256
+    du contenu tranche (fichier simplement touché : le cache est réutilisé et
+    sa clé mise à jour), et les durées audio sont revalidées fichier par
+    fichier (AudioDurations) ; en JSON Lines, l'index est reconstruit en une
+    lecture, les durées sont lues avec la question et les
+    QUESTION_BANK_LRU_SIZE dernières questions lues restent en mémoire.
+    """
+
+    def __init__(self, path=QUESTIONS_FILE):
+        self.path = path
+        self.cache_path = path + QUESTION_BANK_CACHE_SUFFIX
+        self.indexed = path.endswith(".jsonl")
+        self._questions = None  # Toutes les Question (JSON)
+        self._offsets = None    # Position de chaque ligne (JSON Lines)
+        self._recent = OrderedDict()  # index -> Question lue (JSON Lines, LRU)
+        self._durations = AudioDurations()  # Durées des fichiers audio (JSON Lines, en mémoire)
+        self._key = None
+        self._lock = threading.RLock()
+
+    def reload(self):
+        """Revalide la source (un stat) et la recharge si elle a changé depuis le dernier chargement"""
+        with self._lock:
+            stat = os.stat(self.path)
+            if self._key != (stat.st_mtime, stat.st_size):
+                self._recent.clear()
+                if self.indexed:
+                    self._offsets = self._load_index(stat)
+                else:
+                    self._questions = self._load(stat)
+                self._key = (stat.st_mtime, stat.st_size)
+
+    def _refresh(self):
+        if self._key is None:
+            self.reload()
+
+    def questions(self):
+        """Liste de toutes les Question (lit toute la banque en JSON Lines : préférer bank[i])"""
+        with self._lock:
+            self._refresh()
+            if not self.indexed:
+                return self._questions
+            return [self[i] for i in range(len(self._offsets))]
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._offsets if self.indexed else self._questions)
+
+    def __getitem__(self, index):
+        with self._lock:
+            self._refresh()
+            if not self.indexed:
+                return self._questions[index]
+            if index < 0:
+                index += len(self._offsets)
+            if not 0 <= index < len(self._offsets):
+                raise IndexError(index)
+            question = self._recent.get(index)
+            if question is None:
+                question = self._read_line(index)
+                self._recent[index] = question
+                if len(self._recent) > QUESTION_BANK_LRU_SIZE:
+                    self._recent.popitem(last=False)
+            else:
+                self._recent.move_to_end(index)
+            return question
+
+    # === JSON : banque complète ===
+
+    def _load(self, stat):
+        started = time.perf_counter()
+        cache = self._read_cache()
+        durations = AudioDurations(entries=cache["durations"] if cache else None)
+        if cache and cache["mtime"] == stat.st_mtime and cache["size"] == stat.st_size:
+            questions = [durations.apply(Question(*row)) for row in cache["rows"]]
+            if durations.changed:  # Fichier audio remplacé : seules ses durées sont relues
+                self._write_cache(stat, cache["sha256"], rows=[q.astuple() for q in questions],
+                                  durations=durations.entries)
+            return questions
+
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        digest = _source_sha256(raw)
+        if cache and cache["sha256"] == digest:
+            questions = [durations.apply(Question(*row)) for row in cache["rows"]]
+        else:
+            questions = compile_questions(json.loads(raw.decode('utf-8')), durations)
+            print(f"📚 [BANK] {len(questions)} questions compilées "
+                  f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+        self._write_cache(stat, digest, rows=[q.astuple() for q in questions], durations=durations.entries)
+        return questions
+
+    # === JSON Lines : index des positions, questions lues à la demande ===
+
+    def _load_index(self, stat):
+        started = time.perf_counter()
+        cache = self._read_cache()
+        if cache and cache["mtime"] == stat.st_mtime and cache["size"] == stat.st_size:
+            offsets = array('q')
+            offsets.frombytes(cache["offsets"])
+            return offsets
+        offsets, digest = _line_offsets(self.path)
+        print(f"📚 [BANK] Index de {len(offsets)} questions construit "
+              f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+        self._write_cache(stat, digest, offsets=offsets.tobytes())
+        return offsets
+
+    def _read_line(self, index):
+        with open(self.path, 'rb') as f:
+            f.seek(self._offsets[index])
+            entry = json.loads(f.readline().decode('utf-8'))
+        return compile_entry(entry, index + 1, self._durations)
+
+    # === Cache ===
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, 'rb') as f:
+                cache = pickle.load(f)
+            if cache.get("version") == BANK_FORMAT_VERSION:
+                return cache
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ [BANK] Cache illisible, il sera reconstruit: {e}")
+        return None
+
+    def _write_cache(self, stat, digest, **content):
+        cache = {
+            "version": BANK_FORMAT_VERSION,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": digest,
+        }
+        cache.update(content)
+        try:
+            tmp = self.cache_path + ".tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.cache_path)
+        except Exception as e:
+            print(f"⚠️ [BANK] Sauvegarde du cache impossible: {e}")
+
+
+# Instance globale
+question_bank = QuestionBank()
@@ -2,40 +2,87 @@
 Gestion des questions et des périphériques audio
 """
 
-import json
 import os
 from typing import List, Tuple
-import sounddevice as sd
 
-from .config import QUESTIONS_FILE, RESPONSE_FOLDER
+from .config import RESPONSE_FOLDER
+from .take_writer import recover_incomplete_takes
+from .session_manifest import session_manifest, next_unanswered, unanswered
+from .device_cache import device_cache
+from .question_bank import question_bank
 
 
 class QuestionManager:
-    """Gestionnaire des questions et du flow d'interview"""
+    """Gestionnaire des questions et du flow d'interview
+
+    Les questions déjà répondues sont tenues dans un masque de bits (bit i pour
+    l'index i), lu une fois dans le manifeste au démarrage puis mis à jour à
+    chaque prise : « suivante » saute directement à la prochaine question sans
+    réponse, y compris les trous laissés avant la question courante.
+    """
     
     def __init__(self, start_index=0):
         self.questions = []
         self.current_index = start_index  # Démarrer à l'index spécifié
+        self.answered = 0                 # Masque des questions répondues
         self.load_questions()
+        self.load_answered()
         print(f"📋 QuestionManager initialisé à l'index {start_index}")
     
     def load_questions(self):
-        """Charge les questions depuis le fichier JSON"""
+        """Ouvre la banque de questions (compilée en cache ou indexée, voir question_bank.py)
+
+        `self.questions` s'utilise comme une liste : en JSON Lines, chaque question
+        n'est lue qu'au moment où elle est demandée.
+        """
         try:
-            with open(QUESTIONS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.questions = data
-                print(f"📋 {len(self.questions)} questions chargées")
+            question_bank.reload()
+            self.questions = question_bank
+            print(f"📋 {len(self.questions)} questions disponibles")
                 
         except Exception as e:
             print(f"❌ Erreur chargement questions: {e}")
     
     def get_current_question(self):
-        """Retourne la question actuelle"""
-        if 0 <= self.current_index < len(self.questions):
-            question_data = self.questions[self.current_index]
-            question_key = list(question_data.keys())[0]
-            return question_data[question_key]
+        """Retourne la question actuelle (Question)"""
+        return self.get_question(self.current_index)
+    
+    def load_answered(self):
+        """Charge le masque des questions répondues depuis le manifeste (une fois au démarrage)"""
+        try:
+            self.answered = session_manifest.answered_mask() & ((1 << len(self.questions)) - 1)
+        except Exception as e:
+            print(f"❌ Erreur lecture manifeste: {e}")
+            self.answered = 0
+    
+    def mark_answered(self, index):
+        """Marque la question d'index donné comme répondue (prise enregistrée)"""
+        if 0 <= index < len(self.questions):
+            self.answered |= 1 << index
+    
+    def is_answered(self, index):
+        return bool(self.answered >> index & 1)
+    
+    def answered_count(self):
+        """Nombre de questions répondues (couverture réelle, trous compris)"""
+        return bin(self.answered).count("1")
+    
+    def unanswered_indices(self, start=0):
+        """Itère sur les index des questions restant sans réponse"""
+        return unanswered(self.answered, len(self.questions), start)
+    
+    def next_unanswered_index(self):
+        """Prochaine question sans réponse après la courante, en repartant du début ; None si aucune"""
+        total = len(self.questions)
+        index = next_unanswered(self.answered, self.current_index + 1, total)
+        if index is None:
+            index = next_unanswered(self.answered, 0, min(self.current_index, total))
+        return index
+    
+    def get_question(self, index):
+        """Retourne la question à l'index donné (Question, None hors limites)"""
+        if 0 <= index < len(self.questions):
+            return self.questions[index]
         return None
     
     def get_current_question_number(self):
@@ -47,26 +94,28 @@ class QuestionManager:
         return len(self.questions)
     
     def next_question(self):
-        """Passe à la question suivante"""
-        if self.current_index < len(self.questions) - 1:
-            self.current_index += 1
-            return True
-        return False
+        """Passe à la prochaine question sans réponse (trous avant la courante compris)"""
+        index = self.next_unanswered_index()
+        if index is None:
+            return False
+        self.current_index = index
+        return True
     
     def has_next_question(self):
-        """Vérifie s'il y a une question suivante"""
-        return self.current_index < len(self.questions) - 1
+        """Vérifie s'il reste une question sans réponse autre que la courante"""
+        return self.next_unanswered_index() is not None
     
     def reset(self):
-        """Remet le compteur à zéro"""
+        """Remet le compteur et les réponses à zéro"""
         self.current_index = 0
+        self.answered = 0
 
 
 def list_input_devices() -> List[Tuple[int, str]]:
     """Return WASAPI devices only"""
     try:
-        devices = sd.query_devices()
-        hostapis = sd.query_hostapis()
+        devices = device_cache.devices()
+        hostapis = device_cache.hostapis()
         items = []
         
         for idx, dev in enumerate(devices):
@@ -90,35 +139,32 @@ def detect_resume_index():
         # Créer le dossier s'il n'existe pas
         os.makedirs(RESPONSE_FOLDER, exist_ok=True)
         
-        # Compter les questions totales (lecture rapide du JSON)
-        total_questions = 0
+        # Réparer ou écarter les prises interrompues AVANT de calculer la reprise
+        recovered, discarded = recover_incomplete_takes(RESPONSE_FOLDER)
+        if recovered or discarded:
+            print(f"🩹 Récupération: {recovered} prise(s) réparée(s), {discarded} écartée(s)")
+        
+        # Manifeste des prises (reconstruit une fois s'il manque ou ne correspond plus au dossier)
+        session_manifest.load()
         try:
-            with open(QUESTIONS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                total_questions = len(data)
+            total_questions = len(question_bank)
         except Exception as e:
             print(f"❌ Erreur lecture questions: {e}")
             return 0
         
-        # Chercher le dernier fichier reponse_xx.wav existant
-        last_answered = -1
+        # Couverture réelle : les trous (questions sautées, prises supprimées) sont repris en premier
+        mask = session_manifest.answered_mask()
+        answered = session_manifest.answered_count(total_questions)
+        if answered:
+            print(f"✅ Trouvé {answered}/{total_questions} réponses (manifeste)")
         
-        for i in range(total_questions):
-            question_num = i + 1  # Les fichiers commencent à 01
-            response_file = os.path.join(RESPONSE_FOLDER, f"reponse_{question_num:02d}.wav")
-            
-            if os.path.exists(response_file):
-                last_answered = i
-                print(f"✅ Trouvé réponse Q{question_num}: {response_file}")
-            else:
-                break  # Arrêter à la première réponse manquante
-        
-        if last_answered >= 0:
-            # Reprendre à la question suivante
-            next_question = last_answered + 1
-            if next_question < total_questions:
+        if answered:
+            # Reprendre à la première question sans réponse
+            next_question = next_unanswered(mask, 0, total_questions)
+            if next_question is not None:
                 print(f"🔄 REPRISE DÉTECTÉE à la question {next_question + 1}")
-                print(f"   📝 {last_answered + 1} questions déjà répondues")
+                print(f"   📝 {answered} questions déjà répondues, "
+                      f"{total_questions - answered} restantes")
                 return next_question
             else:
                 # Toutes les questions sont répondues
@@ -135,23 +181,9 @@ def detect_resume_index():
 
 
 def count_existing_responses():
-    """Compte le nombre de réponses déjà enregistrées"""
+    """Compte le nombre de questions répondues (trous compris, via le manifeste)"""
     try:
-        count = 0
-        # Lire le nombre total de questions
-        with open(QUESTIONS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            total_questions = len(data)
-        
-        for i in range(total_questions):
-            question_num = i + 1
-            response_file = os.path.join(RESPONSE_FOLDER, f"reponse_{question_num:02d}.wav")
-            if os.path.exists(response_file):
-                count += 1
-            else:
-                break  # Arrêter au premier fichier manquant
-        
-        return count
+        return session_manifest.answered_count(len(question_bank))
     except Exception as e:
         print(f"❌ Erreur comptage réponses: {e}")
         return 0
\ No newline at end of file
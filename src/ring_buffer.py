@@ -0,0 +1,134 @@
+"""
+Tampon circulaire audio préalloué pour NovaQA
+"""
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Conserve les `capacity` derniers échantillons dans un tableau numpy préalloué
+
+    Les positions sont exprimées en index absolus (nombre d'échantillons écrits
+    depuis la création), ce qui permet d'extraire une plage précise à l'échantillon.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.float32):
+        self.capacity = max(1, int(capacity))
+        self.channels = channels
+        self._buf = np.zeros((self.capacity, channels), dtype=dtype)
+        self.frames_written = 0
+
+    def write(self, block):
+        """Ajoute un bloc (frames, channels) en écrasant les échantillons les plus anciens"""
+        n = len(block)
+        if n >= self.capacity:
+            self._buf[:] = block[n - self.capacity:]
+            self.frames_written += n
+            return
+        pos = self.frames_written % self.capacity
+        first = min(n, self.capacity - pos)
+        self._buf[pos:pos + first] = block[:first]
+        if first < n:
+            self._buf[:n - first] = block[first:]
+        self.frames_written += n
+
+    @property
+    def oldest_frame(self):
+        """Index absolu du plus ancien échantillon encore disponible"""
+        return max(0, self.frames_written - self.capacity)
+
+    def read_range(self, start_frame, end_frame):
+        """Retourne une copie des échantillons [start_frame, end_frame)
+
+        La plage est bornée à ce qui est encore présent dans le tampon.
+        """
+        start = max(int(start_frame), self.oldest_frame)
+        end = min(int(end_frame), self.frames_written)
+        if end <= start:
+            return np.zeros((0, self.channels), dtype=self._buf.dtype)
+        a = start % self.capacity
+        b = a + (end - start)
+        if b <= self.capacity:
+            return self._buf[a:b].copy()
+        return np.concatenate((self._buf[a:], self._buf[:b - self.capacity]))
+
+    def read_into(self, start_frame, end_frame, out):
+        """Copie [start_frame, end_frame) au début de `out` sans allocation (thread audio)
+
+        Même bornage que read_range, limité en plus à len(out) ; retourne le
+        nombre d'échantillons copiés.
+        """
+        start = max(int(start_frame), self.oldest_frame)
+        end = min(int(end_frame), self.frames_written, start + len(out))
+        if end <= start:
+            return 0
+        n = end - start
+        a = start % self.capacity
+        first = min(n, self.capacity - a)
+        out[:first] = self._buf[a:a + first]
+        if first < n:
+            out[first:n] = self._buf[:n - first]
+        return n
+
+
+class SpscRingBuffer:
+    """File circulaire un producteur / un consommateur sur un tableau préalloué
+
+    Le callback audio (producteur) n'avance que la tête, le consommateur que la
+    queue : sous le GIL chaque index est publié par une simple affectation,
+    sans verrou. Un bloc qui ne tient pas dans la place libre est refusé en
+    entier et compté dans `overruns`. Le producteur publie aussi en un seul
+    tuple `totals` = (échantillons, somme des carrés) cumulés depuis la
+    création : un niveau RMS sur n'importe quel intervalle coûte O(1).
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.float32):
+        self.capacity = max(1, int(capacity))
+        self.channels = channels
+        self._buf = np.zeros((self.capacity, channels), dtype=dtype)
+        self._head = 0  # Échantillons écrits (producteur uniquement)
+        self._tail = 0  # Échantillons consommés (consommateur uniquement)
+        self.overruns = 0         # Blocs refusés (file pleine)
+        self.overrun_frames = 0
+        self.totals = (0, 0.0)
+
+    # === Producteur (thread audio) ===
+
+    def write(self, block):
+        """Ajoute un bloc (frames, channels) ; retourne False s'il a été refusé"""
+        n = len(block)
+        flat = block.reshape(-1)
+        frames_total, sum_squares = self.totals
+        self.totals = (frames_total + n, sum_squares + float(np.dot(flat, flat)))
+
+        if n > self.capacity - (self._head - self._tail):
+            self.overruns += 1
+            self.overrun_frames += n
+            return False
+        pos = self._head % self.capacity
+        first = min(n, self.capacity - pos)
+        self._buf[pos:pos + first] = block[:first]
+        if first < n:
+            self._buf[:n - first] = block[first:]
+        self._head += n  # Publication après la copie
+        return True
+
+    # === Consommateur ===
+
+    @property
+    def available(self):
+        """Échantillons écrits et pas encore consommés"""
+        return self._head - self._tail
+
+    def views(self):
+        """Vues (sans copie) sur les échantillons disponibles, en une ou deux parties"""
+        head = self._head
+        a = self._tail % self.capacity
+        n = head - self._tail
+        first = min(n, self.capacity - a)
+        return self._buf[a:a + first], self._buf[:n - first]
+
+    def consume(self, n=None):
+        """Libère `n` échantillons (tous les disponibles par défaut)"""
+        available = self._head - self._tail
+        self._tail += available if n is None else min(n, available)
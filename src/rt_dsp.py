@@ -0,0 +1,114 @@
+"""
+Calculs temps réel des callbacks audio pour NovaQA
+Tampons préalloués, ufuncs avec out= et journal sans verrou : aucune
+allocation proportionnelle à la taille du bloc dans le thread audio.
+Module sans dépendance Qt ni sounddevice (utilisable par les benchmarks)
+"""
+
+import math
+from collections import deque
+import numpy as np
+
+
+def block_power(block):
+    """Puissance moyenne (carré RMS) d'un bloc, tous canaux confondus
+
+    Produit scalaire sur une vue à plat : pas de tableau intermédiaire
+    (contrairement à np.mean(block ** 2)).
+    """
+    flat = block.reshape(-1)
+    n = flat.shape[0]
+    if n == 0:
+        return 0.0
+    return float(np.dot(flat, flat)) / n
+
+
+def power_to_dbfs(power, floor):
+    """Convertit une puissance moyenne en dBFS borné à [floor, 0]"""
+    if not power > 1e-20 or not math.isfinite(power):
+        return floor
+    return max(floor, min(0.0, 10.0 * math.log10(power)))
+
+
+# Formats de capture (DTYPE) : dtype numpy du flux PortAudio, sous-type PCM de stockage
+SAMPLE_FORMATS = {
+    'float32': ('float32', None),
+    'int16': ('int16', 'PCM_16'),
+    'int24': ('int32', 'PCM_24'),  # PortAudio livre le 24 bits cadré à gauche dans un int32
+}
+
+
+def stream_dtype(sample_format):
+    """dtype numpy du flux de capture pour un format de DTYPE"""
+    return SAMPLE_FORMATS.get(sample_format, SAMPLE_FORMATS['float32'])[0]
+
+
+def to_float(block, out=None):
+    """Bloc en float32 [-1, 1) : mise à l'échelle des entiers, flottants retournés tels quels
+
+    Avec `out` (tampon préalloué d'au moins len(block) échantillons), la copie
+    est faite sans allocation et une vue sur `out` est retournée.
+    """
+    if block.dtype.kind == 'f':
+        return block
+    scale = np.float32(1.0 / (np.iinfo(block.dtype).max + 1))
+    if out is None:
+        return np.multiply(block, scale, dtype=np.float32)
+    view = out[:len(block)]
+    np.multiply(block, scale, out=view)
+    return view
+
+
+class BlockPool:
+    """Tampons de blocs préalloués, réutilisés en tourniquet
+
+    Remplace les copies `astype()` / `copy()` du callback : le bloc est
+    recopié avec np.copyto dans l'emplacement suivant. Un emplacement est
+    réutilisé après `slots` copies ; le consommateur ne doit donc jamais
+    garder plus de `slots - 1` blocs en attente.
+    """
+
+    def __init__(self, slots, frames, channels=1, dtype=np.float32):
+        self._buf = np.zeros((slots, frames, channels), dtype=dtype)
+        self._next = 0
+
+    def copy(self, block):
+        """Recopie `block` (frames, channels) et retourne la vue sur l'emplacement"""
+        n = len(block)
+        if n > self._buf.shape[1]:
+            return np.array(block, dtype=self._buf.dtype)  # Bloc exceptionnel (hors tourniquet)
+        slot = self._buf[self._next, :n]
+        np.copyto(slot, block)
+        self._next = (self._next + 1) % len(self._buf)
+        return slot
+
+
+class RealtimeLog:
+    """Journal sans verrou pour les threads audio
+
+    Le callback dépose (format, arguments) dans un deque borné (append atomique
+    en CPython, jamais bloquant) ; le formatage et le print ont lieu dans
+    drain(), appelé depuis un thread non temps réel.
+    """
+
+    def __init__(self, maxlen=256):
+        self._events = deque(maxlen=maxlen)
+
+    def post(self, fmt, *args):
+        self._events.append((fmt, args))
+
+    def drain(self):
+        """Affiche les messages en attente (thread interface ou enregistreur)"""
+        while True:
+            try:
+                fmt, args = self._events.popleft()
+            except IndexError:
+                return
+            try:
+                print(fmt.format(*args))
+            except Exception:
+                print(fmt, args)
+
+
+# Instance globale
+rt_log = RealtimeLog()
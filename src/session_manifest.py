@@ -0,0 +1,314 @@
+"""
+Manifeste de session pour NovaQA
+Index des prises terminées (`RESPONSE_FOLDER/manifest.jsonl`, une ligne JSON par
+événement, en ajout seul) : durée, taille, empreinte sha256 et métriques de
+niveau de chaque prise. Les questions « combien de réponses ? », « où
+reprendre ? » et « quelle prise garder ? » deviennent des lectures en mémoire
+au lieu d'un parcours des fichiers.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import soundfile as sf
+
+from .config import RESPONSE_FOLDER, SESSION_MANIFEST_FILE, TAKE_EXPORT_FOLDER
+from .take_writer import STATS_SUFFIX, parse_response_name
+from .take_selection import take_metrics, best_take
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Empreinte sha256 d'un fichier, lu par morceaux"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def next_unanswered(mask, start=0, total=None):
+    """Index (0-based) de la première question sans réponse à partir de `start`, sinon None"""
+    free = ~mask >> start
+    index = start + (free & -free).bit_length() - 1
+    return index if total is None or index < total else None
+
+
+def unanswered(mask, total, start=0):
+    """Itère sur les index des questions sans réponse (trous compris) de `start` à `total`"""
+    index = next_unanswered(mask, start, total)
+    while index is not None:
+        yield index
+        index = next_unanswered(mask, index + 1, total)
+
+
+class SessionManifest:
+    """Prises terminées par question, rejouées depuis le manifeste au chargement
+
+    Événements : `take` (prise K d'une question, avec ses métriques de niveau)
+    et, dans les manifestes plus anciens, `remove` (prise écrasée) ; les types
+    inconnus (ancien `questions`) sont ignorés. Une ligne tronquée par un
+    crash est ignorée. Les questions répondues forment un masque de bits
+    (bit q-1 pour la question q) tenu à jour à chaque événement : couverture,
+    trous et prochaine question sans réponse se lisent sans parcourir les prises.
+    """
+
+    def __init__(self, folder=RESPONSE_FOLDER, filename=SESSION_MANIFEST_FILE):
+        self.folder = folder
+        self.path = os.path.join(folder, filename)
+        self._takes = {}           # numéro de question -> {numéro de prise -> enregistrement}
+        self._answered = 0         # Masque des questions répondues (bit q-1)
+        self._lines = 0
+        self._torn_tail = False    # Dernière ligne sans fin de ligne (écriture interrompue)
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    # === Chargement ===
+
+    def load(self, verify=True):
+        """Charge le manifeste ; le reconstruit s'il manque ou ne correspond plus au dossier
+
+        `verify` compare les fichiers listés à ceux du dossier (un seul listdir) :
+        prises récupérées après un crash ou supprimées à la main.
+        """
+        with self._lock:
+            os.makedirs(self.folder, exist_ok=True)
+            if not os.path.exists(self.path):
+                self.rebuild()
+                return
+            self._replay()
+            if verify and self._files_on_disk() != {t["file"] for t in self._events()}:
+                print("🔄 [MANIFEST] Manifeste désynchronisé du dossier, reconstruction")
+                self.rebuild()
+            elif self._lines > 2 * (len(self._events()) + 1):
+                self._compact()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load(verify=False)
+
+    def _replay(self):
+        self._takes = {}
+        self._answered = 0
+        self._lines = 0
+        self._torn_tail = False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                self._torn_tail = not line.endswith("\n")
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # Dernière ligne tronquée par un crash
+                self._lines += 1
+                self._apply(event)
+        self._loaded = True
+
+    def _apply(self, event):
+        kind = event.get("type")
+        if kind == "take":
+            question = int(event["question"])
+            self._takes.setdefault(question, {})[int(event.get("take", 1))] = event
+            self._answered |= 1 << (question - 1)
+        elif kind == "remove":
+            question = int(event["question"])
+            takes = self._takes.get(question, {})
+            if event.get("take") is None:
+                takes.clear()
+            else:
+                takes.pop(int(event["take"]), None)
+            if not takes:
+                self._takes.pop(question, None)
+                self._answered &= ~(1 << (question - 1))
+
+    def _events(self):
+        """Événements `take` de toutes les prises, par question puis par prise"""
+        return [event for q in sorted(self._takes) for _, event in sorted(self._takes[q].items())]
+
+    def _files_on_disk(self):
+        return {name for name in os.listdir(self.folder) if parse_response_name(name) is not None}
+
+    def rebuild(self):
+        """Reconstruit le manifeste à partir des prises présentes dans le dossier (une seule fois)"""
+        with self._lock:
+            started = time.perf_counter()
+            self._takes = {}
+            self._answered = 0
+            for name in sorted(self._files_on_disk()):
+                try:
+                    self._apply(self._describe(os.path.join(self.folder, name)))
+                except Exception as e:
+                    print(f"⚠️ [MANIFEST] Prise illisible ignorée {name}: {e}")
+            self._compact()
+            self._loaded = True
+            print(f"📒 [MANIFEST] Reconstruit: {len(self._events())} prises, {len(self._takes)} questions "
+                  f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+    def _compact(self):
+        """Réécrit le manifeste avec un seul événement par prise (renommage atomique)"""
+        events = self._events()
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._lines = len(events)
+        self._torn_tail = False
+
+    def _append(self, event):
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if self._torn_tail:
+                f.write("\n")  # Isoler la ligne tronquée pour ne pas corrompre celle-ci
+                self._torn_tail = False
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._lines += 1
+        self._apply(event)
+
+    @staticmethod
+    def _describe(path, duration=None, metrics=None):
+        """Événement `take` d'un fichier de prise
+
+        Sans métriques fournies (reconstruction), elles sont reprises des
+        statistiques enregistrées à côté de la prise : l'audio n'est pas relu.
+        """
+        question_number, take = parse_response_name(os.path.basename(path))
+        if duration is None:
+            duration = sf.info(path).duration
+        if metrics is None:
+            try:
+                with open(path + STATS_SUFFIX, 'r', encoding='utf-8') as f:
+                    metrics = take_metrics(json.load(f))
+            except (OSError, ValueError):
+                metrics = {}
+        return {
+            "type": "take",
+            "question": question_number,
+            "take": take,
+            "file": os.path.basename(path),
+            "duration": round(float(duration), 3),
+            "size": os.path.getsize(path),
+            "sha256": file_sha256(path),
+            "recorded": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getmtime(path))),
+            "metrics": metrics,
+        }
+
+    # === Mises à jour ===
+
+    def record_take(self, path, duration=None, stats=None):
+        """Consigne une prise terminée (thread enregistreur : lit le fichier pour l'empreinte)
+
+        `stats` : statistiques de niveau calculées pendant l'enregistrement,
+        dont les métriques du score sont recopiées dans le manifeste.
+        """
+        try:
+            event = self._describe(path, duration, take_metrics(stats) if stats else None)
+            with self._lock:
+                self._ensure_loaded()
+                self._append(event)
+            print(f"📒 [MANIFEST] Q{event['question']} prise {event['take']}: {event['file']} "
+                  f"({event['duration']:.2f}s, {event['size']} o)")
+        except Exception as e:
+            print(f"⚠️ [MANIFEST] Prise non consignée {path}: {e}")
+
+    def clear(self):
+        """Vide le manifeste (remise à zéro de l'interview)"""
+        with self._lock:
+            self._takes = {}
+            self._answered = 0
+            self._compact()
+            self._loaded = True
+
+    # === Requêtes O(1) ===
+
+    def answered_mask(self):
+        """Masque des questions répondues : bit i pour la question i+1"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._answered
+
+    def answered_count(self, total=None):
+        """Nombre de questions répondues (limité aux `total` premières si donné), trous compris"""
+        mask = self.answered_mask()
+        if total is not None:
+            mask &= (1 << total) - 1
+        return bin(mask).count("1")
+
+    def is_answered(self, question_number):
+        with self._lock:
+            self._ensure_loaded()
+            return question_number in self._takes
+
+    def takes(self, question_number):
+        """Enregistrements des prises d'une question, par numéro de prise croissant"""
+        with self._lock:
+            self._ensure_loaded()
+            takes = self._takes.get(question_number, {})
+            return [takes[k] for k in sorted(takes)]
+
+    def take(self, question_number, take=None):
+        """Enregistrement d'une prise (dict) ou None ; sans numéro, la meilleure prise de la question"""
+        if take is None:
+            return best_take(self.takes(question_number))
+        with self._lock:
+            self._ensure_loaded()
+            return self._takes.get(question_number, {}).get(take)
+
+    def next_take(self, question_number):
+        """Numéro de la prochaine prise d'une question"""
+        with self._lock:
+            self._ensure_loaded()
+            return max(self._takes.get(question_number, {0: None})) + 1
+
+    # === Export ===
+
+    @staticmethod
+    def clear_export(destination=TAKE_EXPORT_FOLDER):
+        """Supprime les prises exportées (`reponse_*`) de `destination` ; retourne leur nombre"""
+        removed = 0
+        if not os.path.isdir(destination):
+            return removed
+        for name in os.listdir(destination):
+            if parse_response_name(name) is None:
+                continue
+            try:
+                os.remove(os.path.join(destination, name))
+                removed += 1
+            except OSError as e:
+                print(f"⚠️ [MANIFEST] Suppression impossible {name}: {e}")
+        return removed
+
+    def export_best_takes(self, destination=TAKE_EXPORT_FOLDER):
+        """Remplace le contenu de `destination` par la meilleure prise de chaque question (`reponse_XX.<ext>`)
+
+        Choix fait sur les métriques du manifeste (take_selection.py), sans
+        décoder l'audio. Les exports précédents sont d'abord supprimés (autre
+        session, autre format). Copie des fichiers : à appeler hors du thread
+        GUI (TakeExporter). Retourne le nombre de prises exportées.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            questions = sorted(self._takes)
+        os.makedirs(destination, exist_ok=True)
+        self.clear_export(destination)
+        exported = 0
+        for question_number in questions:
+            take = self.take(question_number)
+            source = os.path.join(self.folder, take["file"])
+            target = os.path.join(destination, f"reponse_{question_number:02d}{os.path.splitext(take['file'])[1]}")
+            try:
+                shutil.copy2(source, target)
+                exported += 1
+                print(f"📤 [MANIFEST] Q{question_number}: prise {take['take']}/{len(self.takes(question_number))} exportée")
+            except OSError as e:
+                print(f"⚠️ [MANIFEST] Export impossible {take['file']}: {e}")
+        return exported
+
+
+# Instance globale
+session_manifest = SessionManifest()
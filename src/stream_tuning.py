@@ -0,0 +1,91 @@
+"""
+Réglage automatique de la taille de bloc et de la latence des flux pour NovaQA
+La sonde d'instrumentation de chaque flux compte ses xruns (drapeaux `status`)
+et la charge CPU de son callback ; à la fermeture, le palier blocksize/latence
+du périphérique est monté ou descendu puis mémorisé dans le cache des périphériques.
+"""
+
+import time
+
+from .config import (
+    ADAPTIVE_STREAMS, BLOCKSIZE_LADDER, XRUN_MAX_PER_MIN, OVERLOAD_MAX_RATIO,
+    CALLBACK_LOAD_LOW, TUNING_CLEAN_SESSIONS, TUNING_MIN_SESSION_SEC,
+)
+from .device_cache import device_cache
+
+
+def next_setting(blocksize, latency, summary, clean_sessions):
+    """Palier de la prochaine session ; retourne (blocksize, latency, clean_sessions, raison)
+
+    Monter : trop de xruns ou de blocs surchargés (bloc plus grand, puis
+    latence 'high' au dernier palier). Descendre : après TUNING_CLEAN_SESSIONS
+    sessions sans xrun à charge faible (latence 'low' d'abord, puis bloc plus petit).
+    """
+    ladder = sorted(BLOCKSIZE_LADDER)
+    step = _nearest_step(ladder, blocksize)
+    too_short = summary["seconds"] < TUNING_MIN_SESSION_SEC
+
+    unstable = (summary["xruns_per_min"] > XRUN_MAX_PER_MIN and summary["xruns"] >= 2) \
+        or (summary["overload_ratio"] > OVERLOAD_MAX_RATIO and not too_short)
+    if unstable:
+        if step < len(ladder) - 1:
+            return ladder[step + 1], latency, 0, "instable"
+        if latency != 'high':
+            return ladder[step], 'high', 0, "instable (dernier palier)"
+        return ladder[step], latency, 0, None
+
+    if too_short:
+        return ladder[step], latency, clean_sessions, None
+    if summary["xruns"] or summary["load_mean"] > CALLBACK_LOAD_LOW:
+        return ladder[step], latency, 0, None
+
+    clean_sessions += 1
+    if clean_sessions < TUNING_CLEAN_SESSIONS:
+        return ladder[step], latency, clean_sessions, None
+    if latency == 'high':
+        return ladder[step], 'low', 0, "stable"
+    if step > 0:
+        return ladder[step - 1], latency, 0, "stable"
+    return ladder[step], latency, clean_sessions, None
+
+
+def _nearest_step(ladder, blocksize):
+    return min(range(len(ladder)), key=lambda i: abs(ladder[i] - int(blocksize)))
+
+
+class StreamTuner:
+    """Choix et mémorisation du palier blocksize/latence par périphérique et par sens"""
+
+    def settings(self, kind, device_index, default_blocksize, default_latency='low'):
+        """(blocksize, latency) à utiliser pour ouvrir un flux ('input' ou 'output')"""
+        if not ADAPTIVE_STREAMS or device_index is None:
+            return default_blocksize, default_latency
+        tuning = device_cache.stream_tuning(device_index, kind)
+        if not tuning:
+            return default_blocksize, default_latency
+        return int(tuning.get("blocksize", default_blocksize)), tuning.get("latency", default_latency)
+
+    def conclude(self, kind, device_index, probe, latency):
+        """Bilan d'une session (flux fermé, CallbackProbe) : ajuste et mémorise le palier suivant"""
+        if not ADAPTIVE_STREAMS or device_index is None or probe is None:
+            return
+        summary = probe.summary()
+        tuning = device_cache.stream_tuning(device_index, kind) or {}
+        blocksize, latency, clean, reason = next_setting(
+            probe.blocksize, latency, summary, int(tuning.get("clean_sessions", 0)))
+        print(f"📈 [TUNING] Session {kind}: {summary['seconds']:.0f}s, {summary['xruns']} xruns "
+              f"({summary['xruns_per_min']}/min), charge moy. {summary['load_mean']:.0%} "
+              f"max {summary['load_peak']:.0%}")
+        if reason:
+            print(f"🔧 [TUNING] Flux {kind} {reason}: blocksize {probe.blocksize} -> {blocksize}, latence {latency}")
+        device_cache.record_stream_tuning(device_index, kind, {
+            "blocksize": blocksize,
+            "latency": latency,
+            "clean_sessions": clean,
+            "last_session": summary,
+            "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+
+# Instance globale
+stream_tuner = StreamTuner()
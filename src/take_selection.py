@@ -0,0 +1,59 @@
+"""
+Choix de la meilleure prise pour NovaQA
+Les métriques de niveau de chaque prise (crête, RMS, SNR, écrêtage) sont
+calculées pendant l'enregistrement et consignées dans le manifeste : le score
+se calcule à partir de ces quelques nombres, sans relire ni décoder l'audio.
+"""
+
+from .config import (
+    TAKE_SCORE_TARGET_SPEECH_DBFS, TAKE_SCORE_LEVEL_TOLERANCE_DB, TAKE_SCORE_SNR_CAP_DB,
+    TAKE_SCORE_CLIP_PENALTY_DB, TAKE_SCORE_MIN_SPEECH_SEC,
+)
+
+
+# Statistiques de prise (TakeLevelStats.to_dict) recopiées dans le manifeste
+TAKE_METRICS = ("peak_dbfs", "rms_dbfs", "speech_rms_dbfs", "speech_sec",
+                "noise_rms_dbfs", "snr_db", "clipped_samples", "clip_events")
+
+
+def take_metrics(stats):
+    """Sous-ensemble des statistiques de niveau utile au score (dict, vide si inconnu)"""
+    if not stats:
+        return {}
+    return {key: stats[key] for key in TAKE_METRICS if key in stats}
+
+
+def score_take(metrics):
+    """Score d'une prise (plus haut = meilleur), None sans métriques
+
+    SNR plafonné à TAKE_SCORE_SNR_CAP_DB, moins l'écart du niveau de parole
+    au-delà de la tolérance autour de TAKE_SCORE_TARGET_SPEECH_DBFS, moins
+    TAKE_SCORE_CLIP_PENALTY_DB par épisode d'écrêtage. Une prise avec moins de
+    TAKE_SCORE_MIN_SPEECH_SEC de parole perd l'équivalent du SNR maximal.
+    """
+    if not metrics or "snr_db" not in metrics:
+        return None
+    score = min(float(metrics["snr_db"]), TAKE_SCORE_SNR_CAP_DB)
+    level_error = abs(float(metrics.get("speech_rms_dbfs", TAKE_SCORE_TARGET_SPEECH_DBFS))
+                      - TAKE_SCORE_TARGET_SPEECH_DBFS)
+    score -= max(0.0, level_error - TAKE_SCORE_LEVEL_TOLERANCE_DB)
+    score -= TAKE_SCORE_CLIP_PENALTY_DB * int(metrics.get("clip_events", 0))
+    if float(metrics.get("speech_sec", 0.0)) < TAKE_SCORE_MIN_SPEECH_SEC:
+        score -= TAKE_SCORE_SNR_CAP_DB
+    return round(score, 2)
+
+
+def best_take(takes):
+    """Meilleure prise parmi des enregistrements du manifeste (la plus récente à score égal)
+
+    Les prises sans métriques (reconstruites sans statistiques) passent après
+    les prises notées ; entre elles, la plus récente l'emporte.
+    """
+    if not takes:
+        return None
+
+    def rank(take):
+        score = score_take(take.get("metrics"))
+        return (score is not None, score if score is not None else 0.0, int(take.get("take", 1)))
+
+    return max(takes, key=rank)
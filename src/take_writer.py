@@ -0,0 +1,353 @@
+"""
+Écriture en flux des prises audio pour NovaQA
+Les blocs capturés passent par une file bornée vers un thread d'écriture
+qui les ajoute directement au fichier ouvert (mémoire constante). En FLAC
+ou Ogg/Opus, l'encodage a lieu dans ce même thread, au fil de l'eau.
+"""
+
+import json
+import os
+import queue
+import re
+import threading
+import numpy as np
+import soundfile as sf
+
+from .config import (
+    WRITER_QUEUE_BLOCKS, JOURNAL_CHECKPOINT_SEC, MIN_RECOVERABLE_SEC, BLOCKSIZE,
+    RESPONSE_FOLDER, RESPONSE_FORMAT, RESPONSE_SUBTYPE, DTYPE,
+)
+from .rt_dsp import BlockPool, SAMPLE_FORMATS
+from .instrumentation import instrumentation
+
+
+_END_OF_TAKE = None  # Sentinelle de fin de prise
+
+PART_SUFFIX = ".part"        # Prise en cours d'écriture
+JOURNAL_SUFFIX = ".journal"  # Journal des points de contrôle de la prise
+STATS_SUFFIX = ".stats.json"  # Statistiques de niveau de la prise (contrôle qualité)
+
+# Formats de stockage des prises : extension et sous-types libsndfile acceptés
+TAKE_FORMATS = {
+    "WAV": (".wav", ("PCM_16", "PCM_24", "FLOAT")),
+    "FLAC": (".flac", ("PCM_16", "PCM_24")),
+    "OGG": (".ogg", ("OPUS", "VORBIS")),
+}
+RESPONSE_EXTENSIONS = tuple(extension for extension, _ in TAKE_FORMATS.values())
+OPUS_SAMPLERATES = (8000, 12000, 16000, 24000, 48000)  # Seules fréquences acceptées par l'encodeur Opus
+
+
+def resolve_take_format(samplerate, fmt=RESPONSE_FORMAT, subtype=RESPONSE_SUBTYPE, sample_format=DTYPE):
+    """Retourne le couple (format, sous-type) réellement utilisable pour une prise
+
+    Repli sur FLAC/PCM_24 si la combinaison configurée est inconnue, absente de
+    la libsndfile installée, ou si Opus est demandé à une fréquence qu'il ne
+    prend pas en charge (44.1kHz par exemple). En capture entière, les formats
+    sans perte stockent le PCM de capture tel quel (PCM_16 ou PCM_24).
+    """
+    fmt, subtype = str(fmt).upper(), str(subtype).upper()
+    capture_subtype = SAMPLE_FORMATS.get(sample_format, SAMPLE_FORMATS['float32'])[1]
+    if capture_subtype and fmt in ("WAV", "FLAC"):
+        subtype = capture_subtype
+    if fmt not in TAKE_FORMATS or subtype not in TAKE_FORMATS[fmt][1]:
+        reason = f"{fmt}/{subtype} non pris en charge"
+    elif subtype not in sf.available_subtypes(fmt):
+        reason = f"{fmt}/{subtype} absent de libsndfile {sf.__libsndfile_version__}"
+    elif subtype == "OPUS" and int(samplerate) not in OPUS_SAMPLERATES:
+        reason = f"Opus indisponible à {int(samplerate)}Hz"
+    else:
+        return fmt, subtype
+    print(f"⚠️ [WRITER] {reason} - repli sur FLAC/PCM_24")
+    return "FLAC", "PCM_24"
+
+
+_RESPONSE_NAME = re.compile(r"^reponse_(\d+)(?:_take(\d+))?(\.[a-z0-9]+)$")
+
+
+def response_path(question_number, take=1, fmt=RESPONSE_FORMAT, folder=RESPONSE_FOLDER):
+    """Chemin de la prise `take` d'une question dans le format donné (`reponse_XX_takeK.<ext>`)"""
+    extension = TAKE_FORMATS.get(str(fmt).upper(), TAKE_FORMATS["WAV"])[0]
+    return os.path.join(folder, f"reponse_{question_number:02d}_take{take}{extension}")
+
+
+def parse_response_name(filename):
+    """(numéro de question, numéro de prise) d'un fichier de prise, sinon None
+
+    Les prises uniques des versions précédentes (`reponse_XX.<ext>`) comptent
+    comme prise 1.
+    """
+    match = _RESPONSE_NAME.match(filename)
+    if match is None or match.group(3) not in RESPONSE_EXTENSIONS:
+        return None
+    return int(match.group(1)), int(match.group(2) or 1)
+
+
+def free_take_number(question_number, take=1, folder=RESPONSE_FOLDER):
+    """Premier numéro de prise >= `take` sans fichier, final ou partiel, dans aucun format"""
+    legacy = [os.path.join(folder, f"reponse_{question_number:02d}{extension}") for extension in RESPONSE_EXTENSIONS]
+
+    def in_use(k):
+        paths = [response_path(question_number, k, fmt, folder) for fmt in TAKE_FORMATS]
+        return any(os.path.exists(path) or os.path.exists(path + PART_SUFFIX)
+                   for path in paths + (legacy if k == 1 else []))
+    while in_use(take):
+        take += 1
+    return take
+
+
+class StreamingTakeWriter:
+    """Écrivain de prise en flux vers un soundfile.SoundFile ouvert
+
+    En mode journalisé, l'audio est écrit dans `<fichier>.part` ; l'en-tête est
+    resynchronisé et fsync-é toutes les JOURNAL_CHECKPOINT_SEC secondes, et le
+    nombre d'échantillons sûrs est consigné dans `<fichier>.journal`. Le fichier
+    final n'apparaît qu'une fois la prise complète (renommage atomique).
+
+    `fmt` / `subtype` choisissent le codec (voir resolve_take_format) ; une prise
+    FLAC ou Ogg interrompue se relit jusqu'à sa dernière trame (page) vidée.
+    `dtype` et `blocksize` sont ceux du flux de capture : des blocs int16/int32
+    sont écrits en PCM entier sans passer par le flottant.
+    """
+
+    def __init__(self, output_file, samplerate, channels=1, queue_blocks=WRITER_QUEUE_BLOCKS,
+                 journaled=False, fmt="WAV", subtype=None, dtype=np.float32, blocksize=BLOCKSIZE):
+        self.output_file = output_file
+        self.samplerate = int(samplerate)
+        self.channels = channels
+        self.journaled = journaled
+        self.format = fmt
+        self.subtype = subtype  # None : sous-type par défaut du format (PCM_16 en WAV)
+        self.frames_written = 0
+        self.frames_committed = 0  # Échantillons garantis sur disque (dernier point de contrôle)
+        self.dropped_blocks = 0
+        self.error = None
+        self._q = queue.Queue(maxsize=queue_blocks)
+        # File pleine + bloc en cours d'écriture : queue_blocks + 1 emplacements occupés au plus
+        self._pool = BlockPool(queue_blocks + 2, blocksize, channels, dtype=dtype)
+        self._file = None
+        self._fh = None
+        self._thread = None
+        self._closing = False
+        self._checkpoint_frames = max(1, int(JOURNAL_CHECKPOINT_SEC * self.samplerate))
+        self.part_file = output_file + PART_SUFFIX
+        self.journal_file = output_file + JOURNAL_SUFFIX
+
+    def start(self):
+        """Ouvre le fichier de sortie et lance le thread d'écriture"""
+        if self.journaled:
+            self._fh = open(self.part_file, 'w+b')
+            self._file = sf.SoundFile(
+                self._fh, mode='w', format=self.format, subtype=self.subtype,
+                samplerate=self.samplerate, channels=self.channels,
+            )
+            self._write_journal()
+        else:
+            self._file = sf.SoundFile(
+                self.output_file, mode='w', format=self.format, subtype=self.subtype,
+                samplerate=self.samplerate, channels=self.channels,
+            )
+        self._thread = threading.Thread(target=self._run, name="TakeWriter", daemon=True)
+        self._thread.start()
+        mode = "journalisée" if self.journaled else "directe"
+        print(f"💾 [WRITER] Écriture en flux ({mode}, {self._file.format}/{self._file.subtype}) ouverte: {self.output_file}")
+
+    def write(self, block, copy=True):
+        """Pousse un bloc (appelé depuis le callback audio, jamais bloquant)
+
+        Par défaut le bloc est recopié dans un tampon préalloué (`indata` n'est
+        valide que pendant le callback) ; copy=False le transmet tel quel.
+        """
+        if self._closing:
+            return
+        # Un seul producteur : si la file n'est pas pleine, put_nowait réussit
+        if self._q.full():
+            self.dropped_blocks += 1
+            return
+        try:
+            self._q.put_nowait(self._pool.copy(block) if copy else block)
+        except queue.Full:
+            self.dropped_blocks += 1  # Sentinelle de close() arrivée entre-temps
+
+    def close(self):
+        """Demande la finalisation du fichier dès que la file est vidée"""
+        if self._closing or self._thread is None:
+            return
+        self._closing = True
+        self._q.put(_END_OF_TAKE)
+
+    def wait(self, timeout=None):
+        """Attend la fermeture effective du fichier"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self._thread is None or not self._thread.is_alive()
+
+    @property
+    def duration(self):
+        return self.frames_written / self.samplerate if self.samplerate else 0.0
+
+    def discard(self):
+        """Supprime le fichier (prise vide ou invalide)"""
+        for path in (self.output_file, self.part_file, self.journal_file, self.output_file + STATS_SUFFIX):
+            _remove_quietly(path)
+
+    def _run(self):
+        try:
+            while True:
+                block = self._q.get()
+                if block is _END_OF_TAKE:
+                    break
+                if self.error is not None:
+                    continue  # Continuer à vider la file pour ne pas bloquer close()
+                try:
+                    self._file.write(block)
+                    self.frames_written += len(block)
+                    if self.journaled and self.frames_written - self.frames_committed >= self._checkpoint_frames:
+                        self._checkpoint()
+                except Exception as e:
+                    self.error = e
+                    print(f"❌ [WRITER] Erreur écriture {self.output_file}: {e}")
+        finally:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            if self.journaled:
+                self._finalize_journaled()
+            if self.dropped_blocks:
+                print(f"⚠️ [WRITER] {self.dropped_blocks} blocs perdus (file pleine)")
+                instrumentation.count_drops('take_writer', self.dropped_blocks)
+
+    def _checkpoint(self):
+        """Met à jour l'en-tête, force l'écriture disque puis consigne le point de contrôle"""
+        self._file.flush()  # libsndfile réécrit l'en-tête WAV / vide les trames FLAC en attente
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self.frames_committed = self.frames_written
+        self._write_journal()
+
+    def _write_journal(self):
+        journal = {
+            "output_file": os.path.basename(self.output_file),
+            "samplerate": self.samplerate,
+            "channels": self.channels,
+            "frames": self.frames_committed,
+        }
+        _atomic_write_json(self.journal_file, journal)
+
+    def _finalize_journaled(self):
+        """Rend la prise visible sous son nom définitif puis efface le journal"""
+        try:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            if self.error is None and self.frames_written > 0:
+                os.replace(self.part_file, self.output_file)
+            _remove_quietly(self.journal_file)
+        except Exception as e:
+            self.error = self.error or e
+            print(f"❌ [WRITER] Erreur finalisation {self.output_file}: {e}")
+
+
+def _atomic_write_json(path, payload):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def write_take_stats(output_file, stats):
+    """Enregistre les statistiques de niveau à côté de la prise (`<prise>.stats.json`)"""
+    try:
+        _atomic_write_json(output_file + STATS_SUFFIX, stats)
+    except Exception as e:
+        print(f"⚠️ [WRITER] Statistiques non enregistrées pour {output_file}: {e}")
+
+
+def _remove_quietly(path):
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        print(f"⚠️ [WRITER] Impossible de supprimer {path}: {e}")
+
+
+def recover_incomplete_takes(folder):
+    """Répare ou supprime les prises interrompues (crash, coupure de courant)
+
+    Chaque journal restant désigne une prise non finalisée : les échantillons
+    consignés au dernier point de contrôle sont recopiés dans le fichier final
+    s'ils représentent au moins MIN_RECOVERABLE_SEC secondes, sinon la prise est
+    abandonnée. La prise récupérée garde le format de la prise partielle.
+    Retourne (nb récupérées, nb supprimées).
+    """
+    recovered = discarded = 0
+    if not os.path.isdir(folder):
+        return recovered, discarded
+
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith(JOURNAL_SUFFIX):
+            continue
+        journal_file = os.path.join(folder, filename)
+        output_file = journal_file[:-len(JOURNAL_SUFFIX)]
+        part_file = output_file + PART_SUFFIX
+
+        try:
+            with open(journal_file, 'r', encoding='utf-8') as f:
+                journal = json.load(f)
+            frames = int(journal.get("frames", 0))
+            samplerate = int(journal.get("samplerate", 0))
+        except Exception as e:
+            print(f"⚠️ [RECOVERY] Journal illisible {filename}: {e}")
+            frames, samplerate = 0, 0
+
+        if os.path.exists(output_file):
+            # Crash entre le renommage et l'effacement du journal : la prise est complète
+            pass
+        elif samplerate > 0 and frames >= MIN_RECOVERABLE_SEC * samplerate and os.path.exists(part_file):
+            try:
+                _copy_frames(part_file, output_file, frames)
+                recovered += 1
+                print(f"🩹 [RECOVERY] Prise récupérée: {os.path.basename(output_file)} ({frames / samplerate:.2f}s)")
+            except Exception as e:
+                print(f"❌ [RECOVERY] Prise irrécupérable {os.path.basename(output_file)}: {e}")
+                _remove_quietly(output_file + ".tmp")
+                discarded += 1
+        else:
+            print(f"🗑️  [RECOVERY] Prise incomplète abandonnée: {os.path.basename(output_file)}")
+            discarded += 1
+
+        _remove_quietly(part_file)
+        _remove_quietly(journal_file)
+
+    # Fichiers .part orphelins (journal jamais écrit)
+    for filename in os.listdir(folder):
+        if filename.endswith(PART_SUFFIX):
+            _remove_quietly(os.path.join(folder, filename))
+            discarded += 1
+
+    return recovered, discarded
+
+
+def _copy_frames(part_file, output_file, frames, blocksize=65536):
+    """Recopie les `frames` premiers échantillons de la prise partielle, bloc par bloc"""
+    tmp = output_file + ".tmp"
+    with sf.SoundFile(part_file) as src:
+        if src.format != 'WAV':
+            blocksize = 4096  # Flux compressé tronqué : ne perdre qu'un petit bloc à l'erreur de décodage
+        with sf.SoundFile(tmp, mode='w', format=src.format, samplerate=src.samplerate,
+                          channels=src.channels, subtype=src.subtype) as dst:
+            remaining = min(frames, src.frames) if src.frames > 0 else frames
+            while remaining > 0:
+                try:
+                    block = src.read(min(blocksize, remaining), dtype='float32')
+                except RuntimeError:
+                    if remaining == frames:
+                        raise
+                    break  # Flux compressé interrompu : dernière trame incomplète, garder ce qui précède
+                if len(block) == 0:
+                    break
+                dst.write(block)
+                remaining -= len(block)
+    os.replace(tmp, output_file)
@@ -0,0 +1,153 @@
+"""
+Détection d'activité vocale (VAD) pour NovaQA
+Décision trame par trame vectorisée avec numpy : énergie court terme,
+taux de passage par zéro et planéité spectrale, lissée par hangover
+"""
+
+import numpy as np
+
+from .config import (
+    VU_METER_THRESHOLD, SPEECH_START_THRESHOLD_SEC, SPEECH_SILENCE_TIMEOUT_MS,
+    SPEECH_TOLERANCE_MS, MIN_SILENCE_DURATION_MS, VAD_FRAME_MS, VAD_FLATNESS_MAX,
+    VAD_ZCR_MAX
+)
+
+# Événements retournés par VoiceActivityDetector.process()
+SPEECH_STARTED = "speech"      # Parole confirmée (SPEECH_START_THRESHOLD_SEC)
+SILENCE_STARTED = "silence"    # Silence après parole (MIN_SILENCE_DURATION_MS)
+END_OF_SPEECH = "end"          # Fin de réponse (SPEECH_SILENCE_TIMEOUT_MS)
+
+
+class VoiceActivityDetector:
+    """Détecteur d'activité vocale alimenté bloc par bloc
+
+    Une trame est parlée si son énergie dépasse `threshold_db` et si elle n'a
+    pas à la fois un spectre plat et un ZCR élevé (signature du bruit large
+    bande). Le début de parole exige SPEECH_START_THRESHOLD_SEC de trames
+    réellement voisées (les micro-pauses ne remettent pas le compte à zéro mais
+    n'y ajoutent rien) : un clic isolé ne déclenche rien. Le hangover
+    (SPEECH_TOLERANCE_MS) ne s'applique qu'à la fin de parole, qu'il retarde
+    pendant les micro-pauses ; les durées de silence configurées l'incluent.
+    """
+
+    def __init__(self, samplerate, threshold_db=VU_METER_THRESHOLD, frame_ms=VAD_FRAME_MS):
+        self.samplerate = int(samplerate)
+        self.threshold_db = threshold_db
+        self.frame_len = max(1, int(self.samplerate * frame_ms / 1000))
+        frame_sec = self.frame_len / self.samplerate
+
+        self.hangover_frames = int(round(SPEECH_TOLERANCE_MS / 1000 / frame_sec))
+        self.start_frames = max(1, int(round(SPEECH_START_THRESHOLD_SEC / frame_sec)))
+        self._frame_sec = frame_sec
+        self.min_silence_ms = MIN_SILENCE_DURATION_MS
+        self.silence_frames = self._frames_after_hangover(MIN_SILENCE_DURATION_MS, frame_sec)
+        self.end_frames = self._frames_after_hangover(SPEECH_SILENCE_TIMEOUT_MS, frame_sec)
+
+        self._window = np.hanning(self.frame_len).astype(np.float32)
+        self._carry = np.zeros(self.frame_len, dtype=np.float32)
+        self._carry_len = 0
+        self.reset()
+
+    def _frames_after_hangover(self, duration_ms, frame_sec):
+        return max(1, int(round((duration_ms - SPEECH_TOLERANCE_MS) / 1000 / frame_sec)))
+
+    def set_min_silence_ms(self, min_silence_ms):
+        """Ajuste la durée de silence signalée (profil d'environnement)"""
+        if min_silence_ms != self.min_silence_ms:
+            self.min_silence_ms = min_silence_ms
+            self.silence_frames = self._frames_after_hangover(min_silence_ms, self._frame_sec)
+
+    def reset(self):
+        """Remet l'état de détection à zéro (nouvelle prise)"""
+        self._carry_len = 0
+        self._frames_since_voice = self.hangover_frames + 1
+        self.voiced_count = 0  # Trames voisées brutes depuis la dernière pause > hangover
+        self.silence_run = 0
+        self.in_speech = False
+        self.has_spoken = False
+        self.ended = False
+        self.last_energy_db = -np.inf
+
+    def frame_features(self, frames):
+        """Caractéristiques par trame pour une matrice (n_trames, frame_len)
+
+        Retourne (énergie dBFS, ZCR, planéité spectrale).
+        """
+        energy = np.mean(np.square(frames), axis=1)
+        energy_db = 10.0 * np.log10(energy + 1e-12)
+
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_len - 1)
+
+        power = np.square(np.abs(np.fft.rfft(frames * self._window, axis=1))) + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        return energy_db, zcr, flatness
+
+    def classify(self, frames):
+        """Décision brute parole / non-parole par trame"""
+        energy_db, zcr, flatness = self.frame_features(frames)
+        if len(energy_db):
+            self.last_energy_db = float(energy_db[-1])
+        loud = energy_db > self.threshold_db
+        noise_like = (flatness >= VAD_FLATNESS_MAX) & (zcr >= VAD_ZCR_MAX)
+        return loud & ~noise_like
+
+    def process(self, block):
+        """Traite un bloc mono (ou (frames, 1)) et retourne la liste des événements"""
+        x = np.asarray(block, dtype=np.float32).reshape(-1)
+        if self._carry_len:
+            x = np.concatenate((self._carry[:self._carry_len], x))
+        n_frames = len(x) // self.frame_len
+        rest = len(x) - n_frames * self.frame_len
+        self._carry[:rest] = x[len(x) - rest:]
+        self._carry_len = rest
+        if n_frames == 0:
+            return []
+
+        raw = self.classify(x[:n_frames * self.frame_len].reshape(n_frames, self.frame_len))
+        return self._update_state(raw, self._smooth(raw))
+
+    def _smooth(self, raw):
+        """Hangover : une trame reste parlée jusqu'à hangover_frames après la dernière voix"""
+        n = len(raw)
+        idx = np.arange(n)
+        # Index de la dernière trame voisée (négatif = bloc précédent)
+        last_voice = np.maximum.accumulate(np.where(raw, idx, -self._frames_since_voice))
+        since = idx - last_voice
+        self._frames_since_voice = min(n - int(last_voice[-1]), self.hangover_frames + 1)
+        return since <= self.hangover_frames
+
+    def _update_state(self, raw, voiced):
+        """Met à jour le compte de voix et la série de silence, produit les transitions
+
+        `raw` : décision brute par trame (début de parole) ; `voiced` : décision
+        lissée par le hangover (fin de parole).
+        """
+        n = len(voiced)
+        # Trames voisées brutes cumulées, remises à zéro à chaque trame hors hangover
+        cumulative = self.voiced_count + np.cumsum(raw)
+        counts = cumulative - np.maximum.accumulate(np.where(voiced, 0, cumulative))
+        onset = bool(counts.max() >= self.start_frames)
+        self.voiced_count = int(counts[-1])
+
+        if voiced[-1]:
+            self.silence_run = 0
+        else:
+            # Longueur de la série finale de silence
+            change = np.flatnonzero(voiced[::-1])
+            self.silence_run = self.silence_run + n if not len(change) else int(change[0])
+
+        events = []
+        if not self.in_speech and onset:
+            self.in_speech = True
+            self.has_spoken = True
+            self.ended = False
+            events.append(SPEECH_STARTED)
+        elif self.in_speech and self.silence_run >= self.silence_frames:
+            self.in_speech = False
+            events.append(SILENCE_STARTED)
+
+        if self.has_spoken and not self.ended and not self.in_speech and self.silence_run >= self.end_frames:
+            self.ended = True
+            events.append(END_OF_SPEECH)
+        return events
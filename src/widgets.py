@@ -9,21 +9,45 @@ from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtGui import QPainter, QPen, QColor, QFont
 
 from .config import DBFS_FLOOR
+from .capture_hub import capture_hub
+from .rt_dsp import block_power, power_to_dbfs
 
 
 class AudioMeterWidget(QWidget):
-    """Vue-mètre horizontal"""
+    """Vue-mètre horizontal : RMS (barre), crête, maintien de crête et voyant d'écrêtage"""
+    
+    CLIP_LED_WIDTH = 14
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMinimumHeight(35)
         self.setMaximumHeight(35)
         self.setMinimumWidth(300)
+        self.setToolTip("Cliquer pour réarmer le voyant d'écrêtage")
         self._dbfs = -math.inf
+        self._reading = None  # Dernier MeterReading reçu
+        self._clip_ack = 0    # Écrêtages déjà acquittés (clic sur le vue-mètre)
 
     def set_dbfs(self, db: float):
         self._dbfs = db
         self.update()
+    
+    def set_reading(self, reading):
+        """Affiche une mesure complète (barre RMS avec balistique, crêtes, LUFS)"""
+        self._reading = reading
+        self._dbfs = reading.rms_display_db
+        self.update()
+    
+    def mousePressEvent(self, event):
+        # Réarmement du voyant d'écrêtage
+        if self._reading is not None:
+            self._clip_ack = self._reading.clip_count
+            self.update()
+        super().mousePressEvent(event)
+    
+    def _x_for(self, db, rect):
+        frac = (db - DBFS_FLOOR) / (0.0 - DBFS_FLOOR)
+        return rect.left() + 4 + int(float(np.clip(frac, 0.0, 1.0)) * (rect.width() - 8))
 
     def paintEvent(self, event):
         try:
@@ -38,6 +62,15 @@ class AudioMeterWidget(QWidget):
             pen.setWidth(2)
             p.setPen(pen)
             p.drawRoundedRect(rect.adjusted(1, 1, -1, -1), 8, 8)
+            
+            # Voyant d'écrêtage à droite (allumé jusqu'au réarmement)
+            reading = self._reading
+            bar_rect = rect
+            if reading is not None:
+                bar_rect = rect.adjusted(0, 0, -(self.CLIP_LED_WIDTH + 4), 0)
+                led = rect.adjusted(rect.width() - self.CLIP_LED_WIDTH - 6, 6, -6, -6)
+                clipped = reading.clip_count > self._clip_ack
+                p.fillRect(led, QColor(255, 30, 30) if clipped else QColor(60, 20, 20))
 
             # Meter fill
             if np.isfinite(self._dbfs):
@@ -47,8 +80,8 @@ class AudioMeterWidget(QWidget):
                 frac = 0.0
 
             if frac > 0:
-                fill_width = int(frac * (rect.width() - 8))
-                fill_rect = rect.adjusted(4, 4, 4 + fill_width - rect.width(), -4)
+                fill_width = int(frac * (bar_rect.width() - 8))
+                fill_rect = bar_rect.adjusted(4, 4, 4 + fill_width - bar_rect.width(), -4)
                 
                 # Color gradient
                 if self._dbfs < -30:
@@ -61,16 +94,30 @@ class AudioMeterWidget(QWidget):
                     color = QColor(255, int(255 * (1 - ratio)), 0)
                 
                 p.fillRect(fill_rect, color)
+            
+            # Crête (trait fin) et maintien de crête (trait épais)
+            if reading is not None:
+                x = self._x_for(reading.peak_db, bar_rect)
+                p.setPen(QPen(QColor(255, 255, 255, 160), 1))
+                p.drawLine(x, bar_rect.top() + 4, x, bar_rect.bottom() - 4)
+                x = self._x_for(reading.peak_hold_db, bar_rect)
+                p.setPen(QPen(QColor(255, 159, 28), 3))
+                p.drawLine(x, bar_rect.top() + 4, x, bar_rect.bottom() - 4)
 
             # Text
             p.setPen(QPen(QColor(230, 230, 235)))
             font = p.font()
-            font.setPointSize(10)
+            font.setPointSize(9 if reading is not None else 10)
             font.setWeight(QFont.Weight.Bold)
             p.setFont(font)
             
-            label = "RMS: -∞ dBFS" if not np.isfinite(self._dbfs) else f"RMS: {self._dbfs:0.1f} dBFS"
-            p.drawText(rect.adjusted(8, 4, -8, -4), Qt.AlignmentFlag.AlignCenter, label)
+            if reading is not None:
+                label = (f"RMS {self._dbfs:0.1f} | PK {reading.peak_hold_db:0.1f} | "
+                         f"TP {reading.true_peak_db:0.1f} dBTP | M {reading.momentary_lufs:0.1f} "
+                         f"S {reading.short_term_lufs:0.1f} LUFS")
+            else:
+                label = "RMS: -∞ dBFS" if not np.isfinite(self._dbfs) else f"RMS: {self._dbfs:0.1f} dBFS"
+            p.drawText(bar_rect.adjusted(8, 4, -8, -4), Qt.AlignmentFlag.AlignCenter, label)
         except Exception as e:
             print(f"Erreur paintEvent: {e}")
 
@@ -153,9 +200,8 @@ class EnvironmentAnalysisPopup(QDialog):
         self.start_time = time.time()
         self.samples = []
         
-        # Connecter au signal audio
-        if self.audio_worker:
-            self.audio_worker.level.connect(self.collect_sample)
+        # S'abonner directement au flux de capture partagé (un échantillon par bloc)
+        capture_hub.attach(self._capture_consumer)
         
         # Timer pour mettre à jour l'interface
         self.timer = QTimer()
@@ -164,6 +210,10 @@ class EnvironmentAnalysisPopup(QDialog):
         
         self.info_label.setText("Analyse en cours... Restez silencieux")
         
+    def _capture_consumer(self, indata, frames, time_info, status):
+        """Consommateur du flux partagé : niveau RMS du bloc en dBFS"""
+        self.collect_sample(power_to_dbfs(block_power(capture_hub.float_block(indata)), DBFS_FLOOR))
+    
     def collect_sample(self, dbfs):
         """Collecte un échantillon audio"""
         if self.start_time is not None:
@@ -191,12 +241,8 @@ class EnvironmentAnalysisPopup(QDialog):
         if self.timer:
             self.timer.stop()
             
-        # Déconnecter du signal audio
-        if self.audio_worker:
-            try:
-                self.audio_worker.level.disconnect(self.collect_sample)
-            except:
-                pass
+        # Se désabonner du flux de capture
+        capture_hub.detach(self._capture_consumer)
         
         # Analyser les échantillons
         is_stable, variation = self.analyze_samples()
@@ -239,11 +285,7 @@ class EnvironmentAnalysisPopup(QDialog):
         """Nettoyage à la fermeture"""
         if self.timer:
             self.timer.stop()
-        if self.audio_worker:
-            try:
-                self.audio_worker.level.disconnect(self.collect_sample)
-            except:
-                pass
+        capture_hub.detach(self._capture_consumer)
         event.accept()
 
 
@@ -0,0 +1,8 @@
+"""
+Configuration pytest : rend le paquet `src` importable depuis la racine du dépôt
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
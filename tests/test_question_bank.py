@@ -0,0 +1,125 @@
+"""
+Tests de la banque de questions (src/question_bank.py)
+"""
+
+import json
+import os
+import pickle
+
+import pytest
+
+import src.question_bank as question_bank_module
+from src.question_bank import QuestionBank
+
+
+def write_bank(path, texts, jsonl):
+    """Banque `path` (JSON ou JSON Lines) avec une question par texte"""
+    entries = [{f"question_{i:02d}": {"question": text, "reply": f"R{i}"}}
+               for i, text in enumerate(texts, start=1)]
+    with open(path, 'w', encoding='utf-8') as f:
+        if jsonl:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+        else:
+            json.dump(entries, f)
+
+
+def touch(path, seconds=10):
+    """Avance la date de modification (le contenu ne change pas)"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10**9))
+
+
+def read_cache(bank):
+    with open(bank.cache_path, 'rb') as f:
+        return pickle.load(f)
+
+
+@pytest.fixture
+def jsonl_bank(tmp_path):
+    path = str(tmp_path / "question.jsonl")
+    write_bank(path, [f"Question {i}" for i in range(1, 21)], jsonl=True)
+    return path
+
+
+def test_jsonl_random_access(jsonl_bank):
+    bank = QuestionBank(jsonl_bank)
+    assert len(bank) == 20
+    assert bank[13].text == "Question 14"
+    assert bank[13].number == 14
+    assert bank[13].id == "question_14"
+    assert bank[0].reply == "R1"
+    assert bank[-1].text == "Question 20"
+    with pytest.raises(IndexError):
+        bank[20]
+
+    # Index en cache : un second processus ne relit pas la source pour l'indexer
+    assert len(read_cache(bank)["offsets"]) == 20 * 8
+    assert QuestionBank(jsonl_bank)[4].text == "Question 5"
+
+
+def test_jsonl_lru_eviction(jsonl_bank, monkeypatch):
+    monkeypatch.setattr(question_bank_module, "QUESTION_BANK_LRU_SIZE", 3)
+    bank = QuestionBank(jsonl_bank)
+    first = [bank[i] for i in range(3)]
+    assert bank[0] is first[0]        # Lue depuis la mémoire, passe en tête
+    bank[3]                           # Évince la moins récemment lue (index 1)
+    assert list(bank._recent) == [2, 0, 3]
+    assert bank[2] is first[2]
+    assert bank[1] is not first[1]    # Relue depuis le fichier
+    assert bank[1].text == "Question 2"
+    assert list(bank._recent) == [3, 2, 1]
+
+
+def test_jsonl_reload_after_mtime_change(jsonl_bank):
+    bank = QuestionBank(jsonl_bank)
+    assert bank[0].text == "Question 1"
+
+    # Même taille, contenu et date différents
+    write_bank(jsonl_bank, [f"Qvestion {i}" for i in range(1, 21)], jsonl=True)
+    touch(jsonl_bank)
+    assert bank[0].text == "Question 1"  # Pas de revalidation pendant les lectures
+    bank.reload()
+    assert not bank._recent
+    assert bank[0].text == "Qvestion 1"
+    assert QuestionBank(jsonl_bank)[19].text == "Qvestion 20"
+
+    # Questions ajoutées : index reconstruit
+    write_bank(jsonl_bank, [f"Question {i}" for i in range(1, 26)], jsonl=True)
+    bank.reload()
+    assert len(bank) == 25
+    assert bank[24].text == "Question 25"
+
+
+def test_json_cache_rebuilt_when_sha256_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / "question.json")
+    write_bank(path, ["Alpha", "Beta"], jsonl=False)
+    bank = QuestionBank(path)
+    assert [q.text for q in bank.questions()] == ["Alpha", "Beta"]
+    digest = read_cache(bank)["sha256"]
+
+    def no_compile(*args, **kwargs):
+        raise AssertionError("banque recompilée")
+
+    # Fichier simplement touché : même empreinte, cache réutilisé et sa clé mise à jour
+    touch(path)
+    with monkeypatch.context() as m:
+        m.setattr(question_bank_module, "compile_questions", no_compile)
+        assert [q.text for q in QuestionBank(path).questions()] == ["Alpha", "Beta"]
+    cache = read_cache(bank)
+    assert cache["sha256"] == digest
+    assert cache["mtime"] == os.stat(path).st_mtime
+
+    # Contenu modifié (même taille) : empreinte différente, banque recompilée
+    write_bank(path, ["Gamma", "Delta"], jsonl=False)
+    touch(path, seconds=20)
+    compile_questions = question_bank_module.compile_questions
+    compiled = []
+
+    def counting_compile(*args, **kwargs):
+        compiled.append(1)
+        return compile_questions(*args, **kwargs)
+
+    monkeypatch.setattr(question_bank_module, "compile_questions", counting_compile)
+    assert [q.text for q in QuestionBank(path).questions()] == ["Gamma", "Delta"]
+    assert compiled == [1]
+    assert read_cache(bank)["sha256"] != digest
@@ -0,0 +1,67 @@
+"""
+Tests de la navigation par masque de bits (src/session_manifest.py, src/question_manager.py)
+"""
+
+import pytest
+
+from src.session_manifest import next_unanswered, unanswered
+
+
+def mask_of(*indices):
+    mask = 0
+    for index in indices:
+        mask |= 1 << index
+    return mask
+
+
+def test_next_unanswered_skips_answered_questions():
+    mask = mask_of(0, 1, 3)
+    assert next_unanswered(mask) == 2
+    assert next_unanswered(mask, 3) == 4
+    assert next_unanswered(0) == 0
+    assert next_unanswered(mask_of(0, 1, 2), 0, 3) is None
+    assert next_unanswered(mask, 4, 4) is None
+
+
+def test_unanswered_lists_gaps_up_to_total():
+    mask = mask_of(0, 2, 3, 6)
+    assert list(unanswered(mask, 8)) == [1, 4, 5, 7]
+    assert list(unanswered(mask, 8, start=5)) == [5, 7]
+    assert list(unanswered(mask, 6)) == [1, 4, 5]
+    assert list(unanswered(mask_of(*range(5)), 5)) == []
+
+
+def make_manager(total, answered, current_index):
+    """QuestionManager sans banque ni manifeste : `total` questions, masque donné"""
+    pytest.importorskip("sounddevice")
+    from src.question_manager import QuestionManager
+    manager = QuestionManager.__new__(QuestionManager)
+    manager.questions = [f"Q{i + 1}" for i in range(total)]
+    manager.answered = answered
+    manager.current_index = current_index
+    return manager
+
+
+def test_next_question_wraps_to_earlier_gap():
+    # Questions 2 et 4 sautées, on est sur la 5 (dernière)
+    manager = make_manager(5, mask_of(0, 2), 4)
+    assert manager.next_unanswered_index() == 1
+    assert manager.next_question()
+    assert manager.current_index == 1
+    assert manager.next_unanswered_index() == 3
+
+
+def test_has_next_question_on_last_gap():
+    manager = make_manager(5, mask_of(0, 1, 3, 4), 2)
+    assert not manager.has_next_question()
+    assert not manager.next_question()
+    assert manager.current_index == 2
+
+    manager.mark_answered(2)
+    assert manager.answered_count() == 5
+    assert not manager.has_next_question()
+
+    # Une autre question sans réponse reste : la courante n'est pas la dernière
+    manager = make_manager(5, mask_of(0, 3), 2)
+    assert manager.has_next_question()
+    assert list(manager.unanswered_indices()) == [1, 2, 4]
@@ -0,0 +1,104 @@
+"""
+Tests du manifeste de session (src/session_manifest.py)
+"""
+
+import json
+import os
+
+import numpy as np
+import soundfile as sf
+
+from src.session_manifest import SessionManifest
+from src.take_writer import response_path
+
+SAMPLERATE = 16000
+
+
+def write_take(folder, question, take=1, seconds=0.5):
+    """Prise WAV silencieuse `reponse_XX_takeK.wav` ; retourne son chemin"""
+    path = response_path(question, take, "WAV", str(folder))
+    sf.write(path, np.zeros(int(seconds * SAMPLERATE), dtype=np.float32), SAMPLERATE)
+    return path
+
+
+def manifest_lines(manifest):
+    with open(manifest.path, 'r', encoding='utf-8') as f:
+        return f.readlines()
+
+
+def test_replay_ignores_torn_last_line(tmp_path):
+    manifest = SessionManifest(str(tmp_path))
+    manifest.load()
+    manifest.record_take(write_take(tmp_path, 1))
+    manifest.record_take(write_take(tmp_path, 2))
+
+    # Crash pendant l'écriture de la prise de la question 3 : ligne sans fin
+    line = manifest_lines(manifest)[-1].replace('"question": 2', '"question": 3')
+    with open(manifest.path, 'a', encoding='utf-8') as f:
+        f.write(line[:len(line) // 2])
+
+    replayed = SessionManifest(str(tmp_path))
+    replayed.load(verify=False)
+    assert replayed.answered_mask() == 0b011
+    assert not replayed.is_answered(3)
+
+    # L'ajout suivant isole la ligne tronquée au lieu de s'y coller
+    replayed.record_take(write_take(tmp_path, 4))
+    again = SessionManifest(str(tmp_path))
+    again.load(verify=False)
+    assert again.answered_mask() == 0b1011
+    assert again.take(4, 1)["duration"] == 0.5
+
+
+def test_compaction_round_trip(tmp_path):
+    manifest = SessionManifest(str(tmp_path))
+    manifest.load()
+    for take in (1, 2, 3):
+        manifest.record_take(write_take(tmp_path, 1, take, seconds=0.25 * take))
+    manifest.record_take(write_take(tmp_path, 5))
+    before = {q: manifest.takes(q) for q in (1, 5)}
+
+    # Journal gonflé par des événements répétés (plus de deux lignes par prise)
+    with open(manifest.path, 'a', encoding='utf-8') as f:
+        for event in before[1] * 3:
+            f.write(json.dumps(event) + "\n")
+    assert len(manifest_lines(manifest)) > 2 * (len(before[1]) + len(before[5]) + 1)
+
+    compacted = SessionManifest(str(tmp_path))
+    compacted.load()
+    assert len(manifest_lines(compacted)) == 4
+    assert {q: compacted.takes(q) for q in (1, 5)} == before
+    assert compacted.next_take(1) == 4
+
+    reread = SessionManifest(str(tmp_path))
+    reread.load()
+    assert {q: reread.takes(q) for q in (1, 5)} == before
+    assert reread.answered_mask() == (1 << 0) | (1 << 4)
+
+
+def test_rebuild_from_files_on_disk(tmp_path):
+    manifest = SessionManifest(str(tmp_path))
+    manifest.load()
+    manifest.record_take(write_take(tmp_path, 1))
+
+    # Prises ajoutées hors manifeste (récupération après crash, copie manuelle)
+    write_take(tmp_path, 2, seconds=1.0)
+    write_take(tmp_path, 2, take=2)
+    legacy = os.path.join(str(tmp_path), "reponse_07.wav")
+    sf.write(legacy, np.zeros(SAMPLERATE, dtype=np.float32), SAMPLERATE)
+    (tmp_path / "notes.txt").write_text("pas une prise")
+
+    rebuilt = SessionManifest(str(tmp_path))
+    rebuilt.load()
+    assert rebuilt.answered_mask() == (1 << 0) | (1 << 1) | (1 << 6)
+    assert [t["take"] for t in rebuilt.takes(2)] == [1, 2]
+    assert rebuilt.take(2, 1)["duration"] == 1.0
+    assert rebuilt.take(7, 1)["file"] == "reponse_07.wav"
+    assert len(manifest_lines(rebuilt)) == 4
+
+    # Prise supprimée à la main : le manifeste suit le dossier
+    os.remove(legacy)
+    synced = SessionManifest(str(tmp_path))
+    synced.load()
+    assert not synced.is_answered(7)
+    assert synced.answered_count() == 2
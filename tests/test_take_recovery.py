@@ -0,0 +1,84 @@
+"""
+Tests des noms de prises et de la récupération après crash (src/take_writer.py)
+"""
+
+import json
+import os
+
+import numpy as np
+import soundfile as sf
+
+from src.config import MIN_RECOVERABLE_SEC
+from src.take_writer import (
+    JOURNAL_SUFFIX, PART_SUFFIX, free_take_number, parse_response_name,
+    recover_incomplete_takes, response_path,
+)
+
+SAMPLERATE = 16000
+
+
+def interrupted_take(folder, question, written_sec, committed_sec, truncated_sec):
+    """Prise `.part` + journal telle qu'un crash la laisse
+
+    `written_sec` secondes écrites, `committed_sec` consignées au dernier point
+    de contrôle, fichier coupé après `truncated_sec` secondes de données.
+    """
+    output_file = response_path(question, 1, "WAV", str(folder))
+    part_file = output_file + PART_SUFFIX
+    ramp = np.linspace(-0.5, 0.5, int(written_sec * SAMPLERATE), dtype=np.float32)
+    sf.write(part_file, ramp, SAMPLERATE, subtype='PCM_16', format='WAV')
+    data_bytes = (len(ramp) - int(truncated_sec * SAMPLERATE)) * 2
+    with open(part_file, 'r+b') as f:
+        f.truncate(os.path.getsize(part_file) - data_bytes)
+    journal = {"output_file": os.path.basename(output_file), "samplerate": SAMPLERATE,
+               "channels": 1, "frames": int(committed_sec * SAMPLERATE)}
+    with open(output_file + JOURNAL_SUFFIX, 'w', encoding='utf-8') as f:
+        json.dump(journal, f)
+    return output_file, ramp
+
+
+def test_recover_truncated_journaled_take(tmp_path):
+    output_file, ramp = interrupted_take(tmp_path, 3, written_sec=3.0, committed_sec=2.0, truncated_sec=2.5)
+    short_file, _ = interrupted_take(tmp_path, 4, written_sec=1.0,
+                                     committed_sec=MIN_RECOVERABLE_SEC / 2, truncated_sec=1.0)
+    orphan = tmp_path / ("reponse_05_take1.wav" + PART_SUFFIX)
+    orphan.write_bytes(b"RIFF")
+
+    assert recover_incomplete_takes(str(tmp_path)) == (1, 2)
+
+    info = sf.info(output_file)
+    assert info.frames == int(2.0 * SAMPLERATE)
+    assert info.samplerate == SAMPLERATE
+    assert info.subtype == 'PCM_16'
+    recovered, _ = sf.read(output_file, dtype='float32')
+    np.testing.assert_allclose(recovered, ramp[:info.frames], atol=1.0 / 32768)
+
+    assert not os.path.exists(short_file)
+    assert sorted(os.listdir(str(tmp_path))) == [os.path.basename(output_file)]
+
+
+def test_response_name_round_trip(tmp_path):
+    for question, take, fmt in ((1, 1, "WAV"), (12, 3, "FLAC"), (7, 10, "OGG")):
+        path = response_path(question, take, fmt, str(tmp_path))
+        assert parse_response_name(os.path.basename(path)) == (question, take)
+
+    assert os.path.basename(response_path(2, 1, "flac", "x")) == "reponse_02_take1.flac"
+    assert parse_response_name("reponse_05.wav") == (5, 1)
+    assert parse_response_name("reponse_05_take2.mp3") is None
+    assert parse_response_name("reponse_05_take2.wav" + PART_SUFFIX) is None
+    assert parse_response_name("reponse_05_take2.wav.stats.json") is None
+    assert parse_response_name("question_05.wav") is None
+
+
+def test_free_take_number_skips_final_partial_and_legacy(tmp_path):
+    folder = str(tmp_path)
+    assert free_take_number(6, folder=folder) == 1
+
+    (tmp_path / "reponse_06.flac").write_bytes(b"")  # Prise unique d'une version précédente
+    assert free_take_number(6, folder=folder) == 2
+
+    open(response_path(6, 2, "WAV", folder) + PART_SUFFIX, 'wb').close()
+    open(response_path(6, 3, "OGG", folder), 'wb').close()
+    assert free_take_number(6, folder=folder) == 4
+    assert free_take_number(6, take=5, folder=folder) == 5
+    assert free_take_number(7, folder=folder) == 1
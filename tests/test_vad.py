@@ -0,0 +1,61 @@
+"""
+Tests de la détection d'activité vocale (src/vad.py)
+"""
+
+import numpy as np
+
+from src.config import SPEECH_SILENCE_TIMEOUT_MS
+from src.vad import VoiceActivityDetector, SPEECH_STARTED, SILENCE_STARTED, END_OF_SPEECH
+
+SAMPLERATE = 44100
+BLOCK = 2048
+
+
+def voice(seconds, f0=180.0):
+    """Signal harmonique (spectre non plat, ZCR faible) au-dessus du seuil"""
+    t = np.arange(int(seconds * SAMPLERATE)) / SAMPLERATE
+    return sum(0.2 / k * np.sin(2 * np.pi * f0 * k * t) for k in range(1, 6)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLERATE), dtype=np.float32)
+
+
+def run_vad(signal):
+    """Alimente la VAD par blocs ; retourne [(temps de fin du bloc en s, événement)]"""
+    vad = VoiceActivityDetector(SAMPLERATE)
+    events = []
+    for start in range(0, len(signal), BLOCK):
+        for event in vad.process(signal[start:start + BLOCK]):
+            events.append((min(start + BLOCK, len(signal)) / SAMPLERATE, event))
+    return events
+
+
+def test_click_followed_by_silence_triggers_nothing():
+    signal = np.concatenate((silence(1.0), voice(0.04), silence(3.0)))
+    assert run_vad(signal) == []
+
+
+def test_speech_with_micro_pauses_is_one_answer():
+    signal = np.concatenate((
+        silence(0.5),
+        voice(0.6), silence(0.2), voice(0.6), silence(0.3), voice(0.5),
+        silence(3.0),
+    ))
+    events = run_vad(signal)
+    kinds = [event for _, event in events]
+    assert kinds == [SPEECH_STARTED, SILENCE_STARTED, END_OF_SPEECH]
+
+    last_voice = 0.5 + 0.6 + 0.2 + 0.6 + 0.3 + 0.5
+    end_time = events[-1][0]
+    assert end_time >= last_voice + SPEECH_SILENCE_TIMEOUT_MS / 1000
+    assert end_time <= last_voice + SPEECH_SILENCE_TIMEOUT_MS / 1000 + 2 * BLOCK / SAMPLERATE
+
+
+def test_onset_counts_voiced_frames_across_micro_pauses():
+    # Salves de 100 ms séparées de 100 ms : 0.3 s de voix réelle après trois salves
+    bursts = [part for _ in range(4) for part in (voice(0.1), silence(0.1))]
+    events = run_vad(np.concatenate([silence(0.5)] + bursts + [silence(3.0)]))
+    started = [t for t, event in events if event == SPEECH_STARTED]
+    assert len(started) == 1
+    assert 0.5 + 0.5 - BLOCK / SAMPLERATE <= started[0] <= 0.5 + 0.8